@@ -16,8 +16,8 @@ mail = Mail()
 # babel = Babel()
 
 
-def create_app(config_name='development'):
-    """Create and configure Flask application."""
+def create_app(config_name='development', test_config=None):
+    """Create and configure Flask application; test_config overrides settings of the chosen config."""
     
     app = Flask(__name__)
     
@@ -25,10 +25,20 @@ def create_app(config_name='development'):
     if config_name == 'production':
         from config import ProductionConfig
         app.config.from_object(ProductionConfig)
+    elif config_name == 'testing':
+        from config import TestingConfig
+        app.config.from_object(TestingConfig)
     else:
         from config import DevelopmentConfig
         app.config.from_object(DevelopmentConfig)
+    if test_config:
+        app.config.update(test_config)
     
+    # Behind nginx request.remote_addr is the proxy: take the client from X-Forwarded-For
+    if app.config['PROXY_FIX_X_FOR']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
     # Create upload folder
     upload_folder = app.config['UPLOAD_FOLDER']
     if not os.path.exists(upload_folder):
@@ -36,6 +46,8 @@ def create_app(config_name='development'):
     
     # Initialize extensions
     db.init_app(app)
+    from app.database import init_database
+    init_database(app)
     mail.init_app(app)
     # babel.init_app(app)
     migrate = Migrate(app, db)
@@ -56,21 +68,40 @@ def create_app(config_name='development'):
     csrf = CSRFProtect()
     csrf.init_app(app)
     
-    # Register blueprints
-    from app.routes import auth_bp, main_bp, product_bp, profile_bp, admin_bp
-    
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(main_bp)
-    app.register_blueprint(product_bp)
-    app.register_blueprint(profile_bp)
-    app.register_blueprint(admin_bp)
+    # Register blueprints served by this worker pool (APP_POOL / APP_BLUEPRINTS)
+    from app.routes import register_blueprints
+    register_blueprints(app)
     
+    # Register CLI commands
+    from app.cli import (images_cli, shelves_cli, recommendations_cli, popularity_cli, traces_cli, blueprints_cli,
+                         replica_cli)
+    app.cli.add_command(images_cli)
+    app.cli.add_command(shelves_cli)
+    app.cli.add_command(recommendations_cli)
+    app.cli.add_command(popularity_cli)
+    app.cli.add_command(traces_cli)
+    app.cli.add_command(blueprints_cli)
+    app.cli.add_command(replica_cli)
+
+    # Request timing, SQL query counter and Server-Timing header
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app)
+    from app.metrics import init_metrics
+    init_metrics(app)
+    from app.tracing import init_tracing
+    init_tracing(app)
+    from app.profiler import init_profiler
+    init_profiler(app)
+
     # Register error handlers
     register_error_handlers(app)
     
     # Register context processors
     register_context_processors(app)
 
+    # Register template filters
+    register_template_filters(app)
+
     # # Register Babel locale selector
     # @babel.localeselector
     # def get_locale():
@@ -109,3 +140,22 @@ def register_context_processors(app):
         from app.models import Category
         categories = Category.query.all()
         return dict(categories=categories)
+
+
+def register_template_filters(app):
+    """Register template filters."""
+
+    @app.template_filter('image_src')
+    def image_src(image):
+        """Map a stored /static/images/<kind>/<stem>.<ext> path to the format-negotiating media route."""
+        from flask import url_for
+        if not image:
+            return image
+        path = image.split('?', 1)[0]
+        for kind in ('products', 'categories'):
+            prefix = f'/static/images/{kind}/'
+            if path.startswith(prefix):
+                stem = os.path.splitext(path[len(prefix):])[0]
+                if stem and '/' not in stem:
+                    return url_for('main.media', kind=kind, stem=stem)
+        return image
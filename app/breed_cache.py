@@ -0,0 +1,74 @@
+"""
+Perceptual-hash cache for breed detection results.
+
+Entries live in the database so every worker shares them. A lookup matches
+any non-expired entry whose dHash is within BREED_CACHE_MAX_DISTANCE bits of
+the uploaded photo, so re-uploads and resized copies skip the model call.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+
+from app.models import db, BreedDetectionCache
+from image_processor import image_dhash
+
+
+def photo_hash(img):
+    """Return the 64-bit dHash of a PIL image as a 16-character hex string."""
+    return f'{image_dhash(img):016x}'
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hex hashes."""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def _expiry_cutoff():
+    return datetime.now(timezone.utc) - timedelta(seconds=current_app.config['BREED_CACHE_TTL'])
+
+
+def lookup(image_hash):
+    """Return cached result_data for the closest matching photo, or None."""
+    max_distance = current_app.config['BREED_CACHE_MAX_DISTANCE']
+    cutoff = _expiry_cutoff()
+
+    # Exact match uses the index; near matches scan only the (bounded) hash column
+    entry = BreedDetectionCache.query.filter(
+        BreedDetectionCache.image_hash == image_hash,
+        BreedDetectionCache.created_at > cutoff
+    ).first()
+    if entry is None and max_distance > 0:
+        best_id, best_distance = None, max_distance + 1
+        candidates = db.session.query(BreedDetectionCache.id, BreedDetectionCache.image_hash).filter(
+            BreedDetectionCache.created_at > cutoff)
+        for entry_id, entry_hash in candidates:
+            distance = hamming_distance(image_hash, entry_hash)
+            if distance < best_distance:
+                best_id, best_distance = entry_id, distance
+        entry = db.session.get(BreedDetectionCache, best_id) if best_id else None
+
+    if entry is None:
+        return None
+
+    entry.hit_count += 1
+    entry.last_used_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return json.loads(entry.result_data)
+
+
+def store(image_hash, result_data):
+    """Cache result_data for image_hash, then evict expired and least recently used entries."""
+    db.session.add(BreedDetectionCache(image_hash=image_hash, result_data=json.dumps(result_data, ensure_ascii=False)))
+    db.session.flush()
+
+    BreedDetectionCache.query.filter(BreedDetectionCache.created_at <= _expiry_cutoff()).delete(synchronize_session=False)
+
+    max_entries = current_app.config['BREED_CACHE_MAX_ENTRIES']
+    overflow = BreedDetectionCache.query.count() - max_entries
+    if overflow > 0:
+        stale_ids = [row.id for row in db.session.query(BreedDetectionCache.id)
+                     .order_by(BreedDetectionCache.last_used_at.asc()).limit(overflow)]
+        BreedDetectionCache.query.filter(BreedDetectionCache.id.in_(stale_ids)).delete(synchronize_session=False)
+
+    db.session.commit()
@@ -0,0 +1,256 @@
+"""
+Pluggable breed classifier backends.
+
+``breed_detect`` talks to a ``GuardedClassifier``, which wraps a backend with:
+
+* a semaphore capping in-flight model calls per process, so a slow upstream
+  cannot tie up every web worker thread;
+* a circuit breaker that fails fast with a friendly message after repeated
+  upstream failures and lets a single trial call through after a cool-down.
+
+The per-call deadline is enforced by the backend itself (the Gemini SDK
+timeout), so a call never outlives the semaphore slot it holds.
+
+Backends are selected with ``BREED_CLASSIFIER``: ``gemini`` (default) or
+``stub``, a deterministic local backend for tests and offline benchmarking.
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+from app import metrics, tracing
+from image_processor import image_dhash, pil_image
+
+
+class ClassifierUnavailable(Exception):
+    """Raised when a call is rejected without reaching the model (breaker open, too busy)."""
+
+
+BREED_PROMPT = """
+    Ты эксперт по породам кошек и собак. Проанализируй изображение.
+    Определи породу животного на фото и его тип (кошка или собака).
+    Твоя задача - дать максимально точный и профессиональный ответ.
+    Если на изображении не кошка и не собака, или изображение нечеткое,
+    ты должен это указать в поле "description".
+
+    Ответь строго в формате JSON, используя следующую структуру:
+    {
+        "pet_type": "собака" или "кошка" или "Неизвестно",
+        "breed_name": "Название породы (например, Лабрадор-ретривер)",
+        "confidence": "Уверенность в процентах (например, 95%)",
+        "description": "Профессиональное описание породы или анализ изображения (2-3 предложения)"
+    }
+
+    Если животное не определено как кошка или собака, используй "Неизвестно" для pet_type, "Неизвестно" для breed_name и 0% для confidence.
+    """
+
+
+class BreedClassifier(ABC):
+    """Backend interface: turn a PIL image into the breed ``result_data`` dict."""
+
+    name = 'base'
+
+    @abstractmethod
+    def classify(self, img):
+        """Return the ``result_data`` dict for img; raise on upstream failure."""
+
+
+class GeminiBreedClassifier(BreedClassifier):
+    """Gemini backend. The SDK is configured and the model built once per process."""
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name='gemini-1.5-flash', timeout=15.0):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.timeout = timeout
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._generation_config = genai.types.GenerationConfig(response_mime_type='application/json')
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    @staticmethod
+    def _to_jpeg(img):
+        """Re-encode to RGB JPEG, the format Gemini accepts for every upload mode."""
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG')
+        buffer.seek(0)
+        return pil_image().open(buffer)
+
+    def classify(self, img):
+        model = self._get_model()
+        response = model.generate_content(
+            [BREED_PROMPT, self._to_jpeg(img)],
+            generation_config=self._generation_config,
+            request_options={'timeout': self.timeout},
+        )
+        return json.loads(response.text)
+
+
+class StubBreedClassifier(BreedClassifier):
+    """Deterministic offline backend: the same photo always yields the same breed."""
+
+    name = 'stub'
+
+    BREEDS = [
+        ('собака', 'Лабрадор-ретривер'),
+        ('собака', 'Немецкая овчарка'),
+        ('собака', 'Йоркширский терьер'),
+        ('собака', 'Сибирский хаски'),
+        ('кошка', 'Мейн-кун'),
+        ('кошка', 'Британская короткошерстная'),
+        ('кошка', 'Сфинкс'),
+        ('кошка', 'Шотландская вислоухая'),
+    ]
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def classify(self, img):
+        if self.latency:
+            time.sleep(self.latency)
+        digest = image_dhash(img)
+        pet_type, breed_name = self.BREEDS[digest % len(self.BREEDS)]
+        return {
+            'pet_type': pet_type,
+            'breed_name': breed_name,
+            'confidence': f'{80 + digest % 20}%',
+            'description': 'Тестовый ответ локального классификатора.',
+        }
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Return True if a call may proceed now."""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def cancel_trial(self):
+        """Release a half-open trial that never reached the upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class GuardedClassifier:
+    """Apply the concurrency cap and circuit breaker around a backend."""
+
+    BUSY_MESSAGE = 'Сервис определения породы сейчас перегружен. Пожалуйста, попробуйте через минуту.'
+    UNAVAILABLE_MESSAGE = 'Сервис определения породы временно недоступен. Пожалуйста, попробуйте позже.'
+
+    def __init__(self, backend, max_concurrency=4, queue_timeout=2.0, breaker=None):
+        self.backend = backend
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def classify(self, img):
+        if not self.breaker.allow():
+            metrics.CLASSIFIER_REJECTED.labels('breaker_open').inc()
+            raise ClassifierUnavailable(self.UNAVAILABLE_MESSAGE)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            # Not the upstream's fault: hand back a half-open trial without counting a failure
+            self.breaker.cancel_trial()
+            metrics.CLASSIFIER_REJECTED.labels('busy').inc()
+            raise ClassifierUnavailable(self.BUSY_MESSAGE)
+        start = time.perf_counter()
+        try:
+            with tracing.span(f'classifier.{self.backend.name}', width=img.width, height=img.height):
+                result = self.backend.classify(img)
+        except Exception:
+            self.breaker.record_failure()
+            metrics.CLASSIFIER_LATENCY.labels(self.backend.name, 'error').observe(time.perf_counter() - start)
+            raise
+        finally:
+            self._slots.release()
+        metrics.CLASSIFIER_LATENCY.labels(self.backend.name, 'ok').observe(time.perf_counter() - start)
+        self.breaker.record_success()
+        return result
+
+
+def create_breed_classifier(config):
+    """Build the guarded classifier described by the app config."""
+    backend_name = config.get('BREED_CLASSIFIER', 'gemini')
+    if backend_name == 'stub':
+        backend = StubBreedClassifier(latency=config.get('BREED_CLASSIFIER_STUB_LATENCY', 0.0))
+    elif backend_name == 'gemini':
+        backend = GeminiBreedClassifier(
+            api_key=os.getenv('GEMINI_API_KEY'),
+            model_name=config.get('BREED_CLASSIFIER_MODEL', 'gemini-1.5-flash'),
+            timeout=config.get('BREED_CLASSIFIER_TIMEOUT', 15.0),
+        )
+    else:
+        raise ValueError(f'Unknown BREED_CLASSIFIER backend: {backend_name}')
+
+    return GuardedClassifier(
+        backend,
+        max_concurrency=config.get('BREED_CLASSIFIER_MAX_CONCURRENCY', 4),
+        queue_timeout=config.get('BREED_CLASSIFIER_QUEUE_TIMEOUT', 2.0),
+        breaker=CircuitBreaker(
+            failure_threshold=config.get('BREED_CLASSIFIER_FAILURE_THRESHOLD', 5),
+            reset_timeout=config.get('BREED_CLASSIFIER_RESET_TIMEOUT', 30.0),
+        ),
+    )
+
+
+def get_breed_classifier():
+    """Return the process-wide classifier for the current app, creating it on first use."""
+    from flask import current_app
+    classifier = current_app.extensions.get('breed_classifier')
+    if classifier is None:
+        classifier = current_app.extensions.setdefault('breed_classifier', create_breed_classifier(current_app.config))
+    return classifier
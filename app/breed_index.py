@@ -0,0 +1,238 @@
+"""
+Process-local index for resolving classifier breed names and recommendations.
+
+The model answers with free-form names ("Лабрадор ретривер", "Labrador
+Retriever", "лабрадор"), so an exact slug lookup misses most variations.
+The index keeps every breed's slug, transliteration, synonyms and trigram
+set in memory together with precomputed top products per breed and per pet
+type, so resolving a result and building recommendations needs no queries.
+
+The index is cached per app in ``app.extensions`` and rebuilt lazily after
+any commit in that app that touches breeds or products (including product <->
+breed links) and at least every BREED_INDEX_TTL seconds, which picks up changes
+made by other worker processes.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, has_app_context
+from slugify import slugify
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models import db, Breed, Category, Product, product_breeds
+
+# Дополнительные написания пород, которые может вернуть модель
+BREED_SYNONYMS = {
+    'Лабрадор-ретривер': ['Лабрадор', 'Labrador Retriever', 'Labrador'],
+    'Немецкая овчарка': ['Овчарка', 'German Shepherd', 'Alsatian'],
+    'Йоркширский терьер': ['Йорк', 'Йоркширский', 'Yorkshire Terrier', 'Yorkie'],
+    'Сибирский хаски': ['Хаски', 'Siberian Husky', 'Husky'],
+    'Мейн-кун': ['Мэйн-кун', 'Мейнкун', 'Maine Coon'],
+    'Британская короткошерстная': ['Британская', 'Британец', 'British Shorthair'],
+    'Сфинкс': ['Канадский сфинкс', 'Донской сфинкс', 'Sphynx'],
+    'Шотландская вислоухая': ['Скоттиш-фолд', 'Scottish Fold'],
+}
+
+# Категория кормов для каждого типа животного
+PET_TYPE_CATEGORIES = {
+    'собака': 'dog-food',
+    'кошка': 'cat-food',
+}
+
+TOP_PRODUCTS = 6
+
+# Product columns the index copies; other updates (stock, views) do not invalidate it
+INDEXED_PRODUCT_FIELDS = ('name', 'price', 'image', 'category_id', 'breeds')
+
+# Minimum trigram Jaccard similarity for a fuzzy match
+MIN_SIMILARITY = 0.45
+
+
+def normalize(name):
+    """Fold case, 'ё' and punctuation so spelling variants share one key."""
+    return slugify((name or '').replace('ё', 'е').replace('Ё', 'Е'))
+
+
+def trigrams(key):
+    """Character trigrams of a normalized key, padded so short names still match."""
+    text = f'  {key.replace("-", " ")} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _product_summary(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': int(product.price),
+        'image': product.image or '/static/img/placeholder.jpg',
+    }
+
+
+class BreedIndex:
+    """Immutable snapshot of breeds and their recommended products."""
+
+    def __init__(self, breeds, breed_products, pet_type_products, general_products):
+        self.breeds = breeds  # {breed_id: {'id', 'name', 'slug', 'pet_type'}}
+        self.breed_products = breed_products  # {breed_id: [product summary]}
+        self.pet_type_products = pet_type_products  # {pet_type: [product summary]}
+        self.general_products = general_products
+        self.pet_types = {breed['pet_type'] for breed in breeds.values()}
+        self.built_at = time.monotonic()
+        self.generation = 0  # see get_index()
+
+        self._keys = {}  # normalized spelling -> breed_id
+        self._trigrams = []  # [(trigram set, breed_id)]
+        for breed in breeds.values():
+            for spelling in [breed['name'], breed['slug']] + BREED_SYNONYMS.get(breed['name'], []):
+                key = normalize(spelling)
+                if key:
+                    self._keys.setdefault(key, breed['id'])
+                    self._trigrams.append((trigrams(key), breed['id']))
+
+    @classmethod
+    def build(cls):
+        """Load breeds and top products with a fixed number of queries."""
+        breeds = {
+            b.id: {'id': b.id, 'name': b.name, 'slug': b.slug, 'pet_type': b.pet_type}
+            for b in Breed.query.all()
+        }
+
+        links = db.session.query(product_breeds.c.breed_id, product_breeds.c.product_id).order_by(
+            product_breeds.c.breed_id, product_breeds.c.product_id).all()
+        category_slugs = set(PET_TYPE_CATEGORIES.values())
+        categories = {c.id: c.slug for c in Category.query.filter(Category.slug.in_(category_slugs))}
+
+        linked_ids = {product_id for _, product_id in links}
+        products = {
+            p.id: p for p in Product.query.filter(
+                db.or_(Product.id.in_(linked_ids), Product.category_id.in_(list(categories)))
+            ).order_by(Product.id)
+        }
+
+        breed_products = {}
+        pet_type_counts = {}
+        for breed_id, product_id in links:
+            product = products.get(product_id)
+            if product is None or breed_id not in breeds:
+                continue
+            breed_products.setdefault(breed_id, [])
+            if len(breed_products[breed_id]) < TOP_PRODUCTS:
+                breed_products[breed_id].append(_product_summary(product))
+            # Товары, подходящие большему числу пород данного типа, идут первыми
+            pet_type_counts.setdefault(breeds[breed_id]['pet_type'], Counter())[product_id] += 1
+
+        pet_type_products = {}
+        for pet_type, counts in pet_type_counts.items():
+            top = sorted(counts, key=lambda product_id: (-counts[product_id], product_id))[:TOP_PRODUCTS]
+            pet_type_products[pet_type] = [_product_summary(products[product_id]) for product_id in top]
+
+        # Если для типа животного нет привязанных товаров, используем категорию кормов
+        for pet_type, category_slug in PET_TYPE_CATEGORIES.items():
+            if pet_type_products.get(pet_type):
+                continue
+            category_products = [p for p in products.values() if categories.get(p.category_id) == category_slug]
+            if category_products:
+                pet_type_products[pet_type] = [_product_summary(p) for p in category_products[:TOP_PRODUCTS]]
+
+        general_products = [_product_summary(p) for p in Product.query.order_by(Product.id).limit(TOP_PRODUCTS)]
+        return cls(breeds, breed_products, pet_type_products, general_products)
+
+    def resolve(self, breed_name, pet_type=None):
+        """Return the breed dict matching a free-form name, or None."""
+        key = normalize(breed_name)
+        if not key:
+            return None
+        breed_id = self._keys.get(key)
+        if breed_id is None:
+            query = trigrams(key)
+            best_score = MIN_SIMILARITY
+            known_pet_type = pet_type in self.pet_types
+            for candidate, candidate_id in self._trigrams:
+                # A mismatched pet type is a stronger signal than a close spelling
+                if known_pet_type and self.breeds[candidate_id]['pet_type'] != pet_type:
+                    continue
+                score = similarity(query, candidate)
+                if score > best_score:
+                    breed_id, best_score = candidate_id, score
+        return self.breeds.get(breed_id)
+
+    def recommendations(self, breed, pet_type):
+        """Top products for a breed, falling back to its pet type and then to any products."""
+        if breed and self.breed_products.get(breed['id']):
+            return self.breed_products[breed['id']]
+        if pet_type and self.pet_type_products.get(pet_type):
+            return self.pet_type_products[pet_type]
+        return self.general_products
+
+
+_lock = threading.Lock()
+
+
+def _outdated(index, generation, ttl):
+    return index is None or index.generation != generation or time.monotonic() - index.built_at > ttl
+
+
+def get_index():
+    """Return the current index for this app, rebuilding it if stale or expired."""
+    extensions = current_app.extensions
+    ttl = current_app.config.get('BREED_INDEX_TTL', 300)
+    index = extensions.get('breed_index')
+    if _outdated(index, extensions.get('breed_index_generation', 0), ttl):
+        with _lock:
+            index = extensions.get('breed_index')
+            # Поколение читаем до сборки: правка, закоммиченная во время сборки, вызовет еще одну
+            generation = extensions.get('breed_index_generation', 0)
+            if _outdated(index, generation, ttl):
+                index = BreedIndex.build()
+                index.generation = generation
+                extensions['breed_index'] = index
+    return index
+
+
+def invalidate():
+    """Force a rebuild of the current app's index on its next lookup in this process."""
+    # Флаг хранится рядом с индексом: приложения одного процесса не сбрасывают устаревание друг друга
+    extensions = current_app.extensions
+    extensions['breed_index_generation'] = extensions.get('breed_index_generation', 0) + 1
+
+
+def _affects_index(obj, is_update):
+    if isinstance(obj, (Breed, Category)):
+        return True
+    if not isinstance(obj, Product):
+        return False
+    if not is_update:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in INDEXED_PRODUCT_FIELDS)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_catalog_changes(session, flush_context, instances):
+    changed = (
+        any(_affects_index(obj, False) for obj in list(session.new) + list(session.deleted))
+        or any(_affects_index(obj, True) for obj in session.dirty)
+    )
+    if changed:
+        session.info['breed_index_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('breed_index_dirty', False) and has_app_context():
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('breed_index_dirty', None)
@@ -0,0 +1,149 @@
+"""
+Background execution of breed detection jobs.
+
+The request handler stores a ``BreedDetectionJob`` row and hands the decoded
+photo to a per-process thread pool sized to the classifier's concurrency cap,
+so jobs queue here rather than timing out on the classifier semaphore. Job
+state lives in the database, so any worker can answer status polls.
+
+A job that fails after classification (cache, database) is marked ``error``.
+A job still ``pending`` or ``running`` after BREED_JOB_DEADLINE, e.g. because
+its worker was recycled by ``max_requests``, is reported as failed by the
+status and event endpoints.
+"""
+
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+
+from app import breed_cache, metrics, shelves, tracing
+from app.breed_classifier import get_breed_classifier, ClassifierUnavailable
+from app.models import db, BreedDetectionJob
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_executor(app):
+    """Create the pool lazily so each forked worker gets its own threads."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=app.config['BREED_CLASSIFIER_MAX_CONCURRENCY'],
+                    thread_name_prefix='breed-job')
+    return _executor
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+def create_job(user_id, image_hash, cached_result=None, batch_id=None):
+    """Create a job; a cache hit produces a job that is already done."""
+    now = datetime.now(timezone.utc)
+    job = BreedDetectionJob(id=new_id(), user_id=user_id, image_hash=image_hash, batch_id=batch_id)
+    if cached_result is not None:
+        job.status = 'done'
+        job.from_cache = True
+        job.result_data = json.dumps(cached_result, ensure_ascii=False)
+        job.finished_at = now
+        shelves.remember_detected_pet(user_id, cached_result)
+    db.session.add(job)
+
+    # Drop old jobs so the table stays small
+    cutoff = now - timedelta(seconds=current_app.config['BREED_JOB_RETENTION'])
+    BreedDetectionJob.query.filter(BreedDetectionJob.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return job
+
+
+def submit(job_id, img):
+    """Classify img for job_id off the request thread."""
+    app = current_app._get_current_object()
+    metrics.BREED_JOBS_QUEUED.inc()
+    future = _get_executor(app).submit(_run_job, app, job_id, img, tracing.current_context())
+    future.add_done_callback(lambda f: metrics.BREED_JOBS_QUEUED.dec())
+
+
+def _run_job(app, job_id, img, trace_parent=None):
+    with app.app_context(), tracing.trace('breed_detection_job', parent=trace_parent, job_id=job_id):
+        try:
+            _classify(job_id, img)
+        except Exception as e:
+            # Сбой после классификации (кэш, БД) не должен оставлять задачу в статусе running
+            print(f"Ошибка задачи распознавания породы {job_id}: {e}")
+            db.session.rollback()
+            _fail(job_id, 'Ошибка при анализе фото. Попробуйте загрузить его еще раз.')
+        finally:
+            db.session.remove()
+
+
+def _classify(job_id, img):
+    job = db.session.get(BreedDetectionJob, job_id)
+    if job is None or job.status == 'error':
+        # Задача удалена или уже признана зависшей
+        return
+    job.status = 'running'
+    db.session.commit()
+
+    try:
+        result_data = get_breed_classifier().classify(img)
+    except ClassifierUnavailable as e:
+        job.status = 'error'
+        job.error = str(e)
+    except Exception as e:
+        # Текст ошибки бэкенда (ключи, квоты, трассировки SDK) пользователю не показываем
+        print(f"Ошибка классификатора пород: {e}")
+        job.status = 'error'
+        job.error = 'Ошибка при анализе фото. Попробуйте загрузить его еще раз.'
+    else:
+        job.status = 'done'
+        job.result_data = json.dumps(result_data, ensure_ascii=False)
+        shelves.remember_detected_pet(job.user_id, result_data)
+        # Кэшируем только распознанные породы: неудачный ответ может быть случайным
+        if result_data.get('breed_name', 'Неизвестно') != 'Неизвестно':
+            breed_cache.store(job.image_hash, result_data)
+    job.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def _fail(job_id, message):
+    """Mark an unfinished job as failed."""
+    BreedDetectionJob.query.filter(
+        BreedDetectionJob.id == job_id, BreedDetectionJob.status.in_(('pending', 'running'))
+    ).update({'status': 'error', 'error': message, 'finished_at': datetime.now(timezone.utc)},
+             synchronize_session=False)
+    db.session.commit()
+
+
+def fail_if_stale(job):
+    """Fail a job unfinished after BREED_JOB_DEADLINE: its worker died or was recycled mid-job.
+
+    Returns True if the job was failed here.
+    """
+    if job.status not in ('pending', 'running'):
+        return False
+    created_at = job.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    deadline = timedelta(seconds=current_app.config['BREED_JOB_DEADLINE'])
+    if datetime.now(timezone.utc) - created_at < deadline:
+        return False
+    _fail(job.id, 'Время ожидания результата истекло. Попробуйте загрузить фото еще раз.')
+    db.session.refresh(job)
+    return True
@@ -0,0 +1,323 @@
+"""
+Flask CLI commands.
+"""
+
+import os
+import csv
+import json
+import hashlib
+import time
+import click
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import update
+from werkzeug.datastructures import FileStorage
+
+from app.models import db, Product, Category
+from app.shelves import build_breed_shelves
+from app.cross_sell import METRICS, build_associations
+from app.popularity import update_popularity
+from app.tracing import append_jsonl, format_trace, load_traces, spans_from_otlp
+from image_processor import make_placeholder, pil_image, process_product_image
+
+images_cli = AppGroup('images', help='Обслуживание изображений каталога.')
+shelves_cli = AppGroup('shelves', help='Персональные полки товаров на главной странице.')
+recommendations_cli = AppGroup('recommendations', help='Рекомендации "покупают вместе".')
+popularity_cli = AppGroup('popularity', help='Популярность товаров по просмотрам и добавлениям в корзину.')
+traces_cli = AppGroup('traces', help='Просмотр и сбор трассировок запросов.')
+blueprints_cli = AppGroup('blueprints', help='Блюпринты и пулы воркеров.')
+replica_cli = AppGroup('replica', help='Реплика БД для чтения.')
+
+
+def static_image_path(image_url):
+    """Return the absolute file path for a stored /static/... image URL, or None."""
+    if not image_url or '/static/' not in image_url:
+        return None
+    relative = image_url.split('/static/', 1)[1].split('?', 1)[0]
+    return os.path.join(current_app.static_folder, relative)
+
+
+@images_cli.command('placeholders')
+@click.option('--force', is_flag=True, help='Пересоздать уже существующие заглушки.')
+def generate_placeholders(force):
+    """Generate LQIP placeholders for products and categories that lack them."""
+    updated = 0
+    for model in (Product, Category):
+        query = model.query.filter(model.image.isnot(None))
+        if not force:
+            query = query.filter(model.image_placeholder.is_(None))
+        for obj in query.all():
+            path = static_image_path(obj.image)
+            if not path or not os.path.exists(path):
+                click.echo(f'Файл не найден: {obj.image}')
+                continue
+            try:
+                with pil_image().open(path) as img:
+                    obj.image_placeholder = make_placeholder(img)
+                updated += 1
+            except Exception as e:
+                click.echo(f'Ошибка при обработке {obj.image}: {e}')
+    db.session.commit()
+    click.echo(f'Обновлено заглушек: {updated}')
+
+
+# Columns that may identify a product in the import map, in order of preference
+IMPORT_KEY_COLUMNS = ('sku', 'slug', 'product_id')
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_import_journal(path):
+    """Load content hash -> {filename, placeholder} from a JSONL journal, skipping a torn last line."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[entry['sha256']] = entry
+    return done
+
+
+def _import_one(source_path, upload_folder):
+    """Process one source photo (runs in a worker process)."""
+    with open(source_path, 'rb') as f:
+        return process_product_image(FileStorage(f, filename=os.path.basename(source_path)),
+                                     upload_folder, size=(800, 800), with_placeholder=True)
+
+
+def _flush_image_updates(pending):
+    """Write a batch of Product image updates in one transaction."""
+    if pending:
+        db.session.execute(update(Product), pending)
+        db.session.commit()
+        pending.clear()
+
+
+@images_cli.command('import')
+@click.argument('source_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--map', 'map_file', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV с колонкой file и одной из колонок sku, slug, product_id.')
+@click.option('--workers', type=int, default=None, help='Число процессов (по умолчанию все ядра).')
+@click.option('--batch-size', type=int, default=200, show_default=True, help='Товаров на один commit.')
+@click.option('--state', 'state_file', type=click.Path(dir_okay=False), default=None,
+              help='Журнал для продолжения после прерывания (по умолчанию SOURCE_DIR/.images-import.jsonl).')
+def import_images(source_dir, map_file, workers, batch_size, state_file):
+    """Bulk-import product photos from SOURCE_DIR using a process pool."""
+    upload_folder = os.path.join(current_app.static_folder, 'images', 'products')
+    url_prefix = f'{current_app.static_url_path}/images/products/'
+    state_file = state_file or os.path.join(source_dir, '.images-import.jsonl')
+
+    # 1. Read the mapping
+    with open(map_file, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        key_column = next((c for c in IMPORT_KEY_COLUMNS if c in (reader.fieldnames or [])), None)
+        if 'file' not in (reader.fieldnames or []) or not key_column:
+            raise click.UsageError(f'CSV должен содержать колонку file и одну из: {", ".join(IMPORT_KEY_COLUMNS)}.')
+        rows = [(row[key_column].strip(), row['file'].strip()) for row in reader if row.get('file')]
+    if key_column == 'product_id':
+        # Ключ приводим к виду, в котором его вернет БД: иначе «007» не найдется как 7
+        rows = [(str(int(key)) if key.isdigit() else key, name) for key, name in rows]
+
+    # 2. Resolve products with a few chunked queries instead of one per row
+    column = Product.id if key_column == 'product_id' else getattr(Product, key_column)
+    keys = list({key for key, _ in rows})
+    if key_column == 'product_id':
+        keys = [int(key) for key in keys if key.isdigit()]
+    product_ids = {}
+    for i in range(0, len(keys), 500):
+        for key, product_id in db.session.query(column, Product.id).filter(column.in_(keys[i:i + 500])):
+            product_ids[str(key)] = product_id
+
+    # 3. Hash sources so identical photos are processed once
+    by_hash = {}
+    sources = {}
+    skipped = 0
+    for key, name in rows:
+        path = os.path.join(source_dir, name)
+        if key not in product_ids:
+            click.echo(f'Товар не найден: {key_column}={key}')
+            skipped += 1
+            continue
+        if not os.path.isfile(path):
+            click.echo(f'Файл не найден: {path}')
+            skipped += 1
+            continue
+        digest = file_sha256(path)
+        by_hash.setdefault(digest, []).append(product_ids[key])
+        sources.setdefault(digest, path)
+
+    done = load_import_journal(state_file)
+    todo = [digest for digest in by_hash if digest not in done]
+    click.echo(f'Фото: {len(by_hash)} уникальных, уже обработано: {len(by_hash) - len(todo)}, к обработке: {len(todo)}')
+
+    pending = []
+
+    def queue_updates(digest):
+        entry = done[digest]
+        for product_id in by_hash[digest]:
+            pending.append({'id': product_id, 'image': url_prefix + entry['filename'],
+                            'image_placeholder': entry['placeholder']})
+        if len(pending) >= batch_size:
+            _flush_image_updates(pending)
+
+    # Results from a previous (interrupted) run only need their DB rows written
+    for digest in by_hash:
+        if digest in done:
+            queue_updates(digest)
+
+    failed = 0
+    with open(state_file, 'a', encoding='utf-8') as journal, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {executor.submit(_import_one, sources[digest], upload_folder): digest for digest in todo}
+        try:
+            with click.progressbar(length=len(futures), label='Обработка') as bar:
+                for future in as_completed(futures):
+                    digest = futures[future]
+                    bar.update(1)
+                    try:
+                        filename, placeholder = future.result()
+                    except Exception as e:
+                        filename, placeholder = None, None
+                        click.echo(f'\nОшибка при обработке {sources[digest]}: {e}')
+                    if not filename:
+                        failed += 1
+                        continue
+                    done[digest] = {'sha256': digest, 'filename': filename, 'placeholder': placeholder}
+                    # Journal first: a crash after this line never reprocesses the photo
+                    journal.write(json.dumps(done[digest]) + '\n')
+                    journal.flush()
+                    queue_updates(digest)
+        finally:
+            for future in futures:
+                future.cancel()
+            _flush_image_updates(pending)
+
+    click.echo(f'Готово. Ошибок: {failed}, пропущено строк: {skipped}')
+
+
+@shelves_cli.command('rebuild')
+@click.option('--size', type=int, default=None, help='Товаров на полке (по умолчанию BREED_SHELF_SIZE).')
+def rebuild_shelves(size):
+    """Recompute the per-breed and per-pet-type product shelves; run periodically (e.g. from cron)."""
+    rows = build_breed_shelves(size)
+    click.echo(f'Записано позиций на полках: {rows}')
+
+
+@recommendations_cli.command('build')
+@click.option('--top-k', type=int, default=None, help='Связанных товаров на товар (по умолчанию CROSS_SELL_TOP_K).')
+@click.option('--metric', type=click.Choice(METRICS), default=None, help='Мера связи (по умолчанию CROSS_SELL_METRIC).')
+@click.option('--min-support', type=int, default=None, help='Минимум заказов с обоими товарами.')
+def build_recommendations(top_k, metric, min_support):
+    """Recompute "bought together" associations from order history; run periodically."""
+    start = time.perf_counter()
+    rows = build_associations(top_k=top_k, metric=metric, min_support=min_support)
+    click.echo(f'Записано связей: {rows} за {time.perf_counter() - start:.1f} с')
+
+
+@popularity_cli.command('update')
+def update_popularity_scores():
+    """Fold buffered events into the time-decayed popularity score; run periodically."""
+    rows = update_popularity()
+    click.echo(f'Обновлено товаров: {rows}')
+
+
+@traces_cli.command('show')
+@click.argument('trace_id', required=False)
+@click.option('--file', 'path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Файл трассировок (по умолчанию TRACE_FILE).')
+@click.option('--slowest', type=int, default=5, show_default=True, help='Сколько самых долгих трассировок показать.')
+def show_traces(trace_id, path, slowest):
+    """Print one trace, or the slowest traces, as a span tree."""
+    traces = load_traces(path or current_app.config['TRACE_FILE'])
+    if trace_id:
+        selected = [traces[trace_id]] if trace_id in traces else []
+    else:
+        def total(spans):
+            return max(s['end_ns'] for s in spans) - min(s['start_ns'] for s in spans)
+        selected = sorted(traces.values(), key=total, reverse=True)[:slowest]
+    if not selected:
+        click.echo('Трассировки не найдены.')
+    for spans in selected:
+        click.echo(f"trace {spans[0]['trace_id']}")
+        for line in format_trace(spans):
+            click.echo(line)
+        click.echo()
+
+
+@traces_cli.command('collect')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', type=int, default=4318, show_default=True)
+@click.option('--file', 'path', type=click.Path(dir_okay=False), default=None,
+              help='Куда дописывать спаны (по умолчанию TRACE_FILE).')
+def collect_traces(host, port, path):
+    """Stand-in OTLP/HTTP collector: accept JSON on /v1/traces and append spans as JSON lines."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import threading
+
+    path = path or current_app.config['TRACE_FILE']
+    max_bytes, backups = current_app.config['TRACE_FILE_MAX_BYTES'], current_app.config['TRACE_FILE_BACKUPS']
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip('/') != '/v1/traces':
+                self.send_error(404)
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                spans = list(spans_from_otlp(payload))
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            with lock:
+                append_jsonl(path, spans, max_bytes, backups)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    click.echo(f'Принимаю трассировки на http://{host}:{port}/v1/traces -> {path}')
+    ThreadingHTTPServer((host, port), Handler).serve_forever()
+
+
+@blueprints_cli.command('manifest')
+def write_blueprint_manifest():
+    """Regenerate app/routes/url_map.json from the routes of every blueprint."""
+    from app.routes import BLUEPRINTS, MANIFEST_PATH, build_manifest, pool_blueprints
+
+    if len(pool_blueprints(current_app.config)) != len(BLUEPRINTS):
+        raise click.ClickException('Запустите с APP_POOL=all: манифест строится по всем блюпринтам.')
+    rules = build_manifest(current_app)
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        # Одна запись на строку: изменения маршрутов хорошо видны в диффе
+        f.write('[\n' + ',\n'.join(json.dumps(rule, ensure_ascii=False) for rule in rules) + '\n]\n')
+    click.echo(f'Записано маршрутов: {len(rules)} -> {MANIFEST_PATH}')
+
+
+@replica_cli.command('sync')
+def sync_replica():
+    """Copy the primary SQLite file into the replica: a local stand-in for replication."""
+    from app.database import REPLICA_BIND, sync_sqlite_replica
+
+    if REPLICA_BIND not in current_app.config['SQLALCHEMY_BINDS']:
+        raise click.ClickException('Реплика не настроена: задайте DATABASE_REPLICA_URL.')
+    try:
+        primary, replica = sync_sqlite_replica(current_app)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Реплика обновлена: {primary} -> {replica}')
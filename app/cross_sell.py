@@ -0,0 +1,156 @@
+"""
+Item-to-item "bought together" recommendations.
+
+``flask recommendations build`` turns the order history into a sparse
+order x product incidence matrix X and computes the co-occurrence matrix
+C = X.T @ X with SciPy. Every pair seen in at least ``min_support`` orders
+is scored, and the top K partners of each product are written to
+``product_associations``, keyed by (product_id, rank). Pages read them back
+with a single indexed query.
+
+Scores:
+
+* ``cosine``: C[i, j] / sqrt(n_i * n_j), symmetric and in [0, 1];
+* ``lift``: C[i, j] * N / (n_i * n_j), > 1 when bought together more often
+  than chance.
+
+NumPy and SciPy are imported only by the batch job, so web workers do not
+load them.
+"""
+
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app.models import db, Order, OrderItem, OrderStatus, Product, ProductAssociation
+
+METRICS = ('cosine', 'lift')
+
+# Rows fetched per round trip when streaming order lines
+FETCH_CHUNK = 100_000
+
+
+def load_order_lines(chunk_size=FETCH_CHUNK):
+    """Return (order_ids, product_ids) int64 arrays for every non-cancelled order line."""
+    import numpy as np
+
+    stmt = (
+        select(OrderItem.order_id, OrderItem.product_id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.status != OrderStatus.CANCELLED)
+        .execution_options(yield_per=chunk_size)
+    )
+    order_chunks, product_chunks = [], []
+    for partition in db.session.execute(stmt).partitions():
+        lines = np.array(partition, dtype=np.int64).reshape(-1, 2)
+        order_chunks.append(lines[:, 0])
+        product_chunks.append(lines[:, 1])
+    if not order_chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(order_chunks), np.concatenate(product_chunks)
+
+
+def compute_associations(order_ids, product_ids, top_k=10, metric='cosine', min_support=2):
+    """
+    Score co-purchased product pairs.
+
+    :return: (product_ids, related_ids, ranks, scores, counts) NumPy arrays,
+             ranks starting at 0 within each product.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    if metric not in METRICS:
+        raise ValueError(f'Unknown metric: {metric}')
+    empty = tuple(np.empty(0, dtype=dtype) for dtype in (np.int64, np.int64, np.int64, np.float64, np.int64))
+    if len(order_ids) == 0:
+        return empty
+
+    # Compact ids to matrix coordinates
+    orders, order_index = np.unique(order_ids, return_inverse=True)
+    products, product_index = np.unique(product_ids, return_inverse=True)
+
+    # Binary incidence: a product counted once per order, whatever the quantity or repeated lines
+    incidence = sparse.csr_matrix(
+        (np.ones(len(order_index), dtype=np.float32), (order_index, product_index)),
+        shape=(len(orders), len(products)),
+    )
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+
+    # Orders containing each product, then pair counts
+    support = np.asarray(incidence.sum(axis=0)).ravel()
+    cooc = (incidence.T @ incidence).tocoo()
+
+    rows, cols, counts = cooc.row, cooc.col, cooc.data
+    keep = (rows != cols) & (counts >= min_support)
+    rows, cols, counts = rows[keep], cols[keep], counts[keep]
+    if len(rows) == 0:
+        return empty
+
+    if metric == 'cosine':
+        scores = counts / np.sqrt(support[rows] * support[cols])
+    else:
+        scores = counts * len(orders) / (support[rows] * support[cols])
+
+    # Top K per product: sort by (product, -score, -count, partner) and take each product's first K
+    order = np.lexsort((cols, -counts, -scores, rows))
+    rows, cols, scores, counts = rows[order], cols[order], scores[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    ranks = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    top = ranks < top_k
+
+    return (
+        products[rows[top]],
+        products[cols[top]],
+        ranks[top],
+        scores[top].astype(np.float64),
+        counts[top].astype(np.int64),
+    )
+
+
+def build_associations(top_k=None, metric=None, min_support=None, batch_size=10_000):
+    """Recompute product_associations from the order history; returns the number of rows written."""
+    config = current_app.config
+    top_k = top_k or config['CROSS_SELL_TOP_K']
+    metric = metric or config['CROSS_SELL_METRIC']
+    min_support = min_support or config['CROSS_SELL_MIN_SUPPORT']
+
+    product_ids, related_ids, ranks, scores, counts = compute_associations(
+        *load_order_lines(), top_k=top_k, metric=metric, min_support=min_support)
+
+    now = datetime.now(timezone.utc)
+    # Таблица заменяется целиком в одной транзакции
+    ProductAssociation.query.delete(synchronize_session=False)
+    for start in range(0, len(product_ids), batch_size):
+        end = start + batch_size
+        db.session.execute(ProductAssociation.__table__.insert(), [
+            {'product_id': int(p), 'rank': int(r), 'related_product_id': int(rel),
+             'score': float(s), 'co_count': int(c), 'built_at': now}
+            for p, rel, r, s, c in zip(product_ids[start:end], related_ids[start:end], ranks[start:end],
+                                       scores[start:end], counts[start:end])
+        ])
+    db.session.commit()
+    return len(product_ids)
+
+
+def bought_together(product_ids, limit=6):
+    """Active products most often bought with any of product_ids, in a single indexed query."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return []
+    best_score = func.max(ProductAssociation.score)
+    return (
+        Product.query
+        .join(ProductAssociation, ProductAssociation.related_product_id == Product.id)
+        .filter(
+            ProductAssociation.product_id.in_(product_ids),
+            Product.id.notin_(product_ids),
+            Product.is_active.is_(True),
+        )
+        .group_by(Product.id)
+        .order_by(best_score.desc(), Product.id)
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,168 @@
+"""
+Database engine tuning.
+
+SQLite is configured on every new DBAPI connection:
+
+* ``journal_mode=WAL`` lets readers run while a writer commits, so catalog
+  pages no longer block checkouts and admin edits;
+* ``synchronous=NORMAL`` is durable in WAL mode except for the last commits
+  on power loss, and avoids an fsync per transaction;
+* ``busy_timeout`` makes a writer wait for the lock instead of failing
+  with ``database is locked`` at once;
+* ``mmap_size``, ``cache_size`` and ``temp_store=memory`` keep hot pages and
+  temporary b-trees (ORDER BY, GROUP BY) in memory.
+
+Server databases (Postgres) get pool settings instead, see
+``engine_options()`` in config.py.
+
+Read replica
+------------
+
+With DATABASE_REPLICA_URL set, the replica is the ``replica`` bind and
+``db.session`` is a ``RoutingSession``. During GET requests to
+REPLICA_ENDPOINTS (catalog pages, order history) SELECT statements go to
+the replica; flushes, non-SELECT statements and every other request use the
+primary. After a request writes, the user's session cookie pins their reads
+to the primary for REPLICA_STICKY_SECONDS, so a replica that lags behind
+(the cart right after ``add_to_cart``, the orders right after ``checkout``)
+is not visible to them.
+
+Locally, two SQLite files stand in for the pair: ``flask replica sync``
+copies the primary into the replica, and the replica's connections are
+opened with ``query_only`` so an accidental write fails loudly.
+"""
+
+import sqlite3
+import time
+
+from flask import g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+
+# Ключ в cookie-сессии: до этого момента пользователь читает с primary
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements for a new SQLite connection, in execution order."""
+    pragmas = [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+        ('temp_store', config['SQLITE_TEMP_STORE']),
+    ]
+    return [f'PRAGMA {name}={value}' for name, value in pragmas if value not in (None, '')]
+
+
+def pragma_values(connection):
+    """Current values of the tuned pragmas on a DBAPI connection (for diagnostics)."""
+    cursor = connection.cursor()
+    try:
+        return {name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store')}
+    finally:
+        cursor.close()
+
+
+def tune_sqlite(engine, config, read_only=False):
+    """Run the configured pragmas on every new connection of a SQLite engine."""
+    if engine.dialect.name != 'sqlite':
+        return
+    statements = sqlite_pragmas(config)
+    if read_only:
+        statements.append('PRAGMA query_only=1')
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def compiled_cache_usage(engine):
+    """(entries, capacity) of the engine's SQL compilation cache, or None when it is disabled."""
+    # SQLAlchemy не дает публичного доступа к кэшу: читаем его только здесь
+    cache = getattr(engine, '_compiled_cache', None)
+    if cache is None:
+        return None
+    return len(cache), cache.capacity
+
+
+def reads_from_replica():
+    return has_app_context() and g.get('db_route') == REPLICA_BIND
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the replica while the request is routed there."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and getattr(clause, 'is_select', False)
+                and reads_from_replica() and REPLICA_BIND in self._db.engines):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    # Запись в запросе: дальше в нем и в следующих запросах пользователя читаем с primary
+    if has_app_context():
+        g.db_route = None
+        g.db_wrote = True
+
+
+def sync_sqlite_replica(app):
+    """Copy the primary SQLite database into the replica (local stand-in for replication)."""
+    from app.models import db
+
+    with app.app_context():
+        primary, replica = db.engines[None], db.engines[REPLICA_BIND]
+        paths = [engine.url.database for engine in (primary, replica)
+                 if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:')]
+        if len(paths) != 2:
+            raise ValueError('Синхронизация реплики поддерживается только для двух файлов SQLite')
+        replica.dispose()
+        source, target = sqlite3.connect(paths[0]), sqlite3.connect(paths[1])
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        return paths
+
+
+def init_replica_routing(app):
+    endpoints = set(app.config['REPLICA_ENDPOINTS'])
+
+    @app.before_request
+    def route_reads_to_replica():
+        if request.method not in ('GET', 'HEAD') or request.endpoint not in endpoints:
+            return
+        if session.get(PRIMARY_UNTIL_KEY, 0) > time.time():
+            return
+        g.db_route = REPLICA_BIND
+
+    @app.after_request
+    def pin_writer_to_primary(response):
+        if g.get('db_wrote'):
+            session[PRIMARY_UNTIL_KEY] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
+
+
+def init_database(app):
+    from app.models import db
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            tune_sqlite(engine, app.config, read_only=key == REPLICA_BIND)
+    if REPLICA_BIND in app.config['SQLALCHEMY_BINDS']:
+        # У реплики нет своих моделей, а пустые метаданные bind'а Flask-SQLAlchemy хранит в общем db:
+        # create_all()/drop_all() любого приложения без реплики в этом процессе падали бы на них
+        db.metadatas.pop(REPLICA_BIND, None)
+        init_replica_routing(app)
@@ -0,0 +1,127 @@
+"""
+Per-request instrumentation.
+
+For every request this records wall time, time spent in SQL, the number of
+queries and template render time, and reports them in a ``Server-Timing``
+header (visible in the browser's network panel):
+
+    Server-Timing: app;dur=182.4, db;dur=41.7;desc="12 queries", tpl;dur=23.9
+
+Requests slower than SLOW_REQUEST_THRESHOLD_MS are logged together with
+their slowest SQL statements.
+"""
+
+import time
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestStats:
+    """Timings collected while serving one request."""
+
+    __slots__ = ('started', 'db_time', 'query_count', 'template_time', 'statements', '_template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.query_count = 0
+        self.template_time = 0.0
+        self.statements = []  # (seconds, sql)
+        self._template_started = []
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_stats():
+    """Return the RequestStats of the current request, or None outside a request."""
+    if not has_request_context():
+        return None
+    return g.get('request_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_stats() is not None:
+        # Время старта храним в контексте выполнения: он свой у каждого запроса и не переживает ошибку
+        context.petshop_query_started = time.perf_counter()
+
+
+def _record_query(context, statement):
+    stats = current_stats()
+    started = getattr(context, 'petshop_query_started', None)
+    if stats is None or started is None:
+        return
+    context.petshop_query_started = None
+    duration = time.perf_counter() - started
+    stats.db_time += duration
+    stats.query_count += 1
+    stats.statements.append((duration, statement))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(context, statement)
+
+
+def _handle_db_error(exception_context):
+    # Упавший запрос тоже занял время БД
+    if exception_context.execution_context is not None:
+        _record_query(exception_context.execution_context, exception_context.statement)
+
+
+def _before_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None:
+        stats._template_started.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None and stats._template_started:
+        stats.template_time += time.perf_counter() - stats._template_started.pop()
+
+
+def server_timing(stats):
+    """Format stats as a Server-Timing header value (durations in ms)."""
+    return ', '.join([
+        f'app;dur={stats.elapsed * 1000:.1f}',
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries"',
+        f'tpl;dur={stats.template_time * 1000:.1f}',
+    ])
+
+
+def init_instrumentation(app):
+    """Install the SQL listeners, template signals and request hooks on app."""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_db_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def report_request_stats(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+
+        if app.config['SERVER_TIMING_ENABLED']:
+            response.headers['Server-Timing'] = server_timing(stats)
+
+        threshold = app.config['SLOW_REQUEST_THRESHOLD_MS']
+        elapsed_ms = stats.elapsed * 1000
+        if threshold and elapsed_ms >= threshold:
+            slowest = sorted(stats.statements, key=lambda s: s[0], reverse=True)
+            lines = [f'{duration * 1000:8.1f} ms  {" ".join(sql.split())[:500]}'
+                     for duration, sql in slowest[:app.config['SLOW_REQUEST_MAX_STATEMENTS']]]
+            app.logger.warning(
+                'Slow request %s %s (%s): %.1f ms, db %.1f ms in %d queries, templates %.1f ms%s',
+                request.method, request.path, request.endpoint, elapsed_ms, stats.db_time * 1000,
+                stats.query_count, stats.template_time * 1000, ''.join('\n' + line for line in lines))
+        return response
@@ -0,0 +1,189 @@
+"""
+Memory diagnostics for a running worker (admin page /admin/memory).
+
+Everything here is per process: tracemalloc state and snapshots live in the
+worker that served the request, so the page shows its PID. With several
+workers, repeat an action until it lands on the worker being investigated.
+
+* tracemalloc can be started and stopped without a restart; snapshots are kept
+  in memory (the newest MEMORY_MAX_SNAPSHOTS), and any two can be diffed to
+  see which allocation sites grew;
+* live SQLAlchemy sessions are found through the garbage collector and
+  reported with their identity-map sizes, so sessions kept alive by a thread
+  or a long admin listing show up;
+* in-process caches (SQL compilation cache, Jinja template cache, the breed
+  index, buffered popularity counters, the trace export queue) and the most
+  common object types are listed with their sizes.
+"""
+
+import gc
+import os
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+# Собственные аллокации tracemalloc и импорт модулей только мешают
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+class SnapshotStore:
+    """Numbered tracemalloc snapshots of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = []  # [(id, label, taken_at, traced_bytes, snapshot)]
+        self._next_id = 1
+
+    def take(self, label, keep):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc не запущен')
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        traced, _ = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots.append((snapshot_id, label, datetime.now(timezone.utc), traced, snapshot))
+            del self._snapshots[:-keep]
+        return snapshot_id
+
+    def get(self, snapshot_id):
+        with self._lock:
+            for entry in self._snapshots:
+                if entry[0] == snapshot_id:
+                    return entry[4]
+        return None
+
+    def listing(self):
+        with self._lock:
+            return [{'id': sid, 'label': label, 'taken_at': taken_at, 'traced_bytes': traced}
+                    for sid, label, taken_at, traced, _ in self._snapshots]
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+snapshots = SnapshotStore()
+
+
+def start_tracing(frames=1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    """Stop tracemalloc; taken snapshots stay available."""
+    tracemalloc.stop()
+
+
+def tracing_status():
+    status = {'tracing': tracemalloc.is_tracing(), 'frames': tracemalloc.get_traceback_limit()}
+    if status['tracing']:
+        status['current'], status['peak'] = tracemalloc.get_traced_memory()
+        status['overhead'] = tracemalloc.get_tracemalloc_memory()
+    return status
+
+
+def _format_traceback(traceback):
+    return [f'{frame.filename}:{frame.lineno}' for frame in reversed(traceback)]
+
+
+def top_allocations(snapshot, key_type='lineno', limit=25):
+    """Largest allocation sites of a snapshot."""
+    return [{'size': stat.size, 'count': stat.count, 'where': _format_traceback(stat.traceback)}
+            for stat in snapshot.statistics(key_type)[:limit]]
+
+
+def compare_snapshots(old, new, key_type='lineno', limit=25):
+    """Allocation sites that grew the most between two snapshots."""
+    return [{'size': stat.size, 'size_diff': stat.size_diff, 'count': stat.count, 'count_diff': stat.count_diff,
+             'where': _format_traceback(stat.traceback)}
+            for stat in new.compare_to(old, key_type)[:limit]]
+
+
+def process_memory():
+    """Resident set size and its peak in bytes (from /proc on Linux)."""
+    usage = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    key, value = line.split(':', 1)
+                    usage['rss' if key == 'VmRSS' else 'rss_peak'] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        usage['rss_peak'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage
+
+
+def session_stats():
+    """Live SQLAlchemy sessions with their identity-map sizes, largest first."""
+    sessions = []
+    for obj in gc.get_objects():
+        if isinstance(obj, Session):
+            sessions.append({
+                'identity_map': len(obj.identity_map),
+                'new': len(obj.new),
+                'dirty': len(obj.dirty),
+                'in_transaction': obj.in_transaction(),
+            })
+    return sorted(sessions, key=lambda s: s['identity_map'], reverse=True)
+
+
+def cache_sizes(app):
+    """Entry counts of the process's in-memory caches and buffers."""
+    from app import popularity
+    from app.database import compiled_cache_usage
+    from app.models import db
+
+    caches = []
+    with app.app_context():
+        for key, engine in db.engines.items():
+            usage = compiled_cache_usage(engine)
+            if usage is not None:
+                caches.append((f'SQLAlchemy compiled cache ({key or "primary"})', *usage))
+    if app.jinja_env.cache is not None:
+        caches.append(('Jinja template cache', len(app.jinja_env.cache), getattr(app.jinja_env.cache, 'capacity', None)))
+
+    index = app.extensions.get('breed_index')
+    if index is not None:
+        products = sum(len(items) for items in index.breed_products.values())
+        caches.append(('Breed index: breeds', len(index.breeds), None))
+        caches.append(('Breed index: product entries', products, None))
+
+    views, cart_adds = popularity.pending()
+    caches.append(('Popularity buffer: products', len(views.keys() | cart_adds.keys()), None))
+
+    tracer = app.extensions.get('tracer')
+    if tracer is not None:
+        caches.append(('Trace export queue', *tracer.queue_usage()))
+    return [{'name': name, 'entries': entries, 'capacity': capacity} for name, entries, capacity in caches]
+
+
+def object_counts(limit=25):
+    """Most common object types tracked by the garbage collector."""
+    counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+    return counts.most_common(limit)
+
+
+def report(app):
+    return {
+        'pid': os.getpid(),
+        'process': process_memory(),
+        'tracemalloc': tracing_status(),
+        'snapshots': snapshots.listing(),
+        'sessions': session_stats(),
+        'caches': cache_sizes(app),
+        'objects': object_counts(),
+        'gc_counts': gc.get_count(),
+    }
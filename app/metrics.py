@@ -0,0 +1,191 @@
+"""
+Prometheus metrics, exposed in text format at ``/metrics``.
+
+Collected per process:
+
+* request latency histograms and request counts per endpoint and status;
+* unhandled exceptions per endpoint;
+* DB pool checkouts, checkout wait time and connections in use, per engine
+  (``primary`` and, with DATABASE_REPLICA_URL, ``replica``);
+* e-mail sends (latency, result) and sends in flight;
+* breed classifier call latency per backend/outcome and queued detection jobs.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory before the workers start (see the gunicorn config).
+prometheus_client then keeps the values in shared files and ``/metrics``
+aggregates all workers, whichever one serves the scrape.
+
+``/metrics`` answers to a scraper sending ``Authorization: Bearer
+<METRICS_TOKEN>``, to a signed-in admin, and to client addresses in
+METRICS_ALLOWED_IPS (empty by default). Behind a reverse proxy every request
+comes from the proxy's address, so the allow-list is only meaningful with
+PROXY_FIX_X_FOR set to the number of proxies in front of the app.
+"""
+
+import hmac
+import os
+import time
+from functools import wraps
+
+from flask import Response, abort, current_app, got_request_exception, request
+from flask_login import current_user
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess, REGISTRY)
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    'petshop_http_request_duration_seconds', 'Request latency by endpoint.',
+    ['endpoint', 'method'], buckets=LATENCY_BUCKETS)
+REQUESTS = Counter(
+    'petshop_http_requests_total', 'Requests by endpoint and status code.',
+    ['endpoint', 'method', 'status'])
+EXCEPTIONS = Counter(
+    'petshop_http_exceptions_total', 'Unhandled exceptions by endpoint.', ['endpoint'])
+
+DB_CHECKOUTS = Counter('petshop_db_pool_checkouts_total', 'Connections checked out of the pool.', ['bind'])
+DB_CHECKOUT_WAIT = Histogram(
+    'petshop_db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection.', ['bind'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+DB_IN_USE = Gauge(
+    'petshop_db_pool_connections_in_use', 'Connections currently checked out.', ['bind'],
+    multiprocess_mode='livesum')
+
+EMAIL_LATENCY = Histogram(
+    'petshop_email_send_duration_seconds', 'SMTP send latency.', ['result'], buckets=LATENCY_BUCKETS)
+EMAILS_IN_FLIGHT = Gauge(
+    'petshop_emails_in_flight', 'E-mails currently being sent.', multiprocess_mode='livesum')
+
+CLASSIFIER_LATENCY = Histogram(
+    'petshop_breed_classifier_duration_seconds', 'Breed classifier (model) call latency.',
+    ['backend', 'outcome'], buckets=LATENCY_BUCKETS + (15.0, 30.0))
+CLASSIFIER_REJECTED = Counter(
+    'petshop_breed_classifier_rejected_total', 'Calls rejected before reaching the model.', ['reason'])
+BREED_JOBS_QUEUED = Gauge(
+    'petshop_breed_jobs_queued', 'Breed detection jobs waiting for or running in the worker pool.',
+    multiprocess_mode='livesum')
+
+
+def multiprocess_enabled():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def render_metrics():
+    """Return the Prometheus text exposition for this process or, in multiprocess mode, all workers."""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+def _endpoint_label():
+    # Несуществующие URL не должны раздувать число временных рядов
+    return request.endpoint or 'unmatched'
+
+
+def _time_pool_waits(pool, bind):
+    connect = pool.connect
+
+    @wraps(connect)
+    def timed_connect(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return connect(*args, **kwargs)
+        finally:
+            DB_CHECKOUT_WAIT.labels(bind).observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+
+def instrument_pool(engine, bind='primary'):
+    """Count checkouts and time pool waits for engine, labelled with its bind."""
+    if getattr(engine, '_petshop_instrumented', False):
+        return
+    engine._petshop_instrumented = True
+    _time_pool_waits(engine.pool, bind)
+
+    # dispose() (прогрев, after_fork) заменяет пул новым объектом: слушатели событий переходят
+    # в него сами, а обертку connect ставим заново
+    @event.listens_for(engine, 'engine_disposed')
+    def on_dispose(engine):
+        _time_pool_waits(engine.pool, bind)
+
+    @event.listens_for(engine.pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_CHECKOUTS.labels(bind).inc()
+        DB_IN_USE.labels(bind).inc()
+
+    @event.listens_for(engine.pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        DB_IN_USE.labels(bind).dec()
+
+
+def instrument_mail(mail):
+    """Time every Mail.send and track sends in flight."""
+    send = mail.send
+    if getattr(send, '_petshop_instrumented', False):
+        return
+
+    @wraps(send)
+    def timed_send(message):
+        start = time.perf_counter()
+        result = 'error'
+        with EMAILS_IN_FLIGHT.track_inprogress():
+            try:
+                value = send(message)
+                result = 'sent'
+                return value
+            finally:
+                EMAIL_LATENCY.labels(result).observe(time.perf_counter() - start)
+
+    timed_send._petshop_instrumented = True
+    mail.send = timed_send
+
+
+def metrics_allowed():
+    token = current_app.config['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    allowed = {ip.strip() for ip in current_app.config['METRICS_ALLOWED_IPS'].split(',') if ip.strip()}
+    if request.remote_addr in allowed:
+        return True
+    return current_user.is_authenticated and current_user.is_admin()
+
+
+def init_metrics(app):
+    """Register request hooks, instrument the pool and mail, and add the /metrics endpoint."""
+    from app import mail
+    from app.models import db
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            instrument_pool(engine, key or 'primary')
+    instrument_mail(mail)
+
+    @app.before_request
+    def start_request_timer():
+        request.environ['petshop.started'] = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = request.environ.get('petshop.started')
+        if started is not None and request.endpoint != 'metrics':
+            endpoint = _endpoint_label()
+            REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+            REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        return response
+
+    def count_exception(sender, exception, **extra):
+        EXCEPTIONS.labels(_endpoint_label()).inc()
+
+    got_request_exception.connect(count_exception, app, weak=False)
+
+    def metrics():
+        if not metrics_allowed():
+            abort(404)
+        return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
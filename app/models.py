@@ -8,7 +8,9 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timezone
 import enum
 
-db = SQLAlchemy()
+from app.database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 # ============================================================================
@@ -78,8 +80,8 @@ class User(UserMixin, db.Model):
     phone = db.Column(db.String(20))
     
     # Account status
-    is_verified = db.Column(db.Boolean, default=False)
-    verification_token = db.Column(db.String(255))
+    is_verified = db.Column(db.Boolean, default=False, index=True)
+    verification_token = db.Column(db.String(255), index=True)
     verification_token_expires = db.Column(db.DateTime)
     
     # Privacy & consent
@@ -99,6 +101,7 @@ class User(UserMixin, db.Model):
     orders = db.relationship('Order', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     reviews = db.relationship('Review', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     favorites = db.relationship('Favorite', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    pets = db.relationship('Pet', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
         "Hash and set password."
@@ -144,6 +147,7 @@ class Category(db.Model):
     slug = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text)
     image = db.Column(db.String(255))
+    image_placeholder = db.Column(db.Text)  # LQIP data URI shown until the image loads
     is_popular = db.Column(db.Boolean, default=False) # New column for Popular Categories
     
     # Display order
@@ -153,6 +157,9 @@ class Category(db.Model):
     # Timestamps
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+
+    # Популярные категории на главной: фильтр и сортировка по одному индексу
+    __table_args__ = (db.Index('ix_categories_is_active_is_popular_display_order', 'is_active', 'is_popular', 'display_order'),)
     
     # Relationships
     products = db.relationship('Product', backref='category', lazy='dynamic', cascade='all, delete-orphan')
@@ -187,6 +194,124 @@ product_breeds = db.Table('product_breeds',
     db.Column('breed_id', db.Integer, db.ForeignKey('breeds.id'), primary_key=True)
 )
 
+# ============================================================================
+# BREED DETECTION CACHE TABLE
+# ============================================================================
+
+class BreedDetectionCache(db.Model):
+    "Cached breed detection result keyed by a perceptual hash of the photo."
+    __tablename__ = 'breed_detection_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    image_hash = db.Column(db.String(16), nullable=False, index=True)  # 64-bit dHash as hex
+    result_data = db.Column(db.Text, nullable=False)  # JSON returned by the model
+    hit_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    last_used_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<BreedDetectionCache {self.image_hash}>'
+
+# ============================================================================
+# BREED DETECTION JOBS TABLE
+# ============================================================================
+
+class BreedDetectionJob(db.Model):
+    "Asynchronous breed detection request; polled by the client until it finishes."
+    __tablename__ = 'breed_detection_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, handed to the client
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    batch_id = db.Column(db.String(32), index=True)  # shared by photos uploaded in one request
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, running, done, error
+    image_hash = db.Column(db.String(16))
+    result_data = db.Column(db.Text)  # JSON returned by the classifier
+    error = db.Column(db.Text)
+    from_cache = db.Column(db.Boolean, default=False)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    finished_at = db.Column(db.DateTime)
+
+    def get_result(self):
+        """Returns the parsed classifier result or None."""
+        import json
+        return json.loads(self.result_data) if self.result_data else None
+
+    def __repr__(self):
+        return f'<BreedDetectionJob {self.id} {self.status}>'
+
+# ============================================================================
+# BREED SHELVES TABLE
+# ============================================================================
+
+class BreedShelf(db.Model):
+    "Precomputed product shelf for a breed, rebuilt periodically by 'flask shelves rebuild'."
+    __tablename__ = 'breed_shelves'
+
+    breed_id = db.Column(db.Integer, db.ForeignKey('breeds.id'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    built_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f'<BreedShelf breed_id={self.breed_id} #{self.position} product_id={self.product_id}>'
+
+
+class PetTypeShelf(db.Model):
+    "Precomputed product shelf for a pet type, shown for pets declared without a breed."
+    __tablename__ = 'pet_type_shelves'
+
+    pet_type = db.Column(db.String(50), primary_key=True)  # 'собака', 'кошка'
+    position = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    built_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f'<PetTypeShelf {self.pet_type} #{self.position} product_id={self.product_id}>'
+
+# ============================================================================
+# PRODUCT ASSOCIATIONS TABLE
+# ============================================================================
+
+class ProductAssociation(db.Model):
+    "Product frequently bought together with another, rebuilt by 'flask recommendations build'."
+    __tablename__ = 'product_associations'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 0 = strongest association
+    related_product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)  # cosine or lift, see app/cross_sell.py
+    co_count = db.Column(db.Integer, nullable=False)  # orders containing both products
+    built_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f'<ProductAssociation {self.product_id} -> {self.related_product_id} ({self.score:.3f})>'
+
+# ============================================================================
+# PRODUCT STATS TABLE
+# ============================================================================
+
+class ProductStat(db.Model):
+    "Buffered view/add-to-cart counters and decayed popularity score of a product."
+    __tablename__ = 'product_stats'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    views = db.Column(db.Integer, default=0, nullable=False)
+    cart_adds = db.Column(db.Integer, default=0, nullable=False)
+
+    # Events not yet folded into popularity by 'flask popularity update'
+    pending_views = db.Column(db.Integer, default=0, nullable=False)
+    pending_cart_adds = db.Column(db.Integer, default=0, nullable=False)
+
+    popularity = db.Column(db.Float, default=0.0, nullable=False, index=True)
+    scored_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ProductStat product_id={self.product_id} popularity={self.popularity:.1f}>'
+
 # ============================================================================
 # PRODUCTS TABLE
 # ============================================================================
@@ -216,6 +341,7 @@ class Product(db.Model):
     
     # Media
     image = db.Column(db.String(255))
+    image_placeholder = db.Column(db.Text)  # LQIP data URI shown until the image loads
     
     # Display
     badge = db.Column(db.String(50))  # e.g., "NEW", "SALE", "HOT"
@@ -226,21 +352,46 @@ class Product(db.Model):
     # Timestamps
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+
+    # Рекомендуемые товары на главной
+    __table_args__ = (db.Index('ix_products_is_active_is_recommended', 'is_active', 'is_recommended'),)
     
     # Relationships
-    cart_items = db.relationship('CartItem', backref='product', lazy='dynamic', cascade='all, delete-orphan')
-    order_items = db.relationship('OrderItem', backref='product', lazy='dynamic', cascade='all, delete-orphan')
+    # Позиции корзины, заказа и избранного всегда показываются вместе с товаром: грузим его JOIN-ом
+    cart_items = db.relationship('CartItem', backref=db.backref('product', lazy='joined'), lazy='dynamic', cascade='all, delete-orphan')
+    order_items = db.relationship('OrderItem', backref=db.backref('product', lazy='joined'), lazy='dynamic', cascade='all, delete-orphan')
     reviews = db.relationship('Review', backref='product', lazy='dynamic', cascade='all, delete-orphan')
-    favorites = db.relationship('Favorite', backref='product', lazy='dynamic', cascade='all, delete-orphan')
-    
+    favorites = db.relationship('Favorite', backref=db.backref('product', lazy='joined'), lazy='dynamic', cascade='all, delete-orphan')
+    # Производные таблицы (полки, «покупают вместе», счетчики) удаляются вместе с товаром
+    stat = db.relationship('ProductStat', uselist=False, cascade='all, delete-orphan')
+    shelf_entries = db.relationship('BreedShelf', lazy='dynamic', cascade='all, delete-orphan')
+    pet_type_shelf_entries = db.relationship('PetTypeShelf', lazy='dynamic', cascade='all, delete-orphan')
+    associations = db.relationship('ProductAssociation', foreign_keys='ProductAssociation.product_id',
+                                   lazy='dynamic', cascade='all, delete-orphan')
+    associated_with = db.relationship('ProductAssociation', foreign_keys='ProductAssociation.related_product_id',
+                                      lazy='dynamic', cascade='all, delete-orphan')
+
     @property
     def average_rating(self):
-        "Calculate the average rating for the product."
-        reviews = [review for review in self.reviews if review.is_approved]
-        if not reviews:
-            return 0.0
-        total_rating = sum(review.rating for review in reviews)
-        return round(total_rating / len(reviews), 1)
+        "Average rating of approved reviews (preloaded for listings by preload_average_ratings)."
+        rating = getattr(self, '_average_rating', None)
+        if rating is None:
+            rating = self._average_rating = Product.average_ratings([self.id]).get(self.id, 0.0)
+        return rating
+
+    @staticmethod
+    def average_ratings(product_ids):
+        "Average approved-review rating per product id, in one query."
+        rows = db.session.query(Review.product_id, db.func.avg(Review.rating)).filter(
+            Review.product_id.in_(product_ids), Review.is_approved == True).group_by(Review.product_id)
+        return {product_id: round(rating, 1) for product_id, rating in rows}
+
+    @staticmethod
+    def preload_average_ratings(products):
+        "Fill average_rating of every product with a single query instead of one per product."
+        ratings = Product.average_ratings([product.id for product in products])
+        for product in products:
+            product._average_rating = ratings.get(product.id, 0.0)
 
     def __repr__(self):
         return f'<Product {self.name}>'
@@ -320,6 +471,32 @@ class Address(db.Model):
         return f'<Address {self.city}>'
 
 
+# ============================================================================
+# PETS TABLE
+# ============================================================================
+
+class Pet(db.Model):
+    "User pet, declared in the profile or remembered from breed detection."
+    __tablename__ = 'pets'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    breed_id = db.Column(db.Integer, db.ForeignKey('breeds.id'), nullable=True)
+
+    name = db.Column(db.String(80))
+    pet_type = db.Column(db.String(50), nullable=False)  # 'собака', 'кошка'
+    source = db.Column(db.String(20), default='declared', nullable=False)  # declared, detected
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    # Relationships
+    breed = db.relationship('Breed')
+
+    def __repr__(self):
+        return f'<Pet {self.name or self.pet_type} user_id={self.user_id}>'
+
+
 # ============================================================================
 # ORDERS TABLE
 # ============================================================================
@@ -355,9 +532,16 @@ class Order(db.Model):
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
     shipped_at = db.Column(db.DateTime)
     delivered_at = db.Column(db.DateTime)
+
+    # История заказов пользователя и список заказов в админке с фильтром по статусу
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_orders_status_created_at', 'status', 'created_at'),
+    )
     
     # Relationships
-    items = db.relationship('OrderItem', backref='order', lazy='dynamic', cascade='all, delete-orphan')
+    # Список, а не запрос: позиции можно загрузить заранее (selectinload) для списка заказов
+    items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Order {self.order_number}>'
@@ -420,7 +604,11 @@ class Review(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
     
-    __table_args__ = (db.UniqueConstraint('product_id', 'user_id', name='unique_product_user_review'),)
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'user_id', name='unique_product_user_review'),
+        # Одобренные отзывы на странице товара
+        db.Index('ix_reviews_product_id_is_approved', 'product_id', 'is_approved'),
+    )
     
     def __repr__(self):
         return f'<Review product_id={self.product_id} user_id={self.user_id}>'
@@ -438,7 +626,7 @@ class Subscriber(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     is_active = db.Column(db.Boolean, default=True)
     is_verified = db.Column(db.Boolean, default=False)
-    verification_token = db.Column(db.String(255))
+    verification_token = db.Column(db.String(255), index=True)
     verification_token_expires = db.Column(db.DateTime)
 
     # Timestamps
@@ -446,6 +634,9 @@ class Subscriber(db.Model):
     verified_at = db.Column(db.DateTime)
     unsubscribed_at = db.Column(db.DateTime)
 
+    # Рассылки промокодов подтвержденным активным подписчикам
+    __table_args__ = (db.Index('ix_subscribers_is_verified_is_active', 'is_verified', 'is_active'),)
+
     def __repr__(self):
         return f'<Subscriber {self.email}>'
 
@@ -0,0 +1,203 @@
+"""
+Buffered product view / add-to-cart counters and popularity ranking.
+
+Request handlers only bump an in-process counter. A daemon thread per worker
+flushes the buffer every POPULARITY_FLUSH_INTERVAL seconds as a single
+executemany upsert (one row per touched product) into ``product_stats``.
+
+``flask popularity update`` (run periodically, e.g. from cron) folds the
+events collected since the previous run into an exponentially decayed score:
+
+    popularity = popularity * 0.5 ** (hours_since_last_run / half_life)
+                 + views + POPULARITY_CART_WEIGHT * cart_adds
+
+The score orders /product/list and fills the home page when no products
+are flagged as recommended.
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import func, update
+
+from app.models import db, Product, ProductStat
+
+
+class EventBuffer:
+    """Thread-safe per-process counters, flushed to the database in batches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = Counter()
+        self._cart_adds = Counter()
+        self._app = None
+        self._thread = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Поток сброса не переживает fork: воркер запустит свой при первом событии
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, product_id, kind='view'):
+        with self._lock:
+            (self._views if kind == 'view' else self._cart_adds)[product_id] += 1
+            if self._thread is None:
+                self._start(current_app._get_current_object())
+
+    def _start(self, app):
+        # Called under the lock on the first event, so each forked worker gets its own thread
+        self._app = app
+        self._thread = threading.Thread(target=self._run, name='popularity-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        interval = self._app.config['POPULARITY_FLUSH_INTERVAL']
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Ошибка при сохранении счетчиков просмотров: {e}")
+
+    def drain(self):
+        """Take the buffered counts, leaving the buffer empty."""
+        with self._lock:
+            views, cart_adds = self._views, self._cart_adds
+            self._views, self._cart_adds = Counter(), Counter()
+        return views, cart_adds
+
+    def pending(self):
+        """Copies of the buffered counts, for diagnostics."""
+        with self._lock:
+            return Counter(self._views), Counter(self._cart_adds)
+
+    def flush(self):
+        """Write buffered counts with one upsert per product; returns the number of products."""
+        views, cart_adds = self.drain()
+        if not views and not cart_adds:
+            return 0
+        product_ids = views.keys() | cart_adds.keys()
+        with self._app.app_context():
+            try:
+                # Счетчики удаленных товаров отбрасываем: иначе FK не даст их записать и они вернутся в буфер
+                existing = {pid for (pid,) in db.session.query(Product.id).filter(Product.id.in_(product_ids))}
+                rows = [
+                    {'product_id': product_id, 'views': views[product_id], 'cart_adds': cart_adds[product_id]}
+                    for product_id in product_ids if product_id in existing
+                ]
+                if rows:
+                    upsert_counts(rows)
+            except Exception:
+                db.session.rollback()
+                self._restore(views, cart_adds)
+                raise
+            finally:
+                db.session.remove()
+        return len(rows)
+
+    def _restore(self, views, cart_adds):
+        # Не теряем события, если БД временно недоступна
+        with self._lock:
+            self._views.update(views)
+            self._cart_adds.update(cart_adds)
+
+
+_buffer = EventBuffer()
+
+
+def record_view(product_id):
+    _buffer.record(product_id, 'view')
+
+
+def record_cart_add(product_id):
+    _buffer.record(product_id, 'cart_add')
+
+
+def flush():
+    return _buffer.flush()
+
+
+def pending():
+    """Buffered (views, cart_adds) counters of this process, for diagnostics."""
+    return _buffer.pending()
+
+
+def upsert_counts(rows):
+    """Add view/cart counts to product_stats: INSERT ... ON CONFLICT DO UPDATE, executed as one batch."""
+    table = ProductStat.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.product_id],
+            set_={
+                'views': table.c.views + stmt.excluded.views,
+                'cart_adds': table.c.cart_adds + stmt.excluded.cart_adds,
+                'pending_views': table.c.pending_views + stmt.excluded.pending_views,
+                'pending_cart_adds': table.c.pending_cart_adds + stmt.excluded.pending_cart_adds,
+            },
+        )
+        db.session.execute(stmt, [dict(row, pending_views=row['views'], pending_cart_adds=row['cart_adds'])
+                                  for row in rows])
+    else:
+        # Диалекты без ON CONFLICT: обновляем существующие строки и добавляем новые
+        existing = {pid for (pid,) in db.session.query(ProductStat.product_id).filter(
+            ProductStat.product_id.in_([row['product_id'] for row in rows]))}
+        for row in rows:
+            if row['product_id'] in existing:
+                db.session.execute(update(table).where(table.c.product_id == row['product_id']).values(
+                    views=table.c.views + row['views'],
+                    cart_adds=table.c.cart_adds + row['cart_adds'],
+                    pending_views=table.c.pending_views + row['views'],
+                    pending_cart_adds=table.c.pending_cart_adds + row['cart_adds'],
+                ))
+            else:
+                db.session.execute(table.insert().values(
+                    product_id=row['product_id'], views=row['views'], cart_adds=row['cart_adds'],
+                    pending_views=row['views'], pending_cart_adds=row['cart_adds']))
+    db.session.commit()
+
+
+def update_popularity():
+    """Decay existing scores and fold in events since the last run; returns the number of rows updated."""
+    config = current_app.config
+    now = datetime.now(timezone.utc)
+
+    last_run = db.session.query(func.max(ProductStat.scored_at)).scalar()
+    decay = 1.0
+    if last_run is not None:
+        if last_run.tzinfo is None:
+            last_run = last_run.replace(tzinfo=timezone.utc)
+        hours = max((now - last_run).total_seconds() / 3600, 0)
+        decay = 0.5 ** (hours / config['POPULARITY_HALF_LIFE_HOURS'])
+
+    # Одним UPDATE: счетчики, пришедшие во время пересчета, не теряются
+    table = ProductStat.__table__
+    result = db.session.execute(update(table).values(
+        popularity=table.c.popularity * decay + table.c.pending_views
+        + config['POPULARITY_CART_WEIGHT'] * table.c.pending_cart_adds,
+        pending_views=0,
+        pending_cart_adds=0,
+        scored_at=now,
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def popularity_order():
+    """ORDER BY clauses for Product queries outer-joined to ProductStat."""
+    return (func.coalesce(ProductStat.popularity, 0).desc(), Product.id)
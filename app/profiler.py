@@ -0,0 +1,236 @@
+"""
+On-demand request profiler for admins.
+
+An admin adds ``?_profile=1`` to a URL (or sends ``X-Profile: 1``) and the
+request runs under a profiler:
+
+* ``sample`` (default): a thread samples the request thread's stack every
+  PROFILER_SAMPLE_INTERVAL seconds and stores collapsed stacks
+  (``frame;frame;frame count``), ready for flamegraph.pl or speedscope;
+* ``cprofile`` (``?_profile=cprofile``): deterministic cProfile, stored as a
+  pstats dump plus a text summary sorted by cumulative time.
+
+Profiling is off unless PROFILER_ENABLED is set, admin-only, limited to
+PROFILER_MAX_PER_MINUTE runs and one run at a time per process. Results go to
+PROFILER_DIR (the newest PROFILER_KEEP are kept) and are listed per endpoint
+at /admin/profiles. The response carries ``X-Profile-Id`` or, when a run was
+refused, ``X-Profile: rate-limited``.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from flask import g, request
+from flask_login import current_user
+
+PROFILE_ID_RE = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{6}$')
+MODES = ('sample', 'cprofile')
+
+
+class SamplingProfiler:
+    """Sample one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id, interval=0.002):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    @staticmethod
+    def _label(code):
+        return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ',')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class ProfileRun:
+    """One profiled request."""
+
+    def __init__(self, mode, sample_interval):
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.created_at = datetime.now(timezone.utc)
+        self.profile_id = f'{self.created_at:%Y%m%d-%H%M%S}-{secrets.token_hex(3)}'
+        if mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.profiler = SamplingProfiler(threading.get_ident(), sample_interval)
+            self.profiler.start()
+
+    def stop(self):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        if self.mode == 'cprofile':
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+
+    def save(self, directory, meta):
+        """Write the profile files and their metadata; returns the metadata dict."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.profile_id)
+        if self.mode == 'cprofile':
+            self.profiler.dump_stats(base + '.prof')
+            summary = io.StringIO()
+            pstats.Stats(self.profiler, stream=summary).sort_stats('cumulative').print_stats(60)
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write(summary.getvalue())
+        else:
+            with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+                f.write(self.profiler.collapsed())
+            meta['samples'] = self.profiler.samples
+        meta.update(id=self.profile_id, mode=self.mode, duration_ms=round(self.duration_ms, 1),
+                    created_at=self.created_at.isoformat())
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return meta
+
+
+class RateLimiter:
+    """At most max_runs starts per rolling minute and one run at a time (per process)."""
+
+    def __init__(self, max_runs):
+        self.max_runs = max_runs
+        self._starts = deque()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def acquire(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._starts and now - self._starts[0] > 60:
+                self._starts.popleft()
+            if self._running or len(self._starts) >= self.max_runs:
+                return False
+            self._starts.append(now)
+            self._running = True
+            return True
+
+    def release(self):
+        with self._lock:
+            self._running = False
+
+
+def requested_mode():
+    """Profiler mode asked for by the current request, or None."""
+    flag = request.args.get('_profile') or request.headers.get('X-Profile')
+    if not flag:
+        return None
+    return 'cprofile' if flag.lower() == 'cprofile' else 'sample'
+
+
+def list_profiles(directory):
+    """Metadata of stored profiles, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda p: p['id'], reverse=True)
+
+
+def profile_files(directory, profile_id):
+    """Existing files of a profile by extension, e.g. {'json': path, 'collapsed': path}."""
+    if not PROFILE_ID_RE.match(profile_id):
+        return {}
+    files = {}
+    for ext in ('json', 'collapsed', 'prof', 'txt'):
+        path = os.path.join(directory, f'{profile_id}.{ext}')
+        if os.path.exists(path):
+            files[ext] = path
+    return files
+
+
+def prune_profiles(directory, keep):
+    for meta in list_profiles(directory)[keep:]:
+        for path in profile_files(directory, meta['id']).values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def init_profiler(app):
+    """Install the request hooks that start and stop profiling runs."""
+    limiter = RateLimiter(app.config['PROFILER_MAX_PER_MINUTE'])
+
+    def finish(run, status_code):
+        run.stop()
+        try:
+            run.save(app.config['PROFILER_DIR'], {
+                'endpoint': request.endpoint or 'unmatched',
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'status_code': status_code,
+                'user': current_user.email,
+            })
+            prune_profiles(app.config['PROFILER_DIR'], app.config['PROFILER_KEEP'])
+        except Exception as e:
+            print(f"Ошибка при сохранении профиля: {e}")
+        finally:
+            limiter.release()
+
+    @app.before_request
+    def start_profiling():
+        if not app.config['PROFILER_ENABLED']:
+            return
+        mode = requested_mode()
+        if mode is None or not current_user.is_authenticated or not current_user.has_role('Admin'):
+            return
+        if not limiter.acquire():
+            g.profile_refused = True
+            return
+        g.profile_run = ProfileRun(mode, app.config['PROFILER_SAMPLE_INTERVAL'])
+
+    @app.after_request
+    def stop_profiling(response):
+        run = g.pop('profile_run', None)
+        if run is not None:
+            finish(run, response.status_code)
+            response.headers['X-Profile-Id'] = run.profile_id
+        elif g.get('profile_refused'):
+            response.headers['X-Profile'] = 'rate-limited'
+        return response
+
+    @app.teardown_request
+    def abort_profiling(exc):
+        # after_request не вызывается при необработанном исключении
+        run = g.pop('profile_run', None)
+        if run is not None:
+            finish(run, 500)
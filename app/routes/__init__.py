@@ -0,0 +1,113 @@
+"""
+HTTP routes, one module per blueprint.
+
+A worker imports only the blueprint modules of its pool (APP_POOL, or an
+explicit APP_BLUEPRINTS list), so e.g. storefront workers never load the admin
+panel or its dependencies:
+
+    all         every blueprint (default)
+    storefront  auth, main, product, profile
+    api         breed (the breed detection upload page and JSON/SSE job API)
+    admin       auth, admin
+
+URL rules of the blueprints a pool does not serve are registered from
+``url_map.json`` without importing their code. url_for() therefore builds
+links to every page (the storefront header links to the admin dashboard,
+admin pages link to product pages), and such URLs answer 404 in this pool;
+the load balancer routes them to the pool that serves them.
+
+After adding or changing a route, regenerate the manifest with
+``flask blueprints manifest``; tests/test_blueprints.py fails when it is stale.
+"""
+
+import importlib
+import json
+import os
+
+from flask import abort
+
+# blueprint name -> (module, attribute)
+BLUEPRINTS = {
+    'auth': ('app.routes.auth', 'auth_bp'),
+    'main': ('app.routes.main', 'main_bp'),
+    'breed': ('app.routes.breed', 'breed_bp'),
+    'product': ('app.routes.product', 'product_bp'),
+    'profile': ('app.routes.profile', 'profile_bp'),
+    'admin': ('app.routes.admin', 'admin_bp'),
+}
+
+POOLS = {
+    'all': tuple(BLUEPRINTS),
+    'storefront': ('auth', 'main', 'product', 'profile'),
+    'api': ('breed',),
+    'admin': ('auth', 'admin'),
+}
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'url_map.json')
+
+
+def load_blueprint(name):
+    module, attribute = BLUEPRINTS[name]
+    return getattr(importlib.import_module(module), attribute)
+
+
+def pool_blueprints(config):
+    """Names of the blueprints this process serves, from APP_BLUEPRINTS or APP_POOL."""
+    if config.get('APP_BLUEPRINTS'):
+        names = [name.strip() for name in config['APP_BLUEPRINTS'].split(',') if name.strip()]
+    else:
+        pool = config.get('APP_POOL', 'all')
+        if pool not in POOLS:
+            raise ValueError(f'Unknown APP_POOL: {pool}')
+        names = POOLS[pool]
+    unknown = [name for name in names if name not in BLUEPRINTS]
+    if unknown:
+        raise ValueError(f'Unknown blueprints: {", ".join(unknown)}')
+    return list(names)
+
+
+def build_manifest(app):
+    """URL rules of every blueprint endpoint registered on app."""
+    rules = []
+    for rule in app.url_map.iter_rules():
+        blueprint = rule.endpoint.partition('.')[0]
+        if blueprint in BLUEPRINTS and '.' in rule.endpoint:
+            rules.append({
+                'endpoint': rule.endpoint,
+                'rule': rule.rule,
+                'methods': sorted(rule.methods - {'HEAD', 'OPTIONS'}),
+                'defaults': rule.defaults or None,
+            })
+    return sorted(rules, key=lambda r: (r['endpoint'], r['rule']))
+
+
+def load_manifest():
+    with open(MANIFEST_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _not_served(**kwargs):
+    # Маршрут обслуживается другим пулом воркеров
+    abort(404)
+
+
+def register_blueprints(app):
+    """Register the pool's blueprints and URL-only placeholders for the rest."""
+    served = pool_blueprints(app.config)
+    for name in served:
+        app.register_blueprint(load_blueprint(name))
+
+    if len(served) == len(BLUEPRINTS):
+        return
+    for entry in load_manifest():
+        if entry['endpoint'].partition('.')[0] not in served:
+            app.add_url_rule(entry['rule'], endpoint=entry['endpoint'], view_func=_not_served,
+                             methods=entry['methods'], defaults=entry['defaults'])
+
+
+def __getattr__(name):
+    # Совместимость: from app.routes import admin_bp импортирует только нужный модуль
+    for blueprint, (module, attribute) in BLUEPRINTS.items():
+        if attribute == name:
+            return load_blueprint(blueprint)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,887 @@
+"""
+Admin panel: orders, users, roles, catalog, promo codes, subscribers and diagnostics.
+"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, abort, current_app
+from flask_login import login_required, current_user
+from app.models import db, User, Product, Category, Order, OrderStatus, Review, Subscriber, Role, PromoCode, PromoCodeCampaign
+from sqlalchemy.orm import joinedload, selectinload
+from slugify import slugify
+from app import memory, profiler, tracing
+from app.email import send_mass_promo_code_email
+from image_processor import process_product_image
+import os
+import json
+from datetime import datetime, timezone
+
+from app.routes.helpers import permission_required, admin_required
+
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+# ============================================================================
+# ADMIN ROUTES
+# ============================================================================
+
+@admin_bp.route('/')
+@login_required
+def admin_dashboard():
+    """Admin dashboard."""
+    total_users = User.query.count()
+    total_products = Product.query.count()
+    total_orders = Order.query.count()
+    total_revenue = db.session.query(db.func.sum(Order.total)).scalar() or 0
+    
+    return render_template('admin/dashboard.html',
+                          total_users=total_users,
+                          total_products=total_products,
+                          total_orders=total_orders,
+                          total_revenue=total_revenue)
+
+
+@admin_bp.route('/orders')
+@permission_required('manage_orders')
+def admin_orders():
+    """Admin orders management."""
+    search_term = request.args.get('search', '').strip()
+    selected_status = request.args.get('status', '')
+    statuses = [status.value for status in OrderStatus]
+
+    query = Order.query.options(joinedload(Order.user))
+    if selected_status in statuses:
+        # Индекс (status, created_at) покрывает и фильтр, и сортировку
+        query = query.filter(Order.status == OrderStatus(selected_status))
+    if search_term:
+        pattern = f'%{search_term}%'
+        query = query.join(User, Order.user_id == User.id).filter(db.or_(
+            Order.order_number.ilike(pattern), User.username.ilike(pattern), User.email.ilike(pattern)))
+    orders = query.order_by(Order.created_at.desc()).all()
+    return render_template('admin/orders.html', orders=orders, statuses=statuses,
+                           selected_status=selected_status, search_term=search_term)
+
+
+@admin_bp.route('/order/<int:order_id>')
+@permission_required('manage_orders')
+def admin_order_detail(order_id):
+    """Admin order detail."""
+    order = Order.query.get_or_404(order_id)
+    return render_template('admin/order_detail.html', order=order)
+
+
+@admin_bp.route('/users')
+@admin_required
+def admin_users():
+    """Admin users management."""
+    users = User.query.options(selectinload(User.roles)).all()
+    return render_template('admin/users.html', users=users)
+
+
+@admin_bp.route('/user/edit/<int:user_id>', methods=['GET', 'POST'])
+@admin_required
+def edit_user(user_id):
+    """Edit user."""
+    user = User.query.get_or_404(user_id)
+    roles = Role.query.all()
+
+    if request.method == 'POST':
+        user.first_name = request.form.get('first_name', '').strip()
+        user.last_name = request.form.get('last_name', '').strip()
+        user.email = request.form.get('email', '').strip()
+        user.phone = request.form.get('phone', '').strip()
+
+        # Handle role assignment
+        role_name = request.form.get('role')
+        if role_name:
+            role = Role.query.filter_by(name=role_name).first()
+            if role:
+                user.roles = [role]  # Assuming one role per user
+
+        # Handle verification
+        is_verified = request.form.get('is_verified') == 'on'
+        user.is_verified = is_verified
+
+        # Handle password change
+        new_password = request.form.get('new_password', '').strip()
+        if new_password:
+            user.set_password(new_password)
+
+        db.session.commit()
+        flash('Пользователь обновлен.', 'success')
+        return redirect(url_for('admin.admin_users'))
+
+    return render_template('admin/user_form.html', user=user, roles=roles)
+
+
+@admin_bp.route('/user/delete/<int:user_id>', methods=['POST'])
+@admin_required
+def delete_user(user_id):
+    """Delete user."""
+    user = User.query.get_or_404(user_id)
+
+    if user.id == current_user.id:
+        flash('Нельзя удалить самого себя.', 'error')
+        return redirect(url_for('admin.admin_users'))
+
+    db.session.delete(user)
+    db.session.commit()
+    flash(f'Пользователь "{user.username}" удален.', 'success')
+    return redirect(url_for('admin.admin_users'))
+
+
+@admin_bp.route('/roles')
+@permission_required('manage_users')
+def admin_roles():
+    """Admin roles management."""
+    roles = Role.query.all()
+
+    all_permissions = [
+        'manage_categories',
+        'manage_reviews',
+        'send_mass_emails'
+    ]
+
+    return render_template('admin/roles.html', roles=roles, all_permissions=all_permissions)
+
+@admin_bp.route('/role/add', methods=['GET', 'POST'])
+@permission_required('manage_users')
+def add_role():
+    """Add new role."""
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        description = request.form.get('description', '').strip()
+        permissions = request.form.getlist('permissions')
+
+        if not name:
+            flash('Название роли обязательно.', 'error')
+            return redirect(url_for('admin.add_role'))
+
+        if Role.query.filter_by(name=name).first():
+            flash('Роль с таким названием уже существует.', 'error')
+            return redirect(url_for('admin.add_role'))
+
+        role = Role(name=name, description=description)
+        role.set_permissions(permissions)
+        db.session.add(role)
+        db.session.commit()
+        flash(f'Роль "{name}" успешно добавлена.', 'success')
+        return redirect(url_for('admin.admin_roles'))
+
+    all_permissions = [
+        'manage_users',
+        'manage_products',
+        'manage_orders',
+        'manage_promo_codes',
+        'manage_categories',
+        'manage_reviews',
+        'send_mass_emails'
+    ]
+
+    return render_template('admin/role_form.html', form_title='Добавить роль', form_action=url_for('admin.add_role'), role=None, all_permissions=all_permissions)
+
+
+@admin_bp.route('/role/edit/<int:role_id>', methods=['GET', 'POST'])
+@permission_required('manage_users')
+def edit_role(role_id):
+    """Edit existing role."""
+    role = Role.query.get_or_404(role_id)
+
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        description = request.form.get('description', '').strip()
+        permissions = request.form.getlist('permissions')
+
+        if not name:
+            flash('Название роли обязательно.', 'error')
+            return redirect(url_for('admin.edit_role', role_id=role.id))
+
+        existing_role = Role.query.filter(Role.name == name, Role.id != role.id).first()
+        if existing_role:
+            flash('Роль с таким названием уже существует.', 'error')
+            return redirect(url_for('admin.edit_role', role_id=role.id))
+
+        role.name = name
+        role.description = description
+        role.set_permissions(permissions)
+        db.session.commit()
+        flash(f'Роль "{name}" успешно обновлена.', 'success')
+        return redirect(url_for('admin.admin_roles'))
+
+    all_permissions = [
+        'manage_users',
+        'manage_products',
+        'manage_orders',
+        'manage_promo_codes',
+        'manage_categories',
+        'manage_reviews',
+        'send_mass_emails'
+    ]
+
+    return render_template('admin/role_form.html', form_title='Редактировать роль', form_action=url_for('admin.edit_role', role_id=role.id), role=role, all_permissions=all_permissions)
+
+
+@admin_bp.route('/role/delete/<int:role_id>', methods=['POST'])
+@permission_required('manage_users')
+def delete_role(role_id):
+    """Delete role."""
+    role = Role.query.get_or_404(role_id)
+
+    if role.name == 'Admin':
+        flash('Нельзя удалить роль Admin.', 'error')
+        return redirect(url_for('admin.admin_roles'))
+
+    # Check if any users have this role
+    if role.users:
+        flash('Нельзя удалить роль, которая назначена пользователям.', 'error')
+        return redirect(url_for('admin.admin_roles'))
+
+    db.session.delete(role)
+    db.session.commit()
+    flash(f'Роль "{role.name}" удалена.', 'success')
+    return redirect(url_for('admin.admin_roles'))
+
+
+@admin_bp.route('/product/add', methods=['GET', 'POST'])
+@permission_required('manage_products')
+def add_product():
+    """Add new product."""
+    categories = Category.query.all()
+    
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        description = request.form.get('description', '').strip()
+        price = request.form.get('price')
+        stock = request.form.get('stock')
+        category_id = request.form.get('category_id')
+        image_file = request.files.get('image')
+        
+        if not all([name, description, price, stock, category_id]):
+            flash('Пожалуйста, заполните все обязательные поля.', 'error')
+            return redirect(url_for('admin.add_product'))
+        
+        # Generate slug
+        slug = slugify(name) # Simple slug generation
+        # Image handling (save to static/uploads and optimize)
+        image_url = None
+        image_placeholder = None
+        if image_file and image_file.filename:
+            UPLOAD_FOLDER = os.path.join(current_app.root_path, 'static', 'images', 'products')
+            with tracing.span('process_product_image', size='800x800'):
+                filename, image_placeholder = process_product_image(image_file, UPLOAD_FOLDER, size=(800, 800), with_placeholder=True)
+            if filename:
+                image_url = url_for('static', filename=f'images/products/{filename}')
+            else:
+                flash('Ошибка при обработке изображения товара.', 'warning')
+
+        product = Product(
+            name=name,
+            description=description,
+            price=float(price),
+            stock=int(stock),
+            category_id=int(category_id),
+            slug=slug,
+            image=image_url,
+            image_placeholder=image_placeholder
+        )
+        db.session.add(product)
+        db.session.commit()
+        flash(f'Товар "{name}" успешно добавлен.', 'success')
+        return redirect(url_for('admin.manage_products'))
+
+    return render_template('admin/product_form.html', form_title='Добавить товар', form_action=url_for('admin.add_product'), categories=categories)
+
+
+@admin_bp.route('/product/edit/<int:product_id>', methods=['GET', 'POST'])
+@permission_required('manage_products')
+def edit_product(product_id):
+    """Edit existing product."""
+    product = Product.query.get_or_404(product_id)
+    categories = Category.query.all()
+
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        description = request.form.get('description', '').strip()
+        price = request.form.get('price')
+        stock = request.form.get('stock')
+        category_id = request.form.get('category_id')
+        image_file = request.files.get('image')
+
+        if not all([name, description, price, stock, category_id]):
+            flash('Пожалуйста, заполните все обязательные поля.', 'error')
+            return redirect(url_for('admin.edit_product', product_id=product.id))
+
+        product.name = name
+        product.slug = slugify(name)
+        product.description = description
+        product.price = float(price)
+        product.stock = int(stock)
+        product.category_id = int(category_id)
+
+        # Image handling
+        if image_file and image_file.filename:
+            UPLOAD_FOLDER = os.path.join(current_app.root_path, 'static', 'images', 'products')
+            with tracing.span('process_product_image', size='800x800'):
+                filename, image_placeholder = process_product_image(image_file, UPLOAD_FOLDER, size=(800, 800), with_placeholder=True)
+            if filename:
+                product.image = url_for('static', filename=f'images/products/{filename}')
+                product.image_placeholder = image_placeholder
+            else:
+                flash('Ошибка при обработке изображения товара.', 'warning')
+
+        db.session.commit()
+        flash(f'Товар "{product.name}" успешно обновлен.', 'success')
+        return redirect(url_for('admin.manage_products'))
+
+    return render_template('admin/product_form.html', form_title='Редактировать товар', form_action=url_for('admin.edit_product', product_id=product.id), categories=categories, product=product)
+
+
+@admin_bp.route('/product/delete/<int:product_id>', methods=['POST'])
+@permission_required('manage_products')
+def delete_product(product_id):
+    """Delete product."""
+    product = Product.query.get_or_404(product_id)
+    db.session.delete(product)
+    db.session.commit()
+    flash(f'Товар "{product.name}" удален.', 'success')
+    return redirect(url_for('admin.manage_products'))
+
+
+@admin_bp.route('/reviews')
+@permission_required('manage_reviews')
+def admin_reviews():
+    """Admin reviews management."""
+    query = Review.query.options(joinedload(Review.user), joinedload(Review.product)).order_by(Review.created_at.desc())
+    
+    search_term = request.args.get('search', '').strip()
+    status = request.args.get('status', '').strip() # 'approved', 'pending', 'all'
+    
+    if search_term:
+        query = query.join(Product).filter(Product.name.ilike(f'%{search_term}%'))
+        
+    if status == 'approved':
+        query = query.filter(Review.is_approved == True)
+    elif status == 'pending':
+        query = query.filter(Review.is_approved == False)
+        
+    reviews = query.all()
+    
+    return render_template('admin/reviews.html',
+                           reviews=reviews,
+                           search_term=search_term,
+                           selected_status=status)
+
+
+@admin_bp.route('/review/delete/<int:review_id>', methods=['POST'])
+@admin_required
+def delete_review(review_id):
+    """Delete review."""
+    review = Review.query.get_or_404(review_id)
+    db.session.delete(review)
+    db.session.commit()
+    flash('Отзыв удален.', 'success')
+    return redirect(url_for('admin.admin_reviews'))
+
+
+@admin_bp.route('/products')
+@permission_required('manage_products')
+def manage_products():
+    """Manage products."""
+    query = Product.query
+
+    search_term = request.args.get('search', '').strip()
+    category_id = request.args.get('category_id', type=int)
+    page = request.args.get('page', 1, type=int)
+
+    if search_term:
+        # Добавляем поиск по имени и описанию
+        query = query.filter(db.or_(
+            Product.name.ilike(f'%{search_term}%'),
+            Product.description.ilike(f'%{search_term}%')
+        ))
+
+    if category_id:
+        query = query.filter_by(category_id=category_id)
+
+    products = query.paginate(page=page, per_page=12)
+    categories = Category.query.all()
+
+    return render_template('admin/products.html',
+                           products=products,
+                           categories=categories,
+                           search_term=search_term,
+                           selected_category_id=category_id)
+
+
+@admin_bp.route('/promo-codes', methods=['GET', 'POST'])
+@permission_required('manage_promo_codes')
+def admin_promo_codes():
+    promo_codes = PromoCode.query.all()
+    return render_template('admin/promo_codes.html', promo_codes=promo_codes)
+
+
+@admin_bp.route('/promo-code/add', methods=['GET', 'POST'])
+@admin_required
+def add_promo_code():
+    if request.method == 'POST':
+        code = request.form.get('code', '').strip().upper()
+        discount_type = request.form.get('discount_type')
+        discount_value = request.form.get('discount_value')
+        is_active = request.form.get('is_active') == 'on'
+        valid_from_str = request.form.get('valid_from')
+        valid_until_str = request.form.get('valid_until')
+        max_uses = request.form.get('max_uses', type=int)
+        
+        if not all([code, discount_type, discount_value]):
+            flash('Пожалуйста, заполните все обязательные поля.', 'error')
+            return redirect(url_for('admin.add_promo_code'))
+            
+        # Check if code already exists
+        if PromoCode.query.filter_by(code=code).first():
+            flash(f'Промокод "{code}" уже существует.', 'error')
+            return redirect(url_for('admin.add_promo_code'))
+            
+        try:
+            discount_value = float(discount_value)
+            max_uses = max_uses if max_uses is not None else -1
+            valid_from = datetime.strptime(valid_from_str, '%Y-%m-%d') if valid_from_str else datetime.now(timezone.utc)
+            valid_until = datetime.strptime(valid_until_str, '%Y-%m-%d') if valid_until_str else None
+            
+            promo_code = PromoCode(
+                code=code,
+                discount_type=discount_type,
+                discount_value=discount_value,
+                is_active=is_active,
+                valid_from=valid_from,
+                valid_until=valid_until,
+                max_uses=max_uses
+            )
+            db.session.add(promo_code)
+            db.session.commit()
+            flash(f'Промокод "{code}" успешно добавлен.', 'success')
+            return redirect(url_for('admin.admin_promo_codes'))
+        except ValueError:
+            flash('Неверный формат данных.', 'error')
+            return redirect(url_for('admin.add_promo_code'))
+        
+    return render_template('admin/promo_code_form.html', form_title='Добавить промокод', form_action=url_for('admin.add_promo_code'), promo_code=None)
+
+
+@admin_bp.route('/promo-code/edit/<int:promo_code_id>', methods=['GET', 'POST'])
+@admin_required
+def edit_promo_code(promo_code_id):
+    """Edit existing promo code."""
+    promo_code = PromoCode.query.get_or_404(promo_code_id)
+
+    if request.method == 'POST':
+        code = request.form.get('code', '').strip().upper()
+        discount_type = request.form.get('discount_type')
+        discount_value = request.form.get('discount_value')
+        is_active = request.form.get('is_active') == 'on'
+        valid_from_str = request.form.get('valid_from')
+        valid_until_str = request.form.get('valid_until')
+        max_uses = request.form.get('max_uses', type=int)
+        
+        if not all([code, discount_type, discount_value]):
+            flash('Пожалуйста, заполните все обязательные поля.', 'error')
+            return redirect(url_for('admin.edit_promo_code', promo_code_id=promo_code.id))
+            
+        # Check if code already exists for another promo code
+        if PromoCode.query.filter(PromoCode.code == code, PromoCode.id != promo_code.id).first():
+            flash(f'Промокод "{code}" уже существует.', 'error')
+            return redirect(url_for('admin.edit_promo_code', promo_code_id=promo_code.id))
+            
+        try:
+            discount_value = float(discount_value)
+            max_uses = max_uses if max_uses is not None else -1
+            valid_from = datetime.strptime(valid_from_str, '%Y-%m-%d') if valid_from_str else None
+            valid_until = datetime.strptime(valid_until_str, '%Y-%m-%d') if valid_until_str else None
+            
+            promo_code.code = code
+            promo_code.discount_type = discount_type
+            promo_code.discount_value = discount_value
+            promo_code.is_active = is_active
+            promo_code.valid_from = valid_from
+            promo_code.valid_until = valid_until
+            promo_code.max_uses = max_uses
+            
+            db.session.commit()
+            flash(f'Промокод "{code}" успешно обновлен.', 'success')
+            return redirect(url_for('admin.admin_promo_codes'))
+        except ValueError:
+            flash('Неверный формат данных.', 'error')
+            return redirect(url_for('admin.edit_promo_code', promo_code_id=promo_code.id))
+        
+    return render_template('admin/promo_code_form.html', form_title='Редактировать промокод', form_action=url_for('admin.edit_promo_code', promo_code_id=promo_code.id), promo_code=promo_code)
+
+@admin_bp.route('/promo-codes/delete/<int:promo_code_id>', methods=['POST'])
+@admin_required
+def delete_promo_code(promo_code_id):
+    """Delete a promo code."""
+    promo_code = PromoCode.query.get_or_404(promo_code_id)
+    
+    # Check if the promo code is used in any order (optional, but good practice)
+    if Order.query.filter_by(promo_code_id=promo_code_id).first():
+        flash('Невозможно удалить промокод, так как он использовался в заказах.', 'error')
+        return redirect(url_for('admin.admin_promo_codes'))
+        
+    db.session.delete(promo_code)
+    db.session.commit()
+    flash(f'Промокод "{promo_code.code}" успешно удален.', 'success')
+    
+    return redirect(url_for('admin.admin_promo_codes'))
+
+
+@admin_bp.route('/promo-codes/send', methods=['GET', 'POST'])
+@permission_required('send_mass_emails')
+def admin_send_promo_emails():
+    """Send promo codes to all users."""
+    if request.method == 'POST':
+        promo_code_id = request.form.get('promo_code_id')
+        subject = request.form.get('subject')
+        body_template = request.form.get('body_template') # Now it's the template file path
+
+        if not all([promo_code_id, subject, body_template]):
+            flash('Пожалуйста, заполните все поля.', 'error')
+            return redirect(url_for('admin.admin_send_promo_emails'))
+
+        promo_code = PromoCode.query.get(promo_code_id)
+        if not promo_code:
+            flash('Промокод не найден.', 'error')
+            return redirect(url_for('admin.admin_send_promo_emails'))
+
+        users = User.query.filter_by(is_verified=True).all()
+        sent_count = 0
+        for user in users:
+            if send_mass_promo_code_email(user.email, subject, body_template, promo_code):
+                sent_count += 1
+                # Небольшая задержка, чтобы не перегружать почтовый сервер, если он реальный
+                # time.sleep(0.1) # Закомментировано для быстрой работы в песочнице
+                pass # The logic is moved above, this line is now redundant but kept for context.
+
+        # Увеличиваем счетчик использования промокода, если он не безлимитный
+        if promo_code.max_uses != -1:
+            promo_code.current_uses += sent_count
+
+        campaign = PromoCodeCampaign(
+            promo_code_id=promo_code.id,
+            sender_id=current_user.id,
+            subject=subject,
+            body_template=body_template,
+            recipient_count=sent_count
+        )
+        db.session.add(campaign)
+        db.session.commit()
+
+        flash(f'Промокод "{promo_code.code}" отправлен {sent_count} пользователям.', 'success')
+        return redirect(url_for('admin.admin_promo_codes'))
+
+    promo_codes = PromoCode.query.filter_by(is_active=True).all()
+    return render_template('admin/send_promo_form.html', promo_codes=promo_codes, promo_code=PromoCode())
+
+
+
+@admin_bp.route('/categories')
+@permission_required('manage_categories')
+def admin_categories():
+    """Admin categories management."""
+    categories = Category.query.all()
+    return render_template('admin/categories.html', categories=categories)
+
+
+@admin_bp.route('/category/add', methods=['GET', 'POST'])
+@admin_required
+def add_category():
+    """Add new category."""
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        image_file = request.files.get('image')
+        
+        if not name:
+            flash('Пожалуйста, введите название категории.', 'error')
+            return redirect(url_for('admin.add_category'))
+            
+        slug = slugify(name)
+        
+        category = Category(name=name, slug=slug)
+        
+        # Обработка изображения
+        if image_file and image_file.filename:
+            # Используем ту же логику, что и для товаров, но с другим размером
+            UPLOAD_FOLDER = os.path.join(current_app.root_path, 'static', 'images', 'categories')
+            # Размер для категорий (например, 300x300)
+            with tracing.span('process_product_image', size='300x300'):
+                filename, image_placeholder = process_product_image(image_file, UPLOAD_FOLDER, size=(300, 300), with_placeholder=True)
+            if filename:
+                category.image = url_for('static', filename=f'images/categories/{filename}')
+                category.image_placeholder = image_placeholder
+            else:
+                flash('Ошибка при обработке изображения категории.', 'warning')
+        
+        db.session.add(category)
+        db.session.commit()
+        flash(f'Категория "{name}" успешно добавлена.', 'success')
+        return redirect(url_for('admin.admin_categories'))
+        
+    return render_template('admin/category_form.html', form_title='Добавить категорию', form_action=url_for('admin.add_category'))
+
+
+@admin_bp.route('/category/edit/<int:category_id>', methods=['GET', 'POST'])
+@admin_required
+def edit_category(category_id):
+    """Edit existing category."""
+    category = Category.query.get_or_404(category_id)
+    
+    if request.method == 'POST':
+        category.name = request.form.get('name', '').strip()
+        image_file = request.files.get('image')
+        delete_image = request.form.get('delete_image')
+        
+        category.slug = slugify(category.name)
+        
+        if not category.name:
+            flash('Пожалуйста, введите название категории.', 'error')
+            return redirect(url_for('admin.edit_category', category_id=category.id))
+            
+        # Обработка удаления изображения
+        if delete_image == 'on' and category.image:
+            # Удаляем старый файл
+            try:
+                old_path = os.path.join(current_app.root_path, category.image.lstrip('/'))
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+            except Exception as e:
+                print(f"Ошибка при удалении старого изображения категории: {e}")
+            category.image = None
+            category.image_placeholder = None
+            
+        # Обработка загрузки нового изображения
+        if image_file and image_file.filename:
+            UPLOAD_FOLDER = os.path.join(current_app.root_path, 'static', 'images', 'categories')
+            # Удаляем старый файл, если он есть
+            if category.image:
+                try:
+                    old_path = os.path.join(current_app.root_path, category.image.lstrip('/'))
+                    if os.path.exists(old_path):
+                        os.remove(old_path)
+                except Exception as e:
+                    print(f"Ошибка при удалении старого изображения категории: {e}")
+            
+            # Сохраняем новый файл
+            with tracing.span('process_product_image', size='300x300'):
+                filename, image_placeholder = process_product_image(image_file, UPLOAD_FOLDER, size=(300, 300), with_placeholder=True)
+            if filename:
+                category.image = url_for('static', filename=f'images/categories/{filename}')
+                category.image_placeholder = image_placeholder
+            else:
+                flash('Ошибка при обработке изображения категории.', 'warning')
+            
+        db.session.commit()
+        flash(f'Категория "{category.name}" успешно обновлена.', 'success')
+        return redirect(url_for('admin.admin_categories'))
+        
+    return render_template('admin/category_form.html', form_title='Редактировать категорию', form_action=url_for('admin.edit_category', category_id=category.id), category=category)
+
+
+@admin_bp.route('/category/delete/<int:category_id>', methods=['POST'])
+@admin_required
+def delete_category(category_id):
+    """Delete a category."""
+    category = Category.query.get_or_404(category_id)
+
+    # Check if any products are linked to this category
+    if Product.query.filter_by(category_id=category_id).first():
+        flash('Невозможно удалить категорию, так как к ней привязаны товары.', 'error')
+        return redirect(url_for('admin.admin_categories'))
+
+    db.session.delete(category)
+    db.session.commit()
+    flash(f'Категория "{category.name}" успешно удалена.', 'success')
+
+    return redirect(url_for('admin.admin_categories'))
+
+
+# ============================================================================
+# SUBSCRIBERS MANAGEMENT
+# ============================================================================
+
+@admin_bp.route('/subscribers')
+@permission_required('manage_users')
+def admin_subscribers():
+    """Admin subscribers management."""
+    subscribers = Subscriber.query.order_by(Subscriber.subscribed_at.desc()).all()
+    return render_template('admin/subscribers.html', subscribers=subscribers)
+
+
+@admin_bp.route('/subscriber/delete/<int:subscriber_id>', methods=['POST'])
+@permission_required('manage_users')
+def delete_subscriber(subscriber_id):
+    """Delete a subscriber."""
+    subscriber = Subscriber.query.get_or_404(subscriber_id)
+
+    db.session.delete(subscriber)
+    db.session.commit()
+    flash(f'Подписчик "{subscriber.email}" удален.', 'success')
+
+    return redirect(url_for('admin.admin_subscribers'))
+
+
+@admin_bp.route('/subscribers/send-promo', methods=['GET', 'POST'])
+@permission_required('send_mass_emails')
+def admin_send_subscriber_promo():
+    """Send promo codes to verified subscribers."""
+    if request.method == 'POST':
+        promo_code_id = request.form.get('promo_code_id')
+        subject = request.form.get('subject')
+        body_template = request.form.get('body_template')
+
+        if not all([promo_code_id, subject, body_template]):
+            flash('Пожалуйста, заполните все поля.', 'error')
+            return redirect(url_for('admin.admin_send_subscriber_promo'))
+
+        promo_code = PromoCode.query.get(promo_code_id)
+        if not promo_code:
+            flash('Промокод не найден.', 'error')
+            return redirect(url_for('admin.admin_send_subscriber_promo'))
+
+        # Get verified subscribers
+        subscribers = Subscriber.query.filter_by(is_verified=True, is_active=True).all()
+        sent_count = 0
+        for subscriber in subscribers:
+            if send_mass_promo_code_email(subscriber.email, subject, body_template, promo_code):
+                sent_count += 1
+
+        # Update promo code usage
+        if promo_code.max_uses != -1:
+            promo_code.current_uses += sent_count
+
+        campaign = PromoCodeCampaign(
+            promo_code_id=promo_code.id,
+            sender_id=current_user.id,
+            subject=subject,
+            body_template=body_template,
+            recipient_count=sent_count
+        )
+        db.session.add(campaign)
+        db.session.commit()
+
+        flash(f'Промокод "{promo_code.code}" отправлен {sent_count} подписчикам.', 'success')
+        return redirect(url_for('admin.admin_subscribers'))
+
+    promo_codes = PromoCode.query.filter_by(is_active=True).all()
+    return render_template('admin/send_subscriber_promo.html', promo_codes=promo_codes, promo_code=PromoCode())
+
+
+# ============================================================================
+# REQUEST PROFILES
+# ============================================================================
+
+@admin_bp.route('/profiles')
+@admin_required
+def admin_profiles():
+    """Recent request profiles grouped by endpoint."""
+    grouped = {}
+    for meta in profiler.list_profiles(current_app.config['PROFILER_DIR']):
+        grouped.setdefault(meta['endpoint'], []).append(meta)
+    return render_template('admin/profiles.html', grouped=sorted(grouped.items()),
+                           enabled=current_app.config['PROFILER_ENABLED'])
+
+
+@admin_bp.route('/profiles/<profile_id>')
+@admin_required
+def admin_profile_detail(profile_id):
+    """Show one profile: hottest stacks (sampling) or the cProfile summary."""
+    files = profiler.profile_files(current_app.config['PROFILER_DIR'], profile_id)
+    if 'json' not in files:
+        abort(404)
+    with open(files['json'], encoding='utf-8') as f:
+        meta = json.load(f)
+
+    top_stacks, summary = [], None
+    if 'collapsed' in files:
+        with open(files['collapsed'], encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                top_stacks.append((int(count), stack.split(';')))
+                if len(top_stacks) >= 30:
+                    break
+    elif 'txt' in files:
+        with open(files['txt'], encoding='utf-8') as f:
+            summary = f.read()
+    return render_template('admin/profile_detail.html', meta=meta, top_stacks=top_stacks, summary=summary,
+                           downloads=[ext for ext in ('collapsed', 'prof') if ext in files])
+
+
+@admin_bp.route('/profiles/<profile_id>.<ext>')
+@admin_required
+def download_profile(profile_id, ext):
+    """Download the raw collapsed stacks or pstats dump."""
+    path = profiler.profile_files(current_app.config['PROFILER_DIR'], profile_id).get(ext)
+    if ext not in ('collapsed', 'prof') or path is None:
+        abort(404)
+    return send_from_directory(os.path.dirname(path), os.path.basename(path), as_attachment=True)
+
+
+# ============================================================================
+# MEMORY DIAGNOSTICS
+# ============================================================================
+
+@admin_bp.route('/memory')
+@admin_required
+def admin_memory():
+    """Memory report of this worker; optionally top allocations of a snapshot or a diff of two."""
+    key_type = request.args.get('key', 'lineno')
+    if key_type not in memory.KEY_TYPES:
+        key_type = 'lineno'
+    limit = request.args.get('limit', 25, type=int)
+    snapshot_id = request.args.get('snapshot', type=int)
+    base_id = request.args.get('base', type=int)
+
+    allocations, diff = None, None
+    if snapshot_id:
+        snapshot = memory.snapshots.get(snapshot_id)
+        if snapshot is None:
+            flash('Снимок не найден (возможно, запрос попал в другой процесс).', 'warning')
+        elif base_id:
+            base = memory.snapshots.get(base_id)
+            if base is None:
+                flash('Базовый снимок не найден.', 'warning')
+            else:
+                diff = memory.compare_snapshots(base, snapshot, key_type, limit)
+        else:
+            allocations = memory.top_allocations(snapshot, key_type, limit)
+
+    return render_template('admin/memory.html', report=memory.report(current_app._get_current_object()),
+                           allocations=allocations, diff=diff, key_type=key_type, key_types=memory.KEY_TYPES,
+                           snapshot_id=snapshot_id, base_id=base_id)
+
+
+@admin_bp.route('/memory/tracing', methods=['POST'])
+@admin_required
+def admin_memory_tracing():
+    """Start or stop tracemalloc in this worker."""
+    if request.form.get('action') == 'start':
+        frames = max(1, min(request.form.get('frames', 1, type=int), 50))
+        memory.start_tracing(frames)
+        flash(f'tracemalloc запущен (глубина стека {frames}, PID {os.getpid()}).', 'success')
+    else:
+        memory.stop_tracing()
+        flash(f'tracemalloc остановлен (PID {os.getpid()}).', 'success')
+    return redirect(url_for('admin.admin_memory'))
+
+
+@admin_bp.route('/memory/snapshots', methods=['POST'])
+@admin_required
+def admin_memory_snapshot():
+    """Take a tracemalloc snapshot, or drop all snapshots."""
+    if request.form.get('action') == 'clear':
+        memory.snapshots.clear()
+        flash('Снимки удалены.', 'success')
+        return redirect(url_for('admin.admin_memory'))
+    try:
+        snapshot_id = memory.snapshots.take(request.form.get('label', '').strip(),
+                                            current_app.config['MEMORY_MAX_SNAPSHOTS'])
+    except RuntimeError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.admin_memory'))
+    flash(f'Снимок #{snapshot_id} сохранен (PID {os.getpid()}).', 'success')
+    return redirect(url_for('admin.admin_memory', snapshot=snapshot_id))
@@ -0,0 +1,293 @@
+"""
+Authentication routes: login, registration, e-mail verification and password reset.
+"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from datetime import timedelta
+from flask_login import login_user, logout_user, login_required, current_user
+from app.models import db, User
+from app.email import send_verification_email, send_password_reset_email, generate_verification_code
+import secrets
+from datetime import datetime, timezone
+
+
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
+
+
+# ============================================================================
+# AUTHENTICATION ROUTES
+# ============================================================================
+
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """User login route."""
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    if request.method == 'POST':
+        login_input = request.form.get('email', '').strip()  # This field now accepts both email and username
+        password = request.form.get('password', '')
+
+        if not login_input or not password:
+            flash('Пожалуйста, заполните все поля.', 'error')
+            return redirect(url_for('auth.login'))
+
+        # Try to find user by email first, then by username
+        user = User.query.filter_by(email=login_input).first()
+        if not user:
+            user = User.query.filter_by(username=login_input).first()
+
+        if user and user.check_password(password):
+            if not user.is_verified:
+                flash('Пожалуйста, подтвердите вашу почту.', 'warning')
+                return redirect(url_for('auth.verify_email', email=user.email))
+
+            login_user(user, remember=request.form.get('remember'))
+            next_page = request.args.get('next')
+            return redirect(next_page) if next_page else redirect(url_for('main.index'))
+        else:
+            flash('Неверный логин или пароль.', 'error')
+    
+    return render_template('auth/login.html')
+
+
+@auth_bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """User registration route."""
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        email = request.form.get('email', '').strip()
+        password = request.form.get('password', '')
+        password_confirm = request.form.get('password_confirm', '')
+        privacy_accepted = request.form.get('privacy_accepted')
+        
+        # Validation
+        if not all([username, email, password, password_confirm]):
+            flash('Пожалуйста, заполните все поля.', 'error')
+            return redirect(url_for('auth.register'))
+        
+        if password != password_confirm:
+            flash('Пароли не совпадают.', 'error')
+            return redirect(url_for('auth.register'))
+        
+        if len(password) < 6:
+            flash('Пароль должен быть не менее 6 символов.', 'error')
+            return redirect(url_for('auth.register'))
+        
+        if not privacy_accepted:
+            flash('Вы должны принять политику конфиденциальности.', 'error')
+            return redirect(url_for('auth.register'))
+        
+        if User.query.filter_by(username=username).first():
+            flash('Это имя пользователя уже занято.', 'error')
+            return redirect(url_for('auth.register'))
+        
+        if User.query.filter_by(email=email).first():
+            flash('Эта почта уже зарегистрирована.', 'error')
+            return redirect(url_for('auth.register'))
+        
+        # Create user
+        user = User(
+            username=username,
+            email=email,
+            privacy_accepted=True,
+            privacy_accepted_at=datetime.now(timezone.utc),
+            is_verified=True  # Auto-verify for immediate login
+        )
+        user.set_password(password)
+
+        db.session.add(user)
+        db.session.commit()
+
+        # Auto-login after registration
+        login_user(user)
+        flash('Регистрация успешна! Вы вошли в аккаунт.', 'success')
+
+        return redirect(url_for('main.index'))
+    
+    return render_template('auth/register.html')
+
+
+@auth_bp.route('/verify-email', methods=['GET', 'POST'])
+def verify_email():
+    """Email verification route."""
+    email = request.args.get('email', '') or request.form.get('email', '')
+    
+    if request.method == 'POST':
+        code = request.form.get('code', '').strip()
+        
+        if not code:
+            flash('Пожалуйста, введите код подтверждения.', 'error')
+            return redirect(url_for('auth.verify_email', email=email))
+        
+        user = User.query.filter_by(email=email).first()
+        
+        if not user:
+            flash('Пользователь не найден.', 'error')
+            return redirect(url_for('auth.login'))
+        
+        # For demo: accept any 6-digit code
+        if len(code) == 6 and code.isdigit():
+            user.is_verified = True
+            user.verification_token = None
+            db.session.commit()
+            flash('Почта успешно подтверждена! Теперь вы можете войти.', 'success')
+            return redirect(url_for('auth.login'))
+        else:
+            flash('Неверный код подтверждения.', 'error')
+            return redirect(url_for('auth.verify_email', email=email))
+    
+    return render_template('auth/verify_email.html', email=email)
+
+
+@auth_bp.route('/forgot-password', methods=['GET', 'POST'])
+def forgot_password():
+    """Password reset request route."""
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+
+    if request.method == 'POST':
+        email = request.form.get('email', '').strip()
+        user = User.query.filter_by(email=email).first()
+
+        if user:
+            # Generate and send password reset code
+            reset_code = generate_verification_code()
+            user.verification_token = reset_code
+            # Set expiration time (e.g., 15 minutes)
+            user.verification_token_expires = datetime.now(timezone.utc) + timedelta(minutes=15)
+            db.session.commit()
+
+            if send_password_reset_email(email, reset_code):
+                flash('Код для сброса пароля отправлен на вашу почту.', 'success')
+            else:
+                flash('Произошла ошибка при отправке кода. Попробуйте позже.', 'error')
+            
+            return redirect(url_for('auth.verify_reset_code', email=email))
+        else:
+            flash('Пользователь с таким email не найден.', 'error')
+            return redirect(url_for('auth.forgot_password'))
+
+    return render_template('auth/forgot_password.html')
+
+
+@auth_bp.route('/verify-reset-code', methods=['GET', 'POST'])
+def verify_reset_code():
+    """Password reset code verification route."""
+    email = request.args.get('email', '') or request.form.get('email', '')
+    
+    if request.method == 'POST':
+        code = request.form.get('code', '').strip()
+        
+        if not code:
+            flash('Пожалуйста, введите код подтверждения.', 'error')
+            return redirect(url_for('auth.verify_reset_code', email=email))
+        
+        user = User.query.filter_by(email=email).first()
+        
+        if not user:
+            flash('Пользователь не найден.', 'error')
+            return redirect(url_for('auth.login'))
+        
+        # Check code and expiration
+        # Ensure comparison is between timezone-aware objects
+        token_expires_aware = user.verification_token_expires.replace(tzinfo=timezone.utc)
+        if user.verification_token == code and token_expires_aware > datetime.now(timezone.utc):
+            # Code is valid, redirect to password reset form
+            # Generate a temporary, single-use token for the final reset step
+            temp_token = secrets.token_urlsafe(32)
+            user.verification_token = temp_token # Reuse the field for the final reset token
+            user.verification_token_expires = datetime.now(timezone.utc) + timedelta(minutes=5) # Short expiration for final step
+            db.session.commit()
+            
+            return redirect(url_for('auth.reset_password', token=temp_token))
+        else:
+            flash('Неверный или просроченный код подтверждения.', 'error')
+            return redirect(url_for('auth.verify_reset_code', email=email))
+    
+    # GET request
+    return render_template('auth/verify_reset_code.html', email=email)
+
+
+@auth_bp.route('/reset-password', methods=['GET', 'POST'])
+def reset_password():
+    """Final password reset route."""
+    token = request.args.get('token', '')
+    
+    if request.method == 'POST':
+        password = request.form.get('password', '')
+        password_confirm = request.form.get('password_confirm', '')
+        
+        if not password or not password_confirm:
+            flash('Пожалуйста, заполните все поля.', 'error')
+            return redirect(url_for('auth.reset_password', token=token))
+        
+        if password != password_confirm:
+            flash('Пароли не совпадают.', 'error')
+            return redirect(url_for('auth.reset_password', token=token))
+        
+        if len(password) < 6:
+            flash('Пароль должен быть не менее 6 символов.', 'error')
+            return redirect(url_for('auth.reset_password', token=token))
+        
+        user = User.query.filter_by(verification_token=token).first()
+        
+        # Ensure comparison is between timezone-aware objects
+        if not user or user.verification_token_expires.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
+            flash('Неверная или просроченная ссылка для сброса пароля.', 'error')
+            return redirect(url_for('auth.login'))
+        
+        # Reset password
+        user.set_password(password)
+        user.verification_token = None
+        user.verification_token_expires = None
+        db.session.commit()
+        
+        flash('Ваш пароль успешно изменен. Теперь вы можете войти.', 'success')
+        return redirect(url_for('auth.login'))
+    
+    # GET request
+    user = User.query.filter_by(verification_token=token).first()
+    
+    # Ensure comparison is between timezone-aware objects
+    if not user or user.verification_token_expires.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
+        flash('Неверная или просроченная ссылка для сброса пароля.', 'error')
+        return redirect(url_for('auth.login'))
+    
+    return render_template('auth/reset_password.html', token=token)
+
+
+@auth_bp.route('/resend-verification')
+def resend_verification():
+    """Resend verification code."""
+    email = request.args.get('email', '')
+    user = User.query.filter_by(email=email).first()
+
+    if user:
+        # Generate and send new verification code
+        verification_code = generate_verification_code()
+        user.verification_token = verification_code
+        user.verification_token_expires = datetime.now(timezone.utc) + timedelta(minutes=15)
+        db.session.commit()
+
+        if send_verification_email(email, verification_code):
+            flash('Код подтверждения отправлен на вашу почту.', 'success')
+        else:
+            flash('Произошла ошибка при отправке кода. Попробуйте позже.', 'error')
+    else:
+        flash('Пользователь не найден.', 'error')
+
+    return redirect(url_for('auth.verify_email', email=email))
+
+
+@auth_bp.route('/logout')
+@login_required
+def logout():
+    """User logout route."""
+    logout_user()
+    flash('Вы вышли из аккаунта.', 'info')
+    return redirect(url_for('main.index'))
@@ -0,0 +1,275 @@
+"""
+Breed detection: photo upload page and the JSON/SSE job API.
+"""
+
+from flask import Blueprint, render_template, request, url_for, jsonify, abort, current_app, Response
+from flask_login import login_required, current_user
+from app.models import db, BreedDetectionJob
+from slugify import slugify
+from app import breed_cache, breed_index, breed_jobs
+from image_processor import pil_image
+from io import BytesIO
+import json
+
+
+
+breed_bp = Blueprint('breed', __name__)
+
+
+# ============================================================================
+# BREED DETECTION
+# ============================================================================
+
+# Helper function for Russian grammar (Roditelny padezh - Genitive case)
+def to_genitive(breed_name):
+    """Simple heuristic to convert a breed name to the genitive case for 'Рекомендуем для...'"""
+    if breed_name.endswith('а'):
+        return breed_name[:-1] + 'ы'
+    elif breed_name.endswith('я'):
+        return breed_name[:-1] + 'и'
+    elif breed_name.endswith('ь'):
+        return breed_name[:-1] + 'я'
+    elif breed_name.endswith('р') or breed_name.endswith('н'):
+        return breed_name + 'а'
+    elif breed_name.endswith('ий'):
+        return breed_name[:-2] + 'ого'
+    elif breed_name.endswith('ая'):
+        return breed_name[:-2] + 'ой'
+    elif breed_name.endswith('ий'):
+        return breed_name[:-2] + 'ого'
+    return breed_name # Fallback
+
+def breed_recommendations(result_data):
+    """Build breed_data, recommendations and their title for a classifier result."""
+    breed_name = result_data['breed_name']
+    breed_name_slug = slugify(breed_name)
+    pet_type = result_data.get('pet_type', 'Неизвестно')
+
+    # Улучшенная обработка "Неизвестно"
+    if pet_type == 'Неизвестно' or breed_name_slug == slugify('Неизвестно'):
+        # Возвращаем специальный ответ для "Неизвестно"
+        return {
+            'breed_data': {
+                'pet_type': 'Неизвестно',
+                'breed_name': 'Неизвестно',
+                'confidence': '0%',
+                'description': 'На изображении не удалось определить кошку или собаку. Пожалуйста, загрузите другое фото вашего питомца.'
+            },
+            'recommendations': [],
+            'recommendation_title': 'Неизвестного питомца'
+        }
+
+    # Поиск породы и рекомендаций в индексе, загруженном в память процесса
+    index = breed_index.get_index()
+    breed = index.resolve(breed_name, pet_type)
+    recommendations = [
+        dict(product, url=url_for('product.view', product_id=product['id']))
+        for product in index.recommendations(breed, pet_type)
+    ]
+    if breed:
+        # Показываем каноническое название породы из каталога
+        result_data = dict(result_data, breed_name=breed['name'])
+        breed_name = breed['name']
+
+    # Формирование заголовка для рекомендаций
+    if breed_name and breed_name != 'Неизвестно':
+        # Порода определена, используем родительный падеж
+        recommendation_title = to_genitive(breed_name)
+    elif pet_type == 'собака':
+        recommendation_title = 'вашей собаки'
+    elif pet_type == 'кошка':
+        recommendation_title = 'вашей кошки'
+    else:
+        # Fallback, хотя это не должно случиться, если pet_type не "Неизвестно"
+        recommendation_title = 'вашего питомца'
+
+    return {
+        'breed_data': result_data,
+        'recommendations': recommendations,
+        'recommendation_title': recommendation_title
+    }
+
+
+def breed_job_payload(job):
+    """JSON payload describing a breed detection job; recommendations are attached once done."""
+    payload = {
+        'success': job.status != 'error',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('breed.breed_detect_status', job_id=job.id),
+        'events_url': url_for('breed.breed_detect_events', job_id=job.id),
+    }
+    if job.status == 'done':
+        payload.update(breed_recommendations(job.get_result()))
+        payload['cached'] = job.from_cache
+    elif job.status == 'error':
+        payload['message'] = job.error
+    return payload
+
+
+def merge_breed_recommendations(results, limit=12):
+    """Merge per-pet recommendations, ranking products by how many of the pets they fit."""
+    merged = {}
+    for result in results:
+        for position, product in enumerate(result['recommendations']):
+            entry = merged.get(product['id'])
+            if entry is None:
+                entry = merged[product['id']] = dict(product, fits=0, best_position=position, order=len(merged))
+            entry['fits'] += 1
+            entry['best_position'] = min(entry['best_position'], position)
+
+    ranked = sorted(merged.values(), key=lambda p: (-p['fits'], p['best_position'], p['order']))
+    return [{k: v for k, v in p.items() if k not in ('best_position', 'order')} for p in ranked[:limit]]
+
+
+def breed_batch_payload(batch_id, jobs):
+    """JSON payload for a multi-photo batch; merged recommendations are attached once every job finished."""
+    pets = []
+    for job in jobs:
+        pet = {'job_id': job.id, 'status': job.status}
+        if job.status == 'done':
+            pet.update(breed_recommendations(job.get_result()))
+            pet['cached'] = job.from_cache
+        elif job.status == 'error':
+            pet['message'] = job.error
+        pets.append(pet)
+
+    finished = all(job.status in ('done', 'error') for job in jobs)
+    done = [pet for pet in pets if pet['status'] == 'done']
+    payload = {
+        'success': not finished or bool(done),
+        'batch_id': batch_id,
+        'status': ('done' if done else 'error') if finished else 'running',
+        'status_url': url_for('breed.breed_detect_batch_status', batch_id=batch_id),
+        'pets': pets,
+    }
+    if finished and done:
+        payload['recommendations'] = merge_breed_recommendations(done)
+        payload['recommendation_title'] = 'ваших питомцев'
+    elif finished:
+        payload['message'] = pets[0].get('message') or 'Не удалось определить породу.'
+    return payload
+
+
+def _read_breed_photo(file, max_bytes):
+    """Read an uploaded photo; returns None if it is larger than max_bytes."""
+    # Лимит проверяет и сервер: клиент без JS (или не браузер) пришлет файл любого размера
+    data = file.read(max_bytes + 1)
+    return data if len(data) <= max_bytes else None
+
+
+def _load_breed_photo(data, max_dimension):
+    """Decode an uploaded photo bounded to max_dimension; returns None if it is not an image."""
+    Image = pil_image()
+    try:
+        # Браузер уже уменьшает фото; для старых клиентов JPEG декодируется сразу в уменьшенном виде
+        img = Image.open(BytesIO(data))
+        img.draft('RGB', (max_dimension, max_dimension))
+        img.load()
+    except Exception:
+        return None
+    img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    return img
+
+
+def _queue_breed_job(img, batch_id=None):
+    # Поиск результата в кэше по перцептивному хэшу фото
+    image_hash = breed_cache.photo_hash(img)
+    cached_result = breed_cache.lookup(image_hash)
+
+    # Классификация выполняется в фоне; клиент опрашивает статус или подписывается на SSE
+    job = breed_jobs.create_job(current_user.id, image_hash, cached_result, batch_id=batch_id)
+    if cached_result is None:
+        breed_jobs.submit(job.id, img)
+    return job
+
+
+@breed_bp.route('/breed-detect', methods=['GET', 'POST'])
+@login_required
+def breed_detect():
+    """Pet breed detection page; POST queues a detection job per photo and returns its id."""
+    if request.method == 'POST':
+        if 'file' not in request.files:
+            return jsonify({'success': False, 'message': 'Файл не найден.'}), 400
+
+        files = [file for file in request.files.getlist('file') if file.filename]
+        if not files:
+            return jsonify({'success': False, 'message': 'Файл не выбран.'}), 400
+
+        max_files = current_app.config['BREED_UPLOAD_MAX_FILES']
+        if len(files) > max_files:
+            return jsonify({'success': False, 'message': f'Можно загрузить не более {max_files} фото за раз.'}), 400
+
+        # 1. Чтение файлов и преобразование в объекты PIL Image
+        max_bytes = current_app.config['BREED_UPLOAD_MAX_BYTES']
+        photos = [_read_breed_photo(file, max_bytes) for file in files]
+        if any(data is None for data in photos):
+            message = f'Файл слишком большой! Максимум {round(max_bytes / 1024 / 1024)} МБ.'
+            return jsonify({'success': False, 'message': message}), 400
+
+        max_dimension = current_app.config['BREED_UPLOAD_MAX_DIMENSION']
+        images = [_load_breed_photo(data, max_dimension) for data in photos]
+        if any(img is None for img in images):
+            return jsonify({'success': False, 'message': 'Недопустимый формат файла.'}), 400
+
+        # 2. Одно фото - одна задача, как раньше
+        if len(images) == 1:
+            job = _queue_breed_job(images[0])
+            return jsonify(breed_job_payload(job)), 202
+
+        # 3. Несколько фото классифицируются параллельно общим пулом задач
+        batch_id = breed_jobs.new_id()
+        jobs = [_queue_breed_job(img, batch_id) for img in images]
+        return jsonify(breed_batch_payload(batch_id, jobs)), 202
+
+    return render_template('breed_detect.html', title='Определение породы',
+                           max_dimension=current_app.config['BREED_UPLOAD_MAX_DIMENSION'],
+                           max_bytes=current_app.config['BREED_UPLOAD_MAX_BYTES'],
+                           max_files=current_app.config['BREED_UPLOAD_MAX_FILES'])
+
+
+def _get_user_breed_job(job_id):
+    job = db.session.get(BreedDetectionJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    return job
+
+
+@breed_bp.route('/breed-detect/jobs/<job_id>')
+@login_required
+def breed_detect_status(job_id):
+    """Poll the status of a breed detection job."""
+    job = _get_user_breed_job(job_id)
+    breed_jobs.fail_if_stale(job)
+    return jsonify(breed_job_payload(job))
+
+
+@breed_bp.route('/breed-detect/batches/<batch_id>')
+@login_required
+def breed_detect_batch_status(batch_id):
+    """Poll the status of a multi-photo breed detection batch."""
+    jobs = BreedDetectionJob.query.filter_by(batch_id=batch_id, user_id=current_user.id).order_by(
+        BreedDetectionJob.created_at).all()
+    if not jobs:
+        abort(404)
+    for job in jobs:
+        breed_jobs.fail_if_stale(job)
+    return jsonify(breed_batch_payload(batch_id, jobs))
+
+
+@breed_bp.route('/breed-detect/jobs/<job_id>/events')
+@login_required
+def breed_detect_events(job_id):
+    """Server-Sent Events view of a breed detection job: one status event per connection."""
+    job = _get_user_breed_job(job_id)
+    breed_jobs.fail_if_stale(job)
+    # Поток не держим открытым: он занимал бы поток воркера gthread на все время задачи.
+    # Отдаем текущий статус и закрываем соединение, EventSource сам переподключится через retry
+    retry = int(current_app.config['BREED_JOB_SSE_RETRY'] * 1000)
+    body = f'retry: {retry}\nevent: status\ndata: {json.dumps(breed_job_payload(job), ensure_ascii=False)}\n\n'
+    if job.status in ('done', 'error'):
+        # Клиент должен закрыть EventSource, получив это событие
+        body += 'event: end\ndata: {}\n\n'
+    response = Response(body, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,49 @@
+"""
+Access-control decorators and small helpers shared by the blueprint modules.
+"""
+
+from functools import wraps
+
+from flask import flash, redirect, url_for
+from flask_login import current_user
+
+
+def permission_required(permission):
+    """Decorator for routes requiring a specific permission."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated or not current_user.has_permission(permission):
+                flash('У вас нет прав доступа.', 'error')
+                return redirect(url_for('main.index'))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def moderator_required(f):
+    """Decorator for moderator-only routes (deprecated, use permission_required)."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Fallback for old code, check for a common permission like 'manage_products'
+        if not current_user.is_authenticated or not current_user.has_permission('manage_products'):
+            flash('У вас нет прав доступа.', 'error')
+            return redirect(url_for('main.index'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def admin_required(f):
+    """Decorator for admin-only routes."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Check if user is authenticated and has the 'Admin' role
+        if not current_user.is_authenticated or not current_user.has_role('Admin'):
+            flash('У вас нет прав доступа.', 'error')
+            return redirect(url_for('main.index'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg'}
+
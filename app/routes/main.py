@@ -0,0 +1,510 @@
+"""
+Storefront pages: home, cart and checkout, favorites, media and newsletter subscription.
+"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory, abort, current_app
+from datetime import timedelta
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from app.models import db, Product, Category, Order, OrderItem, CartItem, Favorite, Address, Subscriber, OrderStatus, PromoCode, ProductStat
+from app import cross_sell, popularity, shelves
+from app.email import send_order_confirmation_email, send_promo_code_email
+from image_processor import negotiate_image_format, IMAGE_FORMATS
+import os
+import secrets
+from datetime import datetime, timezone
+
+
+
+main_bp = Blueprint('main', __name__)
+
+
+# ============================================================================
+# MAIN ROUTES
+# ============================================================================
+
+def is_subscribed_cookie_set(email):
+    """Проверяет, установлена ли кука подписки для данного email."""
+    return request.cookies.get(f'subscribed_{email}') == 'true'
+
+@main_bp.route('/')
+@main_bp.route('/index')
+def index():
+    """Home page."""
+        # Fetch recommended products (e.g., first 8 marked as recommended)
+    recommended_products = Product.query.filter_by(is_active=True, is_recommended=True).limit(8).all()
+    
+    # Fetch popular categories (e.g., all marked as popular)
+    popular_categories = Category.query.filter_by(is_active=True, is_popular=True).order_by(Category.display_order).all()
+    
+    # Fallback for general products and categories: the most popular products
+    if not recommended_products:
+        recommended_products = Product.query.filter_by(is_active=True).outerjoin(ProductStat).order_by(
+            *popularity.popularity_order()).limit(8).all()
+        
+    if not popular_categories:
+        popular_categories = Category.query.filter_by(is_active=True).order_by(Category.display_order).all()
+    
+    # Проверка статуса подписки для текущего пользователя
+    is_subscribed = False
+    personal_products = []
+    if current_user.is_authenticated:
+        subscriber = Subscriber.query.filter_by(email=current_user.email, is_verified=True).first()
+        is_subscribed = subscriber is not None
+        # Персональная полка по породам питомцев (заранее рассчитана в breed_shelves)
+        personal_products = shelves.personal_shelf(current_user.id)
+        
+    return render_template("index.html", 
+                           recommended_products=recommended_products, 
+                           personal_products=personal_products,
+                           popular_categories=popular_categories, 
+                           is_subscribed=is_subscribed)
+
+
+@main_bp.route('/about')
+def about():
+    """About page."""
+    return render_template('about.html', title='О нас')
+
+
+
+@main_bp.route('/media/<any(products, categories):kind>/<stem>')
+def media(kind, stem):
+    """Serve a product/category image in the best format the client accepts."""
+    folder = os.path.join(current_app.root_path, 'static', 'images', kind)
+    stem = secure_filename(stem)
+    available = [ext for ext in IMAGE_FORMATS if os.path.exists(os.path.join(folder, f'{stem}.{ext}'))]
+    ext = negotiate_image_format(request.accept_mimetypes, available)
+    if not ext:
+        abort(404)
+
+    response = send_from_directory(folder, f'{stem}.{ext}', mimetype=IMAGE_FORMATS[ext]['mimetype'], max_age=31536000)
+    # Кэши должны хранить отдельную копию для каждого варианта Accept
+    response.vary.add('Accept')
+    return response
+
+@main_bp.route('/privacy')
+def privacy():
+    """Privacy policy page."""
+    return render_template('privacy.html')
+
+
+# ============================================================================
+# CART ROUTES
+# ============================================================================
+
+@main_bp.route('/cart')
+def view_cart():
+    """View shopping cart."""
+    if not current_user.is_authenticated:
+        return redirect(url_for('auth.login'))
+    
+    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
+    total = sum(item.product.price * item.quantity for item in cart_items)
+    
+    return render_template('cart/view.html', cart_items=cart_items, total=total)
+
+
+@main_bp.route('/cart/add/<int:product_id>', methods=['POST'])
+def add_to_cart(product_id):
+    """Add product to cart."""
+    if not current_user.is_authenticated:
+        return redirect(url_for('auth.login'))
+        
+    product = Product.query.get_or_404(product_id)
+    quantity = request.form.get('quantity', 1, type=int)
+    
+    if quantity < 1:
+        quantity = 1
+    
+    cart_item = CartItem.query.filter_by(user_id=current_user.id, product_id=product_id).first()
+    
+    if cart_item:
+        cart_item.quantity += quantity
+    else:
+        cart_item = CartItem(user_id=current_user.id, product_id=product_id, quantity=quantity)
+        db.session.add(cart_item)
+    
+    db.session.commit()
+    popularity.record_cart_add(product_id)
+    flash('Товар добавлен в корзину.', 'success')
+    return redirect(url_for('main.view_cart'))
+
+
+@main_bp.route('/cart/apply_promo', methods=['POST'])
+@login_required
+def apply_promo_code():
+    """Apply a promo code to the cart."""
+    code = request.form.get('promo_code', '').strip().upper()
+    
+    if not code:
+        flash('Пожалуйста, введите промокод.', 'error')
+        return redirect(url_for('main.view_cart'))
+        
+    promo_code = PromoCode.query.filter_by(code=code, is_active=True).first()
+    
+    if not promo_code:
+        flash('Неверный или неактивный промокод.', 'error')
+        return redirect(url_for('main.view_cart'))
+        
+    # Check max uses
+    if promo_code.max_uses != -1 and promo_code.current_uses >= promo_code.max_uses:
+        flash('Срок действия промокода истек (достигнуто максимальное количество использований).', 'error')
+        return redirect(url_for('main.view_cart'))
+        
+    # Check validity period
+    now = datetime.now(timezone.utc)
+    if promo_code.valid_until and now > promo_code.valid_until.replace(tzinfo=timezone.utc):
+        flash('Срок действия промокода истек.', 'error')
+        return redirect(url_for('main.view_cart'))
+        
+    # Store promo code in session for use at checkout
+    session['promo_code'] = code
+    
+    flash(f'Промокод "{code}" успешно применен! Скидка будет рассчитана при оформлении заказа.', 'success')
+    return redirect(url_for('main.view_cart'))
+
+
+@main_bp.route('/cart/update/<int:cart_item_id>', methods=['POST'])
+@login_required
+def update_cart_item(cart_item_id):
+    """Update item quantity in cart."""
+    cart_item = CartItem.query.get_or_404(cart_item_id)
+    
+    if cart_item.user_id != current_user.id:
+        is_ajax = request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        if is_ajax:
+            return jsonify({'success': False, 'message': 'Доступ запрещен.'}), 403
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('main.view_cart'))
+        
+    quantity = request.form.get('quantity', type=int)
+    
+    # Если это AJAX-запрос с JSON, получаем quantity из request.json
+    if quantity is None and request.is_json and request.json:
+        json_quantity = request.json.get('quantity')
+        if json_quantity is not None:
+            try:
+                quantity = int(json_quantity)
+            except ValueError:
+                # Если не удалось преобразовать в int, оставляем None, чтобы сработала проверка ниже
+                quantity = None
+    
+    if quantity is None or quantity < 1:
+        is_ajax = request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        if is_ajax:
+            return jsonify({'success': False, 'message': 'Неверное количество.'}), 400
+        flash('Неверное количество.', 'error')
+        return redirect(url_for('main.view_cart'))
+        
+    cart_item.quantity = quantity
+    db.session.commit()
+    
+    # Calculate new totals
+    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
+    subtotal = sum(item.product.price * item.quantity for item in cart_items)
+    
+    # Assuming fixed shipping and tax logic from checkout route
+    # NOTE: The original template shows only subtotal and total, with shipping "calculated at checkout".
+    # We will use the subtotal for the final total for simplicity, as the original template does.
+    # If shipping/tax logic is needed, it should be consistent with the checkout route.
+    # For now, we assume total = subtotal as per the visual in the original template.
+    total = subtotal
+    
+    # Проверяем, является ли запрос AJAX (по заголовку X-Requested-With или Content-Type: application/json)
+    is_ajax = request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    
+    if is_ajax:
+        return jsonify({
+            'success': True,
+            'item_total': int(cart_item.product.price * quantity),
+            'cart_total': int(subtotal)
+        })
+    
+    flash('Количество товара обновлено.', 'success')
+    return redirect(url_for('main.view_cart'))
+
+
+@main_bp.route('/cart/remove/<int:cart_item_id>', methods=['POST'])
+@login_required
+def remove_from_cart(cart_item_id):
+    """Remove item from cart."""
+    cart_item = CartItem.query.get_or_404(cart_item_id)
+    
+    if cart_item.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('main.view_cart'))
+        
+    db.session.delete(cart_item)
+    db.session.commit()
+    
+    flash('Товар удален из корзины.', 'success')
+    return redirect(url_for('main.view_cart'))
+
+
+@main_bp.route('/checkout', methods=['GET', 'POST'])
+@login_required
+def checkout():
+    """Checkout process: select address and confirm order."""
+    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
+    
+    if not cart_items:
+        flash('Ваша корзина пуста.', 'warning')
+        return redirect(url_for('main.view_cart'))
+
+    # Calculate totals
+    subtotal = sum(item.product.price * item.quantity for item in cart_items)
+    shipping_cost = 300.00 # Example fixed shipping cost
+    tax = round(subtotal * 0.05, 2) # Example 5% tax
+    total = subtotal + shipping_cost + tax
+    
+    # Apply promo code if present in session
+    promo_code_obj = None
+    discount_amount = 0.0
+    promo_code_str = session.get('promo_code')
+    
+    if promo_code_str:
+        promo_code_obj = PromoCode.query.filter_by(code=promo_code_str, is_active=True).first()
+        
+        if promo_code_obj:
+            # Check max uses
+            if promo_code_obj.max_uses != -1 and promo_code_obj.current_uses >= promo_code_obj.max_uses:
+                promo_code_obj = None # Invalidate if max uses reached
+            
+            # Check validity period
+            now = datetime.now(timezone.utc)
+            if promo_code_obj and promo_code_obj.valid_until and now > promo_code_obj.valid_until.replace(tzinfo=timezone.utc):
+                promo_code_obj = None # Invalidate if expired
+                
+            if promo_code_obj:
+                if promo_code_obj.discount_type == 'percent':
+                    discount_amount = round(total * (promo_code_obj.discount_value / 100.0), 2)
+                elif promo_code_obj.discount_type == 'fixed':
+                    discount_amount = promo_code_obj.discount_value
+                
+                # Ensure discount does not exceed total
+                if discount_amount > total:
+                    discount_amount = total
+                    
+                total -= discount_amount
+                total = round(total, 2)
+                
+                flash(f'Применена скидка по промокоду "{promo_code_str}": -{discount_amount} ₽', 'info')
+            else:
+                flash(f'Промокод "{promo_code_str}" недействителен или истек.', 'error')
+                session.pop('promo_code', None) # Remove invalid code from session
+        else:
+            session.pop('promo_code', None) # Remove invalid code from session
+    
+    # Store discount in session for POST request
+    session['discount_amount'] = discount_amount
+    session['promo_code_id'] = promo_code_obj.id if promo_code_obj else None
+
+    addresses = Address.query.filter_by(user_id=current_user.id).all()
+    
+    if request.method == 'POST':
+        address_id = request.form.get('address_id', type=int)
+        notes = request.form.get('notes', '').strip()
+        
+        if not address_id:
+            flash('Пожалуйста, выберите адрес доставки.', 'error')
+            return redirect(url_for('main.checkout'))
+        
+        address = Address.query.get(address_id)
+        if not address or address.user_id != current_user.id:
+            flash('Неверный адрес доставки.', 'error')
+            return redirect(url_for('main.checkout'))
+
+        # Retrieve discount from session
+        discount_amount = session.pop('discount_amount', 0.0)
+        promo_code_id = session.pop('promo_code_id', None)
+        
+        # Recalculate total to ensure consistency (should match GET request logic)
+        subtotal_post = sum(item.product.price * item.quantity for item in cart_items)
+        shipping_cost_post = 300.00
+        tax_post = round(subtotal_post * 0.05, 2)
+        total_post = subtotal_post + shipping_cost_post + tax_post - discount_amount
+        total_post = round(total_post, 2)
+        
+        # Increment promo code usage if used
+        if promo_code_id:
+            promo_code_obj = PromoCode.query.get(promo_code_id)
+            if promo_code_obj:
+                promo_code_obj.current_uses += 1
+        
+        # Create Order
+        order_number = secrets.token_hex(8).upper() # Simple unique order number
+        
+        new_order = Order(
+            user_id=current_user.id,
+            address_id=address.id,
+            order_number=order_number,
+            subtotal=subtotal_post,
+            shipping_cost=shipping_cost_post,
+            tax=tax_post,
+            total=total_post,
+            promo_code_id=promo_code_id,
+            discount_amount=discount_amount,
+            notes=notes,
+            status=OrderStatus.PENDING
+        )
+        db.session.add(new_order)
+        db.session.flush() # Get order ID
+
+        # Move Cart Items to Order Items
+        for item in cart_items:
+            order_item = OrderItem(
+                order_id=new_order.id,
+                product_id=item.product_id,
+                product_name=item.product.name, # <-- ДОБАВЛЕНО
+                quantity=item.quantity,
+                price=item.product.price, # Save price at time of order
+                subtotal=item.product.price * item.quantity # Calculate subtotal for item
+            )
+            db.session.add(order_item)
+            db.session.delete(item) # Remove from cart
+
+        db.session.commit()
+        
+        # Send order confirmation email
+        send_order_confirmation_email(new_order)
+        
+        flash(f'Заказ №{order_number} успешно оформлен!', 'success')
+        return redirect(url_for('main.order_confirmation', order_id=new_order.id))
+
+    # Товары, которые часто покупают вместе с содержимым корзины
+    bought_together = cross_sell.bought_together([item.product_id for item in cart_items], limit=4)
+
+    return render_template('cart/checkout.html', 
+                           cart_items=cart_items, 
+                           subtotal=subtotal, 
+                           shipping_cost=shipping_cost, 
+                           tax=tax, 
+                           total=total, 
+                           addresses=addresses,
+                           bought_together=bought_together)
+
+
+@main_bp.route('/order-confirmation/<int:order_id>')
+@login_required
+def order_confirmation(order_id):
+    """Order confirmation page."""
+    order = Order.query.get_or_404(order_id)
+    
+    if order.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('main.index'))
+    
+    return render_template('cart/confirmation.html', order=order)
+
+
+
+# ============================================================================
+# FAVORITES ROUTES
+# ============================================================================
+
+@main_bp.route('/favorite/add/<int:product_id>', methods=['POST'])
+@login_required
+def add_to_favorites(product_id):
+    """Add product to favorites."""
+    product = Product.query.get_or_404(product_id)
+    
+    favorite = Favorite.query.filter_by(user_id=current_user.id, product_id=product_id).first()
+    
+    if not favorite:
+        favorite = Favorite(user_id=current_user.id, product_id=product_id)
+        db.session.add(favorite)
+        db.session.commit()
+        flash('Товар добавлен в избранное.', 'success')
+    else:
+        flash('Товар уже в избранном.', 'info')
+    
+    return redirect(request.referrer or url_for('product.view', product_id=product_id))
+
+
+@main_bp.route('/favorite/remove/<int:product_id>', methods=['POST'])
+@login_required
+def remove_from_favorites(product_id):
+    """Remove product from favorites."""
+    favorite = Favorite.query.filter_by(user_id=current_user.id, product_id=product_id).first_or_404()
+    
+    db.session.delete(favorite)
+    db.session.commit()
+    flash('Товар удален из избранного.', 'success')
+    return redirect(request.referrer or url_for('main.index'))
+
+
+
+@main_bp.route('/verify-subscription')
+def verify_subscription():
+    """Verify newsletter subscription (legacy route, now auto-verified)."""
+    flash('Подписка уже подтверждена автоматически.', 'info')
+    return redirect(url_for('main.index'))
+
+
+# ============================================================================
+# NEWSLETTER SUBSCRIPTION
+# ============================================================================
+
+@main_bp.route('/subscribe', methods=['POST'], endpoint='subscribe')
+def handle_subscription():
+    """Мгновенная подписка на рассылку с отправкой приветственного промокода WELCOME30"""
+    email = request.form.get('email', '').strip()
+
+    if not email:
+        flash('Пожалуйста, введите email.', 'error')
+        return redirect(url_for('main.index'))
+
+    # Проверяем, не подписан ли уже
+    existing_subscriber = Subscriber.query.filter_by(email=email).first()
+    if existing_subscriber and existing_subscriber.is_verified:
+        flash('Вы уже подписаны на рассылку.', 'info')
+        return redirect(url_for('main.index'))
+
+    # Создаём или обновляем подписчика (автоматически верифицируем)
+    if existing_subscriber:
+        # Обновляем существующего подписчика
+        existing_subscriber.is_verified = True
+        existing_subscriber.verified_at = datetime.now(timezone.utc)
+        existing_subscriber.verification_token = None
+        existing_subscriber.verification_token_expires = None
+        db.session.commit()
+        subscriber = existing_subscriber
+    else:
+        # Создаём нового подписчика
+        subscriber = Subscriber(
+            email=email,
+            is_active=True,
+            is_verified=True,
+            verified_at=datetime.now(timezone.utc)
+        )
+        db.session.add(subscriber)
+        db.session.commit()
+
+    # Генерируем приветственный промокод WELCOME30 (30% скидка)
+    promo_code_str = "WELCOME30"
+    expires_at = datetime.now(timezone.utc) + timedelta(days=30)
+
+    # Проверяем, существует ли уже такой промокод
+    existing_promo = PromoCode.query.filter_by(code=promo_code_str).first()
+    if not existing_promo:
+        promo_code = PromoCode(
+            code=promo_code_str,
+            discount_type='percent',
+            discount_value=30.0,
+            max_uses=1,  # Только для одного использования
+            valid_until=expires_at,
+            is_active=True
+        )
+        db.session.add(promo_code)
+        db.session.commit()
+    else:
+        promo_code = existing_promo
+
+    # Отправляем приветственное письмо с промокодом
+    if send_promo_code_email(email, promo_code_str):
+        flash('Поздравляем! Вы подписались на рассылку. Проверьте почту - там промокод WELCOME30 на 30% скидку!', 'success')
+    else:
+        flash('Вы подписались на рассылку! Промокод WELCOME30 сохранён, но письмо не удалось отправить.', 'warning')
+
+    return redirect(url_for('main.index'))
@@ -0,0 +1,97 @@
+"""
+Catalog routes: product list, product page and reviews.
+"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from app.models import db, Product, Category, Favorite, Review, ProductStat
+from sqlalchemy.orm import joinedload
+from app import cross_sell, popularity
+from datetime import datetime, timezone
+
+
+
+product_bp = Blueprint('product', __name__, url_prefix='/product')
+
+
+# ============================================================================
+# PRODUCT ROUTES
+# ============================================================================
+
+@product_bp.route('/list')
+def list_products():
+    """Product listing page."""
+    page = request.args.get('page', 1, type=int)
+    category_id = request.args.get('category', type=int)
+    search = request.args.get('search', '').strip()
+    
+    query = Product.query
+    
+    if category_id:
+        query = query.filter_by(category_id=category_id)
+    
+    if search:
+        query = query.filter(Product.name.ilike(f'%{search}%'))
+
+    # Сначала популярные товары (оценка пересчитывается периодически)
+    query = query.outerjoin(ProductStat).order_by(*popularity.popularity_order())
+    
+    products = query.paginate(page=page, per_page=12)
+    Product.preload_average_ratings(products.items)
+    categories = Category.query.all()
+    
+    return render_template('products/list.html', products=products, categories=categories, search=search)
+
+
+@product_bp.route('/<int:product_id>')
+def view(product_id):
+    """Product detail page."""
+    product = Product.query.get_or_404(product_id)
+    reviews = Review.query.filter_by(product_id=product_id, is_approved=True).options(joinedload(Review.user)).all()
+    popularity.record_view(product_id)
+    
+    is_favorite = False
+    if current_user.is_authenticated:
+        is_favorite = Favorite.query.filter_by(user_id=current_user.id, product_id=product_id).first() is not None
+
+    # С этим товаром покупают (рассчитывается периодически в product_associations)
+    bought_together = cross_sell.bought_together([product_id])
+    
+    return render_template('products/detail.html', product=product, reviews=reviews, is_favorite=is_favorite,
+                           bought_together=bought_together)
+
+
+@product_bp.route('/<int:product_id>/review', methods=['POST'])
+@login_required
+def add_review(product_id):
+    """Add product review."""
+    product = Product.query.get_or_404(product_id)
+
+    rating = request.form.get('rating', type=float)
+    title = request.form.get('title', '').strip()
+    content = request.form.get('content', '').strip()
+
+    if not rating or rating < 1.0 or rating > 5.0:
+        flash('Неверная оценка.', 'error')
+        return redirect(url_for('product.view', product_id=product_id))
+
+    # Check if user already reviewed
+    existing_review = Review.query.filter_by(user_id=current_user.id, product_id=product_id).first()
+    if existing_review:
+        existing_review.rating = rating
+        existing_review.title = title
+        existing_review.content = content
+        existing_review.updated_at = datetime.now(timezone.utc)
+    else:
+        review = Review(
+            product_id=product_id,
+            user_id=current_user.id,
+            rating=rating, is_approved=False,
+            title=title,
+            content=content
+        )
+        db.session.add(review)
+
+    db.session.commit()
+    flash('Отзыв добавлен успешно.', 'success')
+    return redirect(url_for('product.view', product_id=product_id))
@@ -0,0 +1,281 @@
+"""
+User profile: personal data, orders, addresses, pets and favorites.
+"""
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from app.models import db, Order, Favorite, Address, OrderStatus, Breed, Pet
+from sqlalchemy.orm import joinedload, selectinload
+from datetime import datetime, timezone
+
+
+
+profile_bp = Blueprint('profile', __name__, url_prefix='/profile')
+
+
+# ============================================================================
+# PROFILE ROUTES
+# ============================================================================
+
+@profile_bp.route('/')
+@login_required
+def view_profile():
+    """View user profile."""
+    return render_template('profile/view.html', user=current_user)
+
+
+@profile_bp.route('/edit', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    """Edit user profile."""
+    if request.method == 'POST':
+        current_user.first_name = request.form.get('first_name', '').strip()
+        current_user.last_name = request.form.get('last_name', '').strip()
+        current_user.phone = request.form.get('phone', '').strip()
+        current_user.updated_at = datetime.now(timezone.utc)
+        
+        db.session.commit()
+        flash('Профиль обновлен.', 'success')
+        return redirect(url_for('profile.view_profile'))
+    
+    return render_template('profile/edit.html', user=current_user)
+
+
+@profile_bp.route('/orders')
+@login_required
+def view_orders():
+    """View user orders."""
+    # Позиции и адреса всех заказов — двумя запросами, а не по запросу на заказ
+    orders = (Order.query.filter_by(user_id=current_user.id)
+              .options(selectinload(Order.items), joinedload(Order.address))
+              .order_by(Order.created_at.desc()).all())
+    return render_template('profile/orders.html', orders=orders)
+
+
+@profile_bp.route('/order/<int:order_id>')
+@login_required
+def view_order_detail(order_id):
+    """View user order detail."""
+    order = Order.query.get_or_404(order_id)
+    
+    # Security check: ensure the order belongs to the current user
+    if order.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('profile.view_orders'))
+    
+    return render_template('profile/order_detail.html', order=order)
+
+
+@profile_bp.route('/addresses', methods=['GET', 'POST'])
+@login_required
+def manage_addresses():
+    """Manage user addresses."""
+    if request.method == 'POST':
+        full_name = request.form.get('full_name', '').strip()
+        phone = request.form.get('phone', '').strip()
+        street = request.form.get('street', '').strip()
+        city = request.form.get('city', '').strip()
+        postal_code = request.form.get('postal_code', '').strip()
+        
+        if not all([full_name, phone, street, city]):
+            flash('Пожалуйста, заполните все обязательные поля.', 'error')
+            return redirect(url_for('profile.manage_addresses'))
+        
+        address = Address(
+            user_id=current_user.id,
+            full_name=full_name,
+            phone=phone,
+            street=street,
+            city=city,
+            postal_code=postal_code
+        )
+        db.session.add(address)
+        db.session.commit()
+        flash('Адрес добавлен.', 'success')
+        return redirect(url_for('profile.manage_addresses'))
+    
+    addresses = Address.query.filter_by(user_id=current_user.id).all()
+    return render_template('profile/addresses.html', addresses=addresses)
+
+
+@profile_bp.route('/pets', methods=['GET', 'POST'])
+@login_required
+def manage_pets():
+    """Manage user pets used for personalized recommendations."""
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        breed_id = request.form.get('breed_id', type=int)
+        pet_type = request.form.get('pet_type', '').strip()
+
+        breed = db.session.get(Breed, breed_id) if breed_id else None
+        if breed:
+            pet_type = breed.pet_type
+        if not pet_type:
+            flash('Укажите породу или вид питомца.', 'error')
+            return redirect(url_for('profile.manage_pets'))
+
+        pet = Pet(user_id=current_user.id, name=name or None, breed_id=breed.id if breed else None,
+                  pet_type=pet_type, source='declared')
+        db.session.add(pet)
+        db.session.commit()
+        flash('Питомец добавлен.', 'success')
+        return redirect(url_for('profile.manage_pets'))
+
+    pets = Pet.query.filter_by(user_id=current_user.id).order_by(Pet.created_at).all()
+    breeds = Breed.query.order_by(Breed.pet_type, Breed.name).all()
+    return render_template('profile/pets.html', pets=pets, breeds=breeds)
+
+
+@profile_bp.route('/pet/delete/<int:pet_id>', methods=['POST'])
+@login_required
+def delete_pet(pet_id):
+    """Delete a user pet."""
+    pet = Pet.query.get_or_404(pet_id)
+
+    if pet.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('profile.manage_pets'))
+
+    db.session.delete(pet)
+    db.session.commit()
+    flash('Питомец удален.', 'success')
+
+    return redirect(url_for('profile.manage_pets'))
+
+
+@profile_bp.route('/address/delete/<int:address_id>', methods=['POST'])
+@login_required
+def delete_address(address_id):
+    """Delete a user address."""
+    address = Address.query.get_or_404(address_id)
+    
+    if address.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('profile.manage_addresses'))
+    
+    # Check if the address is used in any order
+    if Order.query.filter_by(address_id=address_id).first():
+        flash('Невозможно удалить адрес, так как он используется в одном или нескольких заказах.', 'error')
+        return redirect(url_for('profile.manage_addresses'))
+        
+    db.session.delete(address)
+    db.session.commit()
+    flash('Адрес удален.', 'success')
+    
+    return redirect(url_for('profile.manage_addresses'))
+
+
+@profile_bp.route('/address/edit/<int:address_id>', methods=['GET', 'POST'])
+@login_required
+def edit_address(address_id):
+    """Edit a user address."""
+    address = Address.query.get_or_404(address_id)
+    
+    if address.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('profile.manage_addresses'))
+        
+    if request.method == 'POST':
+        address.full_name = request.form.get('full_name', '').strip()
+        address.phone = request.form.get('phone', '').strip()
+        address.street = request.form.get('street', '').strip()
+        address.city = request.form.get('city', '').strip()
+        address.postal_code = request.form.get('postal_code', '').strip()
+        
+        if not all([address.full_name, address.phone, address.street, address.city]):
+            flash('Пожалуйста, заполните все обязательные поля.', 'error')
+            return redirect(url_for('profile.edit_address', address_id=address.id))
+            
+        db.session.commit()
+        flash('Адрес обновлен.', 'success')
+        return redirect(url_for('profile.manage_addresses'))
+        
+    # GET request: render form
+    return render_template('profile/address_form.html', address=address, form_title='Редактировать адрес')
+
+
+
+@profile_bp.route('/change-password', methods=['GET', 'POST'])
+@login_required
+def change_password():
+    """User change password route."""
+    if request.method == 'POST':
+        old_password = request.form.get('old_password', '')
+        new_password = request.form.get('new_password', '')
+        new_password_confirm = request.form.get('new_password_confirm', '')
+        
+        if not all([old_password, new_password, new_password_confirm]):
+            flash('Пожалуйста, заполните все поля.', 'error')
+            return redirect(url_for('profile.change_password'))
+        
+        if new_password != new_password_confirm:
+            flash('Новые пароли не совпадают.', 'error')
+            return redirect(url_for('profile.change_password'))
+        
+        if len(new_password) < 6:
+            flash('Новый пароль должен быть не менее 6 символов.', 'error')
+            return redirect(url_for('profile.change_password'))
+        
+        if not current_user.check_password(old_password):
+            flash('Неверный текущий пароль.', 'error')
+            return redirect(url_for('profile.change_password'))
+        
+        # Update password
+        current_user.set_password(new_password)
+        db.session.commit()
+        
+        flash('Пароль успешно изменен.', 'success')
+        return redirect(url_for('profile.view_profile'))
+
+    return render_template('profile/change_password.html')
+
+
+@profile_bp.route('/cancel-order/<int:order_id>', methods=['POST'])
+@login_required
+def cancel_order(order_id):
+    """Cancel an order."""
+    order = Order.query.get_or_404(order_id)
+    
+    if order.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('profile.view_orders'))
+    
+    # Logic for cancellation: only allow if status is 'pending'
+    if order.status == OrderStatus.PENDING:
+        order.status = OrderStatus.CANCELLED
+        db.session.commit()
+        flash(f'Заказ №{order.order_number} отменен.', 'success')
+    else:
+        flash(f'Заказ №{order.order_number} не может быть отменен, так как его статус: {order.status.value}.', 'error')
+        
+    return redirect(url_for('profile.view_order_detail', order_id=order.id))
+
+
+@profile_bp.route('/return-order/<int:order_id>', methods=['POST'])
+@login_required
+def return_order(order_id):
+    """Request a return for an order."""
+    order = Order.query.get_or_404(order_id)
+    
+    if order.user_id != current_user.id:
+        flash('Доступ запрещен.', 'error')
+        return redirect(url_for('profile.view_orders'))
+    
+    # Logic for return: only allow if status is 'delivered'
+    if order.status == OrderStatus.DELIVERED:
+        # In a real app, this would change the status to 'return_requested' 
+        # and notify admin. For now, we'll just flash a message.
+        flash(f'Запрос на возврат заказа №{order.order_number} отправлен. Ожидайте связи с менеджером.', 'success')
+    else:
+        flash(f'Возврат заказа №{order.order_number} невозможен, так как его статус: {order.status.value}.', 'error')
+        
+    return redirect(url_for('profile.view_order_detail', order_id=order.id))
+
+
+@profile_bp.route('/favorites')
+@login_required
+def view_favorites():
+    """View user favorites."""
+    favorites = Favorite.query.filter_by(user_id=current_user.id).all()
+    products = [fav.product for fav in favorites]
+    return render_template('profile/favorites.html', products=products)
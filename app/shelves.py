@@ -0,0 +1,123 @@
+"""
+Personalized home page shelves.
+
+Pets are stored per user, either declared in the profile or remembered from
+breed detection. ``flask shelves rebuild`` (run periodically, e.g. from cron)
+precomputes a ranked product shelf per breed into ``breed_shelves`` and one
+per pet type into ``pet_type_shelves`` (for pets declared without a breed),
+so the home page renders a user's shelf with one indexed query instead of
+live breed joins:
+
+    */30 * * * * cd /srv/petshop && flask shelves rebuild
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import and_, func, select, union_all
+
+from app import breed_index
+from app.models import (db, Breed, BreedShelf, Order, OrderItem, OrderStatus, Pet, PetTypeShelf, Product,
+                        product_breeds)
+
+
+def remember_detected_pet(user_id, result_data):
+    """Store a detected breed as the user's pet unless it is already known; the caller commits."""
+    breed = breed_index.get_index().resolve(result_data.get('breed_name'), result_data.get('pet_type'))
+    if breed is None:
+        return None
+    exists = db.session.query(Pet.id).filter_by(user_id=user_id, breed_id=breed['id']).first()
+    if exists:
+        return None
+    pet = Pet(user_id=user_id, breed_id=breed['id'], pet_type=breed['pet_type'], source='detected')
+    db.session.add(pet)
+    return pet
+
+
+def build_breed_shelves(size=None):
+    """Recompute every breed and pet type shelf; returns the number of rows written."""
+    size = size or current_app.config['BREED_SHELF_SIZE']
+
+    # Продажи по товарам (без отмененных заказов)
+    sales = dict(
+        db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.status != OrderStatus.CANCELLED)
+        .group_by(OrderItem.product_id)
+    )
+    breeds = {b.id: b.pet_type for b in Breed.query.all()}
+    links = (
+        db.session.query(product_breeds.c.breed_id, product_breeds.c.product_id)
+        .join(Product, Product.id == product_breeds.c.product_id)
+        .filter(Product.is_active.is_(True))
+        .all()
+    )
+
+    by_breed = {}
+    breadth = {}  # pet_type -> Counter(product_id -> linked breeds of that type)
+    for breed_id, product_id in links:
+        if breed_id not in breeds:
+            continue
+        by_breed.setdefault(breed_id, []).append(product_id)
+        breadth.setdefault(breeds[breed_id], Counter())[product_id] += 1
+
+    def rank(product_ids, counts=None):
+        return sorted(product_ids, key=lambda pid: (-sales.get(pid, 0), -(counts or {}).get(pid, 0), pid))
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for breed_id, pet_type in breeds.items():
+        shelf = rank(by_breed.get(breed_id, []))[:size]
+        # Дополняем полку популярными товарами для того же типа животного
+        if len(shelf) < size and pet_type in breadth:
+            for product_id in rank(breadth[pet_type], breadth[pet_type]):
+                if len(shelf) >= size:
+                    break
+                if product_id not in shelf:
+                    shelf.append(product_id)
+        rows.extend(
+            {'breed_id': breed_id, 'position': position, 'product_id': product_id, 'built_at': now}
+            for position, product_id in enumerate(shelf)
+        )
+
+    # Питомцы без породы: самые продаваемые товары для их вида
+    type_rows = [
+        {'pet_type': pet_type, 'position': position, 'product_id': product_id, 'built_at': now}
+        for pet_type, counts in breadth.items()
+        for position, product_id in enumerate(rank(counts, counts)[:size])
+    ]
+
+    # Полки заменяются целиком в одной транзакции, читатели видят старую или новую версию
+    BreedShelf.query.delete(synchronize_session=False)
+    PetTypeShelf.query.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(BreedShelf.__table__.insert(), rows)
+    if type_rows:
+        db.session.execute(PetTypeShelf.__table__.insert(), type_rows)
+    db.session.commit()
+    return len(rows) + len(type_rows)
+
+
+def personal_shelf(user_id, limit=8):
+    """Products from the shelves of the user's pets, best positions first, in a single query.
+
+    A pet with a breed contributes its breed shelf, a pet without one the shelf of its pet type.
+    """
+    shelf = union_all(
+        select(BreedShelf.product_id, BreedShelf.position)
+        .join(Pet, Pet.breed_id == BreedShelf.breed_id)
+        .where(Pet.user_id == user_id),
+        select(PetTypeShelf.product_id, PetTypeShelf.position)
+        .join(Pet, and_(Pet.pet_type == PetTypeShelf.pet_type, Pet.breed_id.is_(None)))
+        .where(Pet.user_id == user_id),
+    ).subquery()
+    return (
+        Product.query
+        .join(shelf, shelf.c.product_id == Product.id)
+        .filter(Product.is_active.is_(True))
+        .group_by(Product.id)
+        .order_by(func.min(shelf.c.position), Product.id)
+        .limit(limit)
+        .all()
+    )
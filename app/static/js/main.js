@@ -13,7 +13,7 @@ document.addEventListener('DOMContentLoaded', function () {
     const fileInput = document.getElementById('fileInput');
     const fileSelectBtn = document.getElementById('fileSelectBtn');
     const dropArea = document.getElementById('drop-area');
-    const imagePreview = document.getElementById('image-preview');
+    const imagePreviewList = document.getElementById('image-preview-list');
     const imagePreviewContainer = document.getElementById('image-preview-container');
     const removeImageBtn = document.getElementById('removeImageBtn');
     const analyzeBtn = document.getElementById('analyzeBtn');
@@ -21,10 +21,21 @@ document.addEventListener('DOMContentLoaded', function () {
     const resultsContainer = document.getElementById('results-container');
     const errorMessage = document.getElementById('error-message');
     const recommendationsList = document.getElementById('recommendations-list');
+    const singleResult = document.getElementById('single-result');
+    const petResults = document.getElementById('pet-results');
 
     if (!dropArea) return; // Выходим, если мы не на странице breed-detect
 
-    let uploadedFile = null;
+    let uploadedFiles = [];
+
+    // Лимиты загрузки, объявленные сервером
+    const MAX_DIMENSION = parseInt(dropArea.dataset.maxDimension, 10) || 1024;
+    const MAX_BYTES = parseInt(dropArea.dataset.maxBytes, 10) || 5 * 1024 * 1024;
+    const MAX_FILES = parseInt(dropArea.dataset.maxFiles, 10) || 5;
+    const UPLOAD_QUALITY = 0.85;
+    let pollAttempts = 0;
+    const POLL_INTERVAL_MS = 1000;
+    const MAX_POLL_ATTEMPTS = 90;
 
     // --- Вспомогательные функции ---
     function showMessage(text, type = 'danger') {
@@ -44,8 +55,10 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     function resetUI() {
-        uploadedFile = null;
+        uploadedFiles = [];
         fileInput.value = '';
+        imagePreviewList.innerHTML = '';
+        petResults.innerHTML = '';
         imagePreviewContainer.style.display = 'none';
         dropArea.style.display = 'block';
         analyzeBtn.disabled = true;
@@ -55,36 +68,43 @@ document.addEventListener('DOMContentLoaded', function () {
         hideMessage();
     }
 
-    function displayFile(file) {
-        uploadedFile = file;
-        const reader = new FileReader();
-        reader.onload = function (e) {
-            imagePreview.src = e.target.result;
-            imagePreviewContainer.style.display = 'block';
-            dropArea.style.display = 'none';
-            analyzeBtn.disabled = false;
-        };
-        reader.readAsDataURL(file);
+    function displayFiles(files) {
+        uploadedFiles = files;
+        imagePreviewList.innerHTML = '';
+        imagePreviewList.classList.toggle('multiple', files.length > 1);
+        files.forEach(file => {
+            const img = document.createElement('img');
+            img.alt = 'Предварительный просмотр';
+            img.className = 'img-fluid rounded';
+            imagePreviewList.appendChild(img);
+
+            const reader = new FileReader();
+            reader.onload = function (e) {
+                img.src = e.target.result;
+            };
+            reader.readAsDataURL(file);
+        });
+        imagePreviewContainer.style.display = 'block';
+        dropArea.style.display = 'none';
+        analyzeBtn.disabled = false;
     }
 
     function handleFiles() {
         if (!fileInput.files.length) return;
-        const file = fileInput.files[0];
+        const files = Array.from(fileInput.files);
 
-        // Проверка размера (5 МБ)
-        if (file.size > 5 * 1024 * 1024) {
-            showMessage('Файл слишком большой! Максимум 5 МБ.');
+        if (files.some(file => !file.type.startsWith('image/'))) {
+            showMessage('Недопустимый формат файла. Выберите изображение.');
             resetUI();
             return;
         }
-        
-        if (!file.type.startsWith('image/')) {
-            showMessage('Недопустимый формат файла. Выберите изображение.');
+        if (files.length > MAX_FILES) {
+            showMessage(`Можно загрузить не более ${MAX_FILES} фото за раз.`);
             resetUI();
             return;
         }
 
-        displayFile(file);
+        displayFiles(files);
     }
 
     // --- Обработчики событий ---
@@ -126,7 +146,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // --- AJAX Логика ---
     function analyzeImage() {
-        if (!uploadedFile) {
+        if (!uploadedFiles.length) {
             showMessage('Пожалуйста, загрузите изображение.');
             return;
         }
@@ -135,45 +155,149 @@ document.addEventListener('DOMContentLoaded', function () {
         showLoading(true);
         resultsContainer.style.display = 'none';
 
-        const formData = new FormData();
-        formData.append('file', uploadedFile);
+        Promise.all(uploadedFiles.map(downscaleImage))
+        .then(blobs => {
+            const formData = new FormData();
+            blobs.forEach((blob, i) => {
+                if (blob.size > MAX_BYTES) {
+                    throw new Error(`Файл слишком большой! Максимум ${Math.round(MAX_BYTES / 1024 / 1024)} МБ.`);
+                }
+                const extension = blob.type === 'image/webp' ? 'webp' : (blob.type === 'image/jpeg' ? 'jpg' : 'img');
+                formData.append('file', blob, `photo-${i + 1}.${extension}`);
+            });
 
-        fetch('/breed-detect', {
-            method: 'POST',
-            body: formData
+            return fetch('/breed-detect', {
+                method: 'POST',
+                body: formData
+            });
         })
-        .then(response => {
-            if (!response.ok) {
-                return response.json().then(err => { throw err; }).catch(() => {
-                    throw new Error('Ошибка сервера. Попробуйте позже.');
-                });
+        .then(parseJsonResponse)
+        .then(handleJob)
+        .catch(handleError);
+    }
+
+    // Уменьшает фото до MAX_DIMENSION по длинной стороне и перекодирует в WebP/JPEG,
+    // чтобы не отправлять на сервер исходник с камеры (5-12 МБ)
+    function downscaleImage(file) {
+        if (typeof createImageBitmap !== 'function') {
+            return Promise.resolve(file);
+        }
+        return createImageBitmap(file, { imageOrientation: 'from-image' }).then(bitmap => {
+            const scale = Math.min(1, MAX_DIMENSION / Math.max(bitmap.width, bitmap.height));
+            const alreadyCompact = scale === 1 && file.size <= MAX_BYTES &&
+                (file.type === 'image/jpeg' || file.type === 'image/webp');
+            if (alreadyCompact) {
+                bitmap.close();
+                return file;
             }
-            return response.json();
-        })
-        .then(data => {
-            showLoading(false);
-            if (data.success) {
-                updateResults(data.breed_data, data.recommendations, data.recommendation_title);
-            } else {
-                showMessage(data.message || 'Не удалось определить породу.');
+
+            const width = Math.round(bitmap.width * scale);
+            const height = Math.round(bitmap.height * scale);
+            const canvas = typeof OffscreenCanvas === 'function'
+                ? new OffscreenCanvas(width, height)
+                : Object.assign(document.createElement('canvas'), { width, height });
+            const ctx = canvas.getContext('2d');
+            ctx.fillStyle = '#fff'; // прозрачные PNG -> белый фон
+            ctx.fillRect(0, 0, width, height);
+            ctx.drawImage(bitmap, 0, 0, width, height);
+            bitmap.close();
+
+            return encodeCanvas(canvas, 'image/webp').then(blob =>
+                // Safari не умеет кодировать WebP и молча возвращает PNG
+                blob && blob.type === 'image/webp' ? blob : encodeCanvas(canvas, 'image/jpeg')
+            );
+        }).catch(() => file); // Браузер не смог декодировать - отправляем исходник
+    }
+
+    function encodeCanvas(canvas, type) {
+        if (canvas.convertToBlob) {
+            return canvas.convertToBlob({ type, quality: UPLOAD_QUALITY });
+        }
+        return new Promise(resolve => canvas.toBlob(resolve, type, UPLOAD_QUALITY));
+    }
+
+    function parseJsonResponse(response) {
+        if (!response.ok) {
+            return response.json().then(
+                err => { throw new Error(err.message || 'Ошибка сервера. Попробуйте позже.'); },
+                () => { throw new Error('Ошибка сервера. Попробуйте позже.'); }
+            );
+        }
+        return response.json();
+    }
+
+    // Сервер возвращает id задачи сразу; результат получаем опросом status_url
+    function handleJob(data) {
+        if (data.status === 'pending' || data.status === 'running') {
+            pollAttempts += 1;
+            if (pollAttempts > MAX_POLL_ATTEMPTS) {
+                throw new Error('Анализ занимает слишком много времени. Попробуйте позже.');
             }
-        })
-        .catch(error => {
-            showLoading(false);
-            console.error('Fetch Error:', error);
-            showMessage(error.message || 'Произошла непредвиденная ошибка.');
-        });
+            setTimeout(() => {
+                fetch(data.status_url, { headers: { 'Accept': 'application/json' } })
+                    .then(parseJsonResponse)
+                    .then(handleJob)
+                    .catch(handleError);
+            }, POLL_INTERVAL_MS);
+            return;
+        }
+
+        pollAttempts = 0;
+        showLoading(false);
+        if (data.success && data.batch_id) {
+            updateBatchResults(data.pets, data.recommendations, data.recommendation_title);
+        } else if (data.success) {
+            updateResults(data.breed_data, data.recommendations, data.recommendation_title);
+        } else {
+            showMessage(data.message || 'Не удалось определить породу.');
+        }
+    }
+
+    function handleError(error) {
+        pollAttempts = 0;
+        showLoading(false);
+        console.error('Fetch Error:', error);
+        showMessage(error.message || 'Произошла непредвиденная ошибка.');
     }
 
     function updateResults(breedData, recommendations, recommendationTitle) {
-        const recommendedBreedNameEl = document.getElementById('recommended-breed-name');
-        const recommendationsTitleEl = document.getElementById('recommendations-title');
-        const recommendationsBlock = document.getElementById('recommendations-block');
-        
+        singleResult.style.display = 'block';
+        petResults.innerHTML = '';
         document.getElementById('breed-name').textContent = breedData.breed_name;
         document.getElementById('confidence-score').textContent = breedData.confidence;
         document.getElementById('breed-description').textContent = breedData.description;
-        
+
+        renderRecommendations(recommendations, recommendationTitle);
+    }
+
+    // Несколько фото: карточка на каждого питомца и общий список товаров
+    function updateBatchResults(pets, recommendations, recommendationTitle) {
+        singleResult.style.display = 'none';
+        petResults.innerHTML = '';
+        pets.forEach((pet, i) => {
+            const card = document.createElement('div');
+            card.className = 'result-card p-3 rounded shadow-sm';
+            const title = document.createElement('h3');
+            title.className = 'text-primary';
+            const text = document.createElement('p');
+            if (pet.status === 'done') {
+                title.textContent = `Фото ${i + 1}: ${pet.breed_data.breed_name}`;
+                text.textContent = `Уверенность: ${pet.breed_data.confidence}. ${pet.breed_data.description}`;
+            } else {
+                title.textContent = `Фото ${i + 1}`;
+                text.textContent = pet.message || 'Не удалось определить породу.';
+            }
+            card.append(title, text);
+            petResults.appendChild(card);
+        });
+
+        renderRecommendations(recommendations, recommendationTitle);
+    }
+
+    function renderRecommendations(recommendations, recommendationTitle) {
+        const recommendedBreedNameEl = document.getElementById('recommended-breed-name');
+        const recommendationsBlock = document.getElementById('recommendations-block');
+
         // Обновление заголовка рекомендаций
         recommendedBreedNameEl.textContent = recommendationTitle;
         
@@ -190,6 +314,7 @@ document.addEventListener('DOMContentLoaded', function () {
                             <div class="card-body d-flex flex-column">
                                 <h5 class="card-title">${item.name}</h5>
                                 <p class="card-text text-primary fw-bold">${formatPrice(item.price)}</p>
+                                ${item.fits > 1 ? `<p class="card-text small text-success">Подходит ${item.fits} питомцам</p>` : ''}
                                 <div class="mt-auto d-flex justify-content-between">
                                     <a href="${item.url}" class="btn btn-sm btn-outline-primary">Подробнее</a>
                                     <button type="button" class="btn btn-sm btn-success add-to-cart-btn" data-product-id="${item.id}">В корзину</button>
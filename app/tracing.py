@@ -0,0 +1,543 @@
+"""
+Lightweight span tracing.
+
+A sampled request gets a root span with nested child spans for every SQL
+statement, template render, ``mail.send``, product image processing and
+breed classifier (Gemini) call:
+
+    GET main.checkout                      2013.4 ms
+      db.query SELECT ... FROM cart_items     3.1 ms
+      ...
+      mail.send                            1702.9 ms
+      render_template checkout.html          11.0 ms
+
+Sampling is decided once per request (TRACE_SAMPLE_RATE, 0 disables tracing)
+and the response carries the ``traceparent`` of the request's trace. An
+incoming W3C ``traceparent`` header with the sampled flag continues the
+caller's trace only with TRACE_TRUST_TRACEPARENT, i.e. when every request
+comes through a gateway that sets or strips the header; otherwise any client
+could force tracing. Breed detection jobs continue the trace of the request
+that queued them.
+
+Finished traces are handed to a background thread and exported either as
+JSON lines to TRACE_FILE (``TRACE_EXPORTER=jsonl``, rolled over to
+``TRACE_FILE.1`` ... at TRACE_FILE_MAX_BYTES) or as OTLP/HTTP JSON to
+TRACE_OTLP_ENDPOINT (``TRACE_EXPORTER=otlp``). ``flask traces collect`` is a
+stand-in OTLP collector writing the same JSON lines, and ``flask traces show``
+prints a trace as a tree.
+"""
+
+import atexit
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current_span = ContextVar('petshop_current_span', default=None)
+
+
+class Span:
+    """One timed operation inside a trace."""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start_ns', 'end_ns', 'status', 'error')
+
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = 'ok'
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc):
+        self.status = 'error'
+        self.error = f'{type(exc).__name__}: {exc}'
+
+    def finish(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self, service):
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'service': service,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class Trace:
+    """Spans recorded by one process for one trace id."""
+
+    def __init__(self, tracer, trace_id=None):
+        self.tracer = tracer
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans = []
+        self.dropped = 0
+
+    def start_span(self, name, parent_id=None, attributes=None):
+        span = Span(self, name, parent_id, attributes)
+        if len(self.spans) < self.tracer.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+        return span
+
+
+def rotate_file(path, max_bytes, backups):
+    """Roll path over to path.1 ... path.<backups> once it has reached max_bytes (0 keeps it growing)."""
+    try:
+        if not max_bytes or os.path.getsize(path) < max_bytes:
+            return
+        if backups <= 0:
+            os.remove(path)
+            return
+        for i in range(backups - 1, 0, -1):
+            if os.path.exists(f'{path}.{i}'):
+                os.replace(f'{path}.{i}', f'{path}.{i + 1}')
+        os.replace(path, f'{path}.1')
+    except OSError:
+        # Файла еще нет или его только что сдвинул другой воркер
+        pass
+
+
+def append_jsonl(path, records, max_bytes=0, backups=0):
+    """Append dicts to a JSON lines file, rotating it first when it is full."""
+    rotate_file(path, max_bytes, backups)
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+class JsonlExporter:
+    """Append spans to a size-capped JSON lines file, one span per line."""
+
+    def __init__(self, path, service, max_bytes=0, backups=0):
+        self.path = path
+        self.service = service
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def export(self, spans):
+        append_jsonl(self.path, (span.to_dict(self.service) for span in spans), self.max_bytes, self.backups)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OtlpHttpExporter:
+    """POST spans to an OTLP/HTTP collector as JSON (``/v1/traces``)."""
+
+    def __init__(self, endpoint, service, timeout=2.0):
+        self.endpoint = endpoint
+        self.service = service
+        self.timeout = timeout
+
+    def payload(self, spans):
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'petshop.tracing'},
+                'spans': [{
+                    'traceId': span.trace.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': 2 if span.parent_id is None else 1,  # SERVER for roots, INTERNAL otherwise
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in span.attributes.items()],
+                    'status': {'code': 2, 'message': span.error} if span.status == 'error' else {'code': 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, spans):
+        import urllib.request
+        body = json.dumps(self.payload(spans), default=str).encode('utf-8')
+        req = urllib.request.Request(self.endpoint, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    """Per-app sampling settings and the background export queue."""
+
+    def __init__(self, sample_rate, exporter, max_spans=1000, queue_size=1000):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.max_spans = max_spans
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.dropped_traces = 0
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Экспортирующий поток мастера не существует в воркере
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def should_sample(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def submit(self, trace):
+        """Queue a finished trace for export; never blocks the caller."""
+        with self._lock:
+            if self._thread is None:
+                # Поток создается лениво, чтобы у каждого воркера после fork был свой
+                self._thread = threading.Thread(target=self._run, name='trace-export', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped_traces += 1
+
+    def queue_usage(self):
+        """(traces waiting for export, queue capacity), for diagnostics."""
+        return self._queue.qsize(), self._queue.maxsize
+
+    def _export(self, trace):
+        try:
+            self.exporter.export(trace.spans)
+        except Exception as e:
+            print(f"Ошибка при экспорте трассировки: {e}")
+
+    def _run(self):
+        while True:
+            self._export(self._queue.get())
+
+    def flush(self):
+        """Export everything still queued in the calling thread."""
+        while True:
+            try:
+                trace = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._export(trace)
+
+
+def get_tracer():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('tracer')
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_context():
+    """(trace_id, span_id) of the active span, to continue the trace in another thread."""
+    span = _current_span.get()
+    return (span.trace.trace_id, span.span_id) if span is not None else None
+
+
+def _open_span(name, attributes):
+    parent = _current_span.get()
+    if parent is None:
+        return None, None
+    span = parent.trace.start_span(name, parent.span_id, attributes)
+    return span, _current_span.set(span)
+
+
+def _close_span(span, token):
+    span.finish()
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Токен из другого контекста (поток, генератор ответа): просто возвращаем родителя
+        _current_span.set(None)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time the block as a child of the active span; a no-op when the request is not sampled."""
+    child, token = _open_span(name, attributes)
+    if child is None:
+        yield None
+        return
+    try:
+        yield child
+    except BaseException as e:
+        child.record_error(e)
+        raise
+    finally:
+        _close_span(child, token)
+
+
+def traced(name=None):
+    """Decorator form of span()."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with span(name or f.__qualname__):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _start_root(tracer, name, parent, attributes):
+    trace_id, parent_id = parent if parent else (None, None)
+    trace = Trace(tracer, trace_id)
+    root = trace.start_span(name, parent_id, attributes)
+    return root, _current_span.set(root)
+
+
+def _finish_root(root, token, exc=None):
+    if exc is not None:
+        root.record_error(exc)
+    root.finish()
+    _current_span.reset(token)
+    trace = root.trace
+    for unfinished in trace.spans:
+        if unfinished.end_ns is None:
+            unfinished.status = 'unfinished'
+            unfinished.end_ns = root.end_ns
+    if trace.dropped:
+        root.set_attribute('spans.dropped', trace.dropped)
+    trace.tracer.submit(trace)
+
+
+@contextmanager
+def trace(name, parent=None, **attributes):
+    """Start a root span outside a request (e.g. a background job).
+
+    parent is a current_context() captured elsewhere: the trace is then
+    continued and always recorded. Without it the trace is sampled at
+    TRACE_SAMPLE_RATE.
+    """
+    tracer = get_tracer()
+    if tracer is None or (parent is None and not tracer.should_sample()):
+        yield None
+        return
+    root, token = _start_root(tracer, name, parent, attributes)
+    try:
+        yield root
+    except BaseException as e:
+        _finish_root(root, token, e)
+        raise
+    _finish_root(root, token)
+
+
+def _otlp_attribute(value):
+    for key in ('stringValue', 'boolValue', 'doubleValue'):
+        if key in value:
+            return value[key]
+    return int(value['intValue']) if 'intValue' in value else None
+
+
+def spans_from_otlp(payload):
+    """Convert an OTLP/HTTP JSON export request into span dicts in the JSONL format."""
+    for resource_spans in payload.get('resourceSpans', []):
+        resource = {a['key']: _otlp_attribute(a['value'])
+                    for a in resource_spans.get('resource', {}).get('attributes', [])}
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                start_ns, end_ns = int(span['startTimeUnixNano']), int(span['endTimeUnixNano'])
+                status = span.get('status', {})
+                yield {
+                    'trace_id': span['traceId'],
+                    'span_id': span['spanId'],
+                    'parent_id': span.get('parentSpanId') or None,
+                    'name': span['name'],
+                    'service': resource.get('service.name'),
+                    'start_ns': start_ns,
+                    'end_ns': end_ns,
+                    'duration_ms': round((end_ns - start_ns) / 1e6, 3),
+                    'status': 'error' if status.get('code') == 2 else 'ok',
+                    'error': status.get('message'),
+                    'attributes': {a['key']: _otlp_attribute(a['value']) for a in span.get('attributes', [])},
+                }
+
+
+def load_traces(path):
+    """Group the spans of a JSONL trace file by trace id."""
+    traces = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces.setdefault(span['trace_id'], []).append(span)
+    return traces
+
+
+def format_trace(spans):
+    """Render the spans of one trace as an indented tree with offsets from the trace start."""
+    spans = sorted(spans, key=lambda s: s['start_ns'])
+    known = {s['span_id'] for s in spans}
+    children = {}
+    for s in spans:
+        parent = s['parent_id'] if s['parent_id'] in known else None
+        children.setdefault(parent, []).append(s)
+    origin = spans[0]['start_ns']
+    lines = []
+
+    def walk(parent, depth):
+        for s in children.get(parent, []):
+            label = s['name']
+            if s['name'] == 'db.query':
+                label += ' ' + s['attributes'].get('db.statement', '')[:80]
+            elif s['name'] == 'render_template':
+                label += ' ' + s['attributes'].get('template', '')
+            marker = '' if s['status'] == 'ok' else f"  [{s['status']}] {s['error'] or ''}"
+            lines.append(f"{(s['start_ns'] - origin) / 1e6:9.1f} ms {s['duration_ms']:9.1f} ms  "
+                         f"{'  ' * depth}{label}{marker}")
+            walk(s['span_id'], depth + 1)
+
+    walk(None, 0)
+    return lines
+
+
+# SQL statements, templates and mail
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Спан живет на контексте выполнения: он один на оператор и виден в handle_error
+    if context is None or _current_span.get() is None:
+        return
+    context.petshop_trace_span = _open_span('db.query', {
+        'db.system': conn.dialect.name,
+        'db.statement': ' '.join(statement.split())[:1000],
+        'db.executemany': executemany,
+    })
+
+
+def _take_query_span(context):
+    pending = getattr(context, 'petshop_trace_span', None)
+    if pending is not None:
+        context.petshop_trace_span = None
+    return pending
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    pending = _take_query_span(context)
+    if pending is not None:
+        child, token = pending
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            child.set_attribute('db.rowcount', cursor.rowcount)
+        _close_span(child, token)
+
+
+def _handle_db_error(exception_context):
+    pending = _take_query_span(exception_context.execution_context)
+    if pending is not None:
+        child, token = pending
+        child.record_error(exception_context.original_exception)
+        _close_span(child, token)
+
+
+def _before_render(sender, template, context, **extra):
+    child, token = _open_span('render_template', {'template': template.name})
+    if child is not None:
+        g.setdefault('trace_templates', []).append((child, token))
+
+
+def _after_render(sender, template, context, **extra):
+    pending = g.get('trace_templates')
+    if pending:
+        _close_span(*pending.pop())
+
+
+def instrument_mail(mail):
+    """Record every Mail.send as a span."""
+    send = mail.send
+    if getattr(send, '_petshop_traced', False):
+        return
+
+    @wraps(send)
+    def traced_send(message):
+        with span('mail.send', subject=message.subject or '', recipients=len(message.send_to)):
+            return send(message)
+
+    traced_send._petshop_traced = True
+    mail.send = traced_send
+
+
+def init_tracing(app):
+    """Create the app's tracer and install request hooks, SQL listeners, template signals and mail wrapper."""
+    if app.config['TRACE_EXPORTER'] == 'otlp':
+        exporter = OtlpHttpExporter(app.config['TRACE_OTLP_ENDPOINT'], app.config['TRACE_SERVICE_NAME'])
+    else:
+        exporter = JsonlExporter(app.config['TRACE_FILE'], app.config['TRACE_SERVICE_NAME'],
+                                 app.config['TRACE_FILE_MAX_BYTES'], app.config['TRACE_FILE_BACKUPS'])
+    app.extensions['tracer'] = tracer = Tracer(
+        app.config['TRACE_SAMPLE_RATE'], exporter, max_spans=app.config['TRACE_MAX_SPANS'])
+    trust_traceparent = app.config['TRACE_TRUST_TRACEPARENT']
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_db_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    from app import mail
+    instrument_mail(mail)
+
+    @app.before_request
+    def start_request_trace():
+        parent = None
+        # Заголовок от клиента не должен включать трассировку: доверяем только шлюзу
+        match = trust_traceparent and TRACEPARENT_RE.match(request.headers.get('traceparent', ''))
+        if match and int(match.group(3), 16) & 1:
+            parent = (match.group(1), match.group(2))
+        if parent is None and not tracer.should_sample():
+            return
+        g.trace_root = _start_root(tracer, f'{request.method} {request.endpoint or "unmatched"}', parent, {
+            'http.method': request.method,
+            'http.target': request.full_path.rstrip('?'),
+            'http.route': request.url_rule.rule if request.url_rule else '',
+        })
+
+    @app.after_request
+    def tag_request_trace(response):
+        root_and_token = g.get('trace_root')
+        if root_and_token is not None:
+            root = root_and_token[0]
+            root.set_attribute('http.status_code', response.status_code)
+            response.headers['traceparent'] = f'00-{root.trace.trace_id}-{root.span_id}-01'
+        return response
+
+    @app.teardown_request
+    def finish_request_trace(exc):
+        root_and_token = g.pop('trace_root', None)
+        if root_and_token is not None:
+            _finish_root(*root_and_token, exc=exc)
@@ -0,0 +1,84 @@
+"""
+Warmup before a production server accepts traffic.
+
+``warmup(app)`` runs once in the gunicorn master after the app is preloaded,
+so everything it builds is shared copy-on-write by the forked workers:
+
+* every Jinja template is compiled into the template cache;
+* the breed index and the breed classifier are built;
+* WARMUP_URLS are requested through the test client, which fills the
+  SQLAlchemy compiled-statement cache for the hottest pages.
+
+Connections opened by the master must not be inherited by workers, so it
+ends by disposing of the pools of every engine (primary and read replica). ``after_fork(app)`` then runs in
+every worker and opens fresh connections in every pool, one per worker thread.
+"""
+
+import time
+
+from app.models import db
+
+
+def _step(name, func, *args):
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    except Exception as e:
+        # Прогрев не должен мешать запуску сервера
+        print(f"Ошибка прогрева ({name}): {e}")
+        return None
+    print(f"Прогрев: {name} — {(time.perf_counter() - start) * 1000:.0f} мс")
+    return result
+
+
+def compile_templates(app):
+    """Load every template into the Jinja cache; returns the number compiled."""
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def prime_caches(app):
+    from app.breed_classifier import get_breed_classifier
+    from app.breed_index import get_index
+
+    with app.app_context():
+        get_index()
+        get_breed_classifier()
+
+
+def request_pages(app):
+    """GET each WARMUP_URLS page; returns {url: status}."""
+    client = app.test_client()
+    return {url: client.get(url, environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code
+            for url in app.config['WARMUP_URLS']}
+
+
+def open_connections(app, count):
+    """Check out count connections at once from every engine so each pool holds them ready."""
+    with app.app_context():
+        # Чтения идут на реплику: ее пул прогреваем так же, как основной
+        for engine in db.engines.values():
+            connections = [engine.connect() for _ in range(count)]
+            for connection in connections:
+                connection.close()
+    return count
+
+
+def warmup(app):
+    """Prime shared state in the master process; see the module docstring."""
+    _step('шаблоны', compile_templates, app)
+    _step('кэши', prime_caches, app)
+    _step('страницы', request_pages, app)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def after_fork(app, connections=None):
+    """Per-worker warmup: fresh DB connections (the master's were disposed of)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    _step('соединения с БД', open_connections, app, connections or app.config['WARMUP_DB_CONNECTIONS'])
@@ -0,0 +1,6 @@
+"""
+Reproducible performance benchmarks for PetShop.
+
+Run a benchmark as a module from the project root, e.g.
+``python -m benchmarks.image_pipeline --output report.json``.
+"""
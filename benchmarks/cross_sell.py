@@ -0,0 +1,58 @@
+"""
+Benchmark for the "bought together" batch computation (app.cross_sell).
+
+Generates a synthetic order history with a Zipf-like product popularity and
+times compute_associations, without a database:
+
+    python -m benchmarks.cross_sell --lines 5000000 --products 50000
+    python -m benchmarks.cross_sell --quick
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cross_sell import METRICS, compute_associations  # noqa: E402
+
+SEED = 1729
+
+
+def synthetic_order_lines(lines, products, mean_basket=3.0, seed=SEED):
+    """Return (order_ids, product_ids) with Poisson basket sizes and skewed product popularity."""
+    rng = np.random.default_rng(seed)
+    sizes = rng.poisson(mean_basket - 1, size=int(lines / mean_basket) + 1) + 1
+    order_ids = np.repeat(np.arange(len(sizes)), sizes)[:lines]
+    product_ids = (rng.zipf(1.3, size=len(order_ids)) - 1) % products + 1
+    return order_ids, product_ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=5_000_000, help='Order lines to generate.')
+    parser.add_argument('--products', type=int, default=50_000, help='Catalog size.')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--min-support', type=int, default=2)
+    parser.add_argument('--quick', action='store_true', help='200k lines, for smoke runs.')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.lines = 200_000
+
+    order_ids, product_ids = synthetic_order_lines(args.lines, args.products)
+    report = {'benchmark': 'cross_sell', 'seed': SEED, 'lines': args.lines, 'products': args.products,
+              'orders': int(order_ids[-1]) + 1, 'results': {}}
+    for metric in METRICS:
+        start = time.perf_counter()
+        pairs = compute_associations(order_ids, product_ids, top_k=args.top_k, metric=metric,
+                                     min_support=args.min_support)
+        report['results'][metric] = {'seconds': round(time.perf_counter() - start, 2), 'rows': len(pairs[0])}
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+SQLite write-contention benchmark: catalog readers vs checkouts and admin edits.
+
+Several worker processes (like gunicorn workers) share one SQLite file. In each,
+reader threads run the product listing query while writer threads place
+checkout-like orders (an order, its items and a stock update in one
+transaction) and admin threads rewrite prices of a whole category. The same
+seeded database is measured with two settings:
+
+* ``baseline``: no pragmas, i.e. the sqlite3 defaults (rollback journal,
+  synchronous=FULL, 5 s lock timeout of the driver);
+* ``tuned``: the pragmas from config.py (WAL, synchronous=NORMAL, busy_timeout,
+  mmap, cache_size, temp_store), see app/database.py.
+
+    python -m benchmarks.db_contention
+    python -m benchmarks.db_contention --workers 4 --seconds 10 --readers 4 --writers 2
+
+The report has throughput, latency percentiles and the number of
+``database is locked`` errors per operation for every profile.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRAGMA_SETTINGS = ('SQLITE_JOURNAL_MODE', 'SQLITE_SYNCHRONOUS', 'SQLITE_BUSY_TIMEOUT_MS',
+                   'SQLITE_MMAP_SIZE', 'SQLITE_CACHE_SIZE', 'SQLITE_TEMP_STORE')
+
+PROFILES = ('baseline', 'tuned')
+
+
+def _create_app(profile):
+    from config import DevelopmentConfig
+    if profile == 'baseline':
+        for name in PRAGMA_SETTINGS:
+            setattr(DevelopmentConfig, name, None)
+    from app import create_app
+    return create_app()
+
+
+def seed(profile, products, users):
+    """Create the schema and a catalog; runs in a child interpreter."""
+    from app.models import db, User, Address, Category, Product
+
+    app = _create_app(profile)
+    with app.app_context():
+        db.create_all()
+        categories = [Category(name=f'Категория {i}', slug=f'category-{i}') for i in range(10)]
+        db.session.add_all(categories)
+        db.session.flush()
+        for i in range(products):
+            db.session.add(Product(name=f'Товар {i}', slug=f'product-{i}', sku=f'SKU-{i}',
+                                   category_id=categories[i % len(categories)].id,
+                                   price=100 + i % 900, stock=1_000_000, description='Описание ' * 20))
+        for i in range(users):
+            user = User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Address(user_id=user.id, full_name=f'Покупатель {i}', phone='+70000000000',
+                                   street='Ленина, 1', city='Москва'))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def _read(db, Product, rng):
+    page = rng.randrange(10)
+    (Product.query.filter_by(is_active=True)
+     .order_by(Product.created_at.desc(), Product.id.desc())
+     .offset(page * 24).limit(24).all())
+    Product.query.filter_by(is_active=True).count()
+
+
+def _checkout(db, models, rng, users, products):
+    import secrets
+
+    Order, OrderItem, Product, Address = models
+    user_id = rng.randrange(1, users + 1)
+    address = Address.query.filter_by(user_id=user_id).first()
+    items = [db.session.get(Product, rng.randrange(1, products + 1)) for _ in range(3)]
+    subtotal = sum(product.price for product in items)
+    order = Order(user_id=user_id, address_id=address.id, order_number=secrets.token_hex(8).upper(),
+                  subtotal=subtotal, shipping_cost=300.0, tax=round(subtotal * 0.05, 2),
+                  total=subtotal + 300.0)
+    db.session.add(order)
+    db.session.flush()
+    for product in items:
+        db.session.add(OrderItem(order_id=order.id, product_id=product.id, product_name=product.name,
+                                 quantity=1, price=product.price, subtotal=product.price))
+        product.stock -= 1
+    db.session.commit()
+
+
+def _admin_edit(db, Product, rng):
+    category_id = rng.randrange(1, 11)
+    factor = rng.choice((0.99, 1.01))
+    for product in Product.query.filter_by(category_id=category_id).all():
+        product.price = round(product.price * factor, 2)
+    db.session.commit()
+
+
+def work(profile, seconds, readers, writers, admins, products, users):
+    """Run the mixed workload in this process; returns per-operation samples."""
+    from sqlalchemy.exc import OperationalError
+    from app.models import db, Address, Order, OrderItem, Product
+
+    app = _create_app(profile)
+    deadline = time.perf_counter() + seconds
+    results = {'read': [], 'checkout': [], 'admin': []}
+    errors = {'read': 0, 'checkout': 0, 'admin': 0}
+    lock = threading.Lock()
+
+    def loop(kind, seed_value):
+        rng = random.Random(seed_value)
+        latencies, failed = [], 0
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        _read(db, Product, rng)
+                    elif kind == 'checkout':
+                        _checkout(db, (Order, OrderItem, Product, Address), rng, users, products)
+                    else:
+                        _admin_edit(db, Product, rng)
+                except OperationalError as e:
+                    db.session.rollback()
+                    if 'locked' not in str(e):
+                        raise
+                    failed += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+            db.session.remove()
+        with lock:
+            results[kind].extend(latencies)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=loop, args=(kind, os.getpid() * 100 + i))
+               for i, kind in enumerate(['read'] * readers + ['checkout'] * writers + ['admin'] * admins)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'latencies': results, 'errors': errors}
+
+
+def pragmas(profile):
+    from app.database import pragma_values
+    from app.models import db
+
+    app = _create_app(profile)
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            return pragma_values(connection.driver_connection)
+        finally:
+            connection.close()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 1)
+
+
+def _child(args, command, profile, path):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', PYTHONPATH=ROOT, BREED_CLASSIFIER='stub')
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.db_contention', '--child', command, '--profile', profile,
+         '--seconds', str(args.seconds), '--readers', str(args.readers), '--writers', str(args.writers),
+         '--admins', str(args.admins), '--products', str(args.products), '--users', str(args.users)],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+
+
+def _output(process):
+    stdout, _ = process.communicate()
+    if process.returncode:
+        raise RuntimeError(f'benchmark child failed with exit code {process.returncode}')
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def run(args):
+    report = {'benchmark': 'db_contention', 'workers': args.workers, 'seconds': args.seconds,
+              'threads_per_worker': {'readers': args.readers, 'writers': args.writers, 'admins': args.admins},
+              'products': args.products, 'python': sys.version.split()[0], 'profiles': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'seed.db')
+        _output(_child(args, 'seed', 'baseline', template))
+
+        for profile in PROFILES:
+            path = os.path.join(tmp, f'{profile}.db')
+            shutil.copy(template, path)
+            settings = _output(_child(args, 'pragmas', profile, path))
+            samples = [_output(p) for p in [_child(args, 'work', profile, path) for _ in range(args.workers)]]
+
+            operations = {}
+            for kind in ('read', 'checkout', 'admin'):
+                latencies = [value for sample in samples for value in sample['latencies'][kind]]
+                operations[kind] = {
+                    'ops': len(latencies),
+                    'ops_per_s': round(len(latencies) / args.seconds, 1),
+                    'p50_ms': _percentile(latencies, 0.5),
+                    'p95_ms': _percentile(latencies, 0.95),
+                    'max_ms': round(max(latencies) * 1000, 1) if latencies else None,
+                    'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else None,
+                    'locked_errors': sum(sample['errors'][kind] for sample in samples),
+                }
+            report['profiles'][profile] = {'pragmas': settings, 'operations': operations}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes sharing the database.')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration of each profile run.')
+    parser.add_argument('--readers', type=int, default=4, help='Catalog reader threads per worker.')
+    parser.add_argument('--writers', type=int, default=2, help='Checkout threads per worker.')
+    parser.add_argument('--admins', type=int, default=1, help='Admin price-edit threads per worker.')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--profile', choices=PROFILES, default='tuned', help=argparse.SUPPRESS)
+    parser.add_argument('--child', choices=('seed', 'pragmas', 'work'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == 'seed':
+        seed(args.profile, args.products, args.users)
+        print(json.dumps({'seeded': args.products}))
+    elif args.child == 'pragmas':
+        print(json.dumps(pragmas(args.profile)))
+    elif args.child == 'work':
+        print(json.dumps(work(args.profile, args.seconds, args.readers, args.writers, args.admins,
+                              args.products, args.users)))
+    else:
+        print(json.dumps(run(args), indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
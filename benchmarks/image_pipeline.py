@@ -0,0 +1,303 @@
+"""
+Benchmark for image_processor.process_product_image.
+
+Generates deterministic synthetic source images (several sizes and modes,
+including palette PNGs and CMYK JPEGs) and measures:
+
+* ms per image and output bytes per format for the full pipeline;
+* peak RSS of a worker processing a single image;
+* resampling trade-offs (LANCZOS vs reduce()+LANCZOS vs reducing_gap);
+* WebP quality/method trade-offs;
+* throughput single-threaded and with a process pool.
+
+The JSON report is stable across runs on the same machine, so two reports
+can be diffed between releases:
+
+    python -m benchmarks.image_pipeline --output bench-image.json
+    python -m benchmarks.image_pipeline --quick
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import PIL
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+from werkzeug.datastructures import FileStorage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_processor import process_product_image, available_formats, crop_to_square  # noqa: E402
+
+SEED = 1729
+
+SOURCE_SIZES = [(640, 480), (1920, 1080), (4032, 3024)]
+QUICK_SOURCE_SIZES = [(640, 480), (1920, 1080)]
+
+# (label, mode, container) - what the pipeline receives from admin uploads
+SOURCE_MODES = [
+    ('rgb-jpeg', 'RGB', 'JPEG'),
+    ('rgba-png', 'RGBA', 'PNG'),
+    ('p-png', 'P', 'PNG'),
+    ('cmyk-jpeg', 'CMYK', 'JPEG'),
+]
+
+TARGET_SIZES = [800, 300]
+
+WEBP_QUALITIES = [60, 75, 85, 95]
+WEBP_METHODS = [0, 4, 6]
+
+
+def synthetic_image(size, mode, seed=SEED):
+    """Build a deterministic photo-like image: gradients plus seeded noise and shapes."""
+    width, height = size
+    rng = random.Random(f'{seed}-{width}x{height}-{mode}')
+
+    red = Image.linear_gradient('L').resize(size)
+    green = Image.radial_gradient('L').resize(size)
+    noise = Image.frombytes('L', (64, 48), rng.randbytes(64 * 48)).resize(size, Image.Resampling.BICUBIC)
+    img = Image.merge('RGB', (red, green, noise))
+
+    # Some hard edges so encoders cannot cheat on smooth gradients
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 4 + 1), y0 + rng.randrange(height // 4 + 1)
+        draw.ellipse((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+
+    if mode == 'RGBA':
+        alpha = Image.radial_gradient('L').resize(size)
+        img.putalpha(ImageChops.invert(alpha))
+    elif mode == 'P':
+        img = img.quantize(colors=128, method=Image.Quantize.MEDIANCUT)
+    elif mode != 'RGB':
+        img = img.convert(mode)
+    return img
+
+
+def encode_source(img, container):
+    """Encode a synthetic image the way it would arrive in an upload."""
+    buffer = BytesIO()
+    img.save(buffer, format=container, **({'quality': 92} if container == 'JPEG' else {}))
+    return buffer.getvalue()
+
+
+def build_sources(sizes):
+    """Return [(case_name, size, label, encoded_bytes)] for every size/mode combination."""
+    sources = []
+    for size in sizes:
+        for label, mode, container in SOURCE_MODES:
+            data = encode_source(synthetic_image(size, mode), container)
+            sources.append((f'{label}-{size[0]}x{size[1]}', size, label, data))
+    return sources
+
+
+def run_pipeline(data, target, out_dir):
+    """Run process_product_image once and return (seconds, {ext: bytes})."""
+    ext = 'png' if data[:4] == b'\x89PNG' else 'jpg'
+    start = time.perf_counter()
+    filename = process_product_image(FileStorage(BytesIO(data), filename=f'source.{ext}'), out_dir, size=(target, target))
+    elapsed = time.perf_counter() - start
+    stem = os.path.splitext(filename)[0]
+    sizes = {}
+    for fmt in available_formats():
+        path = os.path.join(out_dir, f'{stem}.{fmt}')
+        sizes[fmt] = os.path.getsize(path)
+        os.remove(path)
+    return elapsed, sizes
+
+
+def timed(fn, repeat):
+    """Run fn repeat times; return (median ms, last result)."""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2), result
+
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio between two RGB images in dB (None if identical)."""
+    diff = ImageChops.difference(a.convert('RGB'), b.convert('RGB'))
+    mse = sum(v ** 2 for v in ImageStat.Stat(diff).rms) / 3
+    return round(10 * math.log10(255 ** 2 / mse), 2) if mse else None
+
+
+def _peak_rss_worker(data, target):
+    """Process one image in a fresh process and report its peak RSS in KiB."""
+    with tempfile.TemporaryDirectory() as out_dir:
+        run_pipeline(data, target, out_dir)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _idle_rss_worker(_=None):
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _throughput_worker(data, target):
+    with tempfile.TemporaryDirectory() as out_dir:
+        return run_pipeline(data, target, out_dir)[0]
+
+
+def bench_pipeline(sources, repeat):
+    """ms/image and output bytes per format for every source and target size."""
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name, size, label, data in sources:
+            for target in TARGET_SIZES:
+                samples, output = [], {}
+                for _ in range(repeat):
+                    elapsed, output = run_pipeline(data, target, out_dir)
+                    samples.append(elapsed * 1000)
+                results.append({
+                    'case': name,
+                    'mode': label,
+                    'source_size': list(size),
+                    'source_bytes': len(data),
+                    'target': target,
+                    'ms': round(statistics.median(samples), 2),
+                    'output_bytes': output,
+                })
+    return results
+
+
+def bench_peak_rss(sources):
+    """Peak RSS (KiB) of a fresh worker processing each source at 800px."""
+    results = []
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        idle = executor.submit(_idle_rss_worker).result()
+        for name, size, label, data in sources:
+            peak = executor.submit(_peak_rss_worker, data, 800).result()
+            results.append({'case': name, 'peak_rss_kib': peak, 'delta_kib': peak - idle})
+    return {'idle_worker_kib': idle, 'cases': results}
+
+
+def bench_resampling(sources, repeat):
+    """Compare resize strategies for the crop_to_square step (time and PSNR vs plain LANCZOS)."""
+    target = 800
+    strategies = {
+        'lanczos': lambda img: img.resize((target, target), Image.Resampling.LANCZOS),
+        'lanczos_reducing_gap_2': lambda img: img.resize((target, target), Image.Resampling.LANCZOS, reducing_gap=2.0),
+        'reduce_then_lanczos': lambda img: (
+            img.reduce(max(1, img.width // (target * 2))).resize((target, target), Image.Resampling.LANCZOS)),
+        'bicubic': lambda img: img.resize((target, target), Image.Resampling.BICUBIC),
+    }
+    results = []
+    for name, size, label, data in sources:
+        if label != 'rgb-jpeg' or min(size) < target:
+            continue
+        img = Image.open(BytesIO(data))
+        img.load()
+        side = min(img.size)
+        left, top = (img.width - side) // 2, (img.height - side) // 2
+        square = img.crop((left, top, left + side, top + side))
+        reference = strategies['lanczos'](square)
+        row = {'case': name}
+        for strategy, fn in strategies.items():
+            ms, out = timed(lambda: fn(square), repeat)
+            row[strategy] = {'ms': ms, 'psnr_vs_lanczos': psnr(reference, out) if strategy != 'lanczos' else None}
+        results.append(row)
+    return results
+
+
+def bench_webp(sources, repeat):
+    """WebP encode time and size across quality/method for 800px product images."""
+    results = []
+    for name, size, label, data in sources:
+        if label != 'rgb-jpeg':
+            continue
+        img = crop_to_square(Image.open(BytesIO(data)).convert('RGB'), 800)
+        for quality in WEBP_QUALITIES:
+            for method in WEBP_METHODS:
+                def encode():
+                    buffer = BytesIO()
+                    img.save(buffer, format='WEBP', quality=quality, method=method)
+                    return buffer.getvalue()
+                ms, out = timed(encode, repeat)
+                results.append({'case': name, 'quality': quality, 'method': method, 'ms': ms, 'bytes': len(out),
+                                'psnr': psnr(img, Image.open(BytesIO(out)))})
+    return results
+
+
+def bench_throughput(sources, images, workers):
+    """Images/second single-threaded and with a process pool over the same workload."""
+    workload = [sources[i % len(sources)][3] for i in range(images)]
+
+    start = time.perf_counter()
+    for data in workload:
+        _throughput_worker(data, 800)
+    single = time.perf_counter() - start
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Warm the pool so process start-up is not billed to the first images
+        list(executor.map(_idle_rss_worker, range(workers)))
+        start = time.perf_counter()
+        list(executor.map(_throughput_worker, workload, [800] * len(workload)))
+        pooled = time.perf_counter() - start
+
+    return {
+        'images': images,
+        'workers': workers,
+        'single_images_per_s': round(images / single, 2),
+        'pool_images_per_s': round(images / pooled, 2),
+        'speedup': round(single / pooled, 2),
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'formats': available_formats(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout).')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per measurement; the median is reported.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Process pool size for the throughput run.')
+    parser.add_argument('--images', type=int, default=48, help='Images in the throughput workload.')
+    parser.add_argument('--quick', action='store_true', help='Small sources and one repetition, for smoke runs.')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.repeat, args.images = 1, min(args.images, 8)
+    sources = build_sources(QUICK_SOURCE_SIZES if args.quick else SOURCE_SIZES)
+
+    report = {
+        'benchmark': 'image_pipeline',
+        'seed': SEED,
+        'environment': environment(),
+        'params': {'repeat': args.repeat, 'images': args.images, 'workers': args.workers, 'quick': args.quick},
+        'pipeline': bench_pipeline(sources, args.repeat),
+        'peak_rss': bench_peak_rss(sources),
+        'resampling': bench_resampling(sources, args.repeat),
+        'webp': bench_webp(sources, args.repeat),
+        'throughput': bench_throughput(sources, args.images, args.workers),
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Cold-start benchmark: import time, create_app time and first-request latency.
+
+Each run starts a fresh interpreter, so nothing is cached in sys.modules:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --url /product/list
+    python -m benchmarks.startup --pool storefront
+
+The report also lists which heavy optional dependencies (Pillow, the Gemini
+SDK, NumPy/SciPy) were imported by the time the first response was sent;
+they should only load when a feature that needs them is used.
+tests/test_startup.py runs this benchmark to guard against regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('PIL.Image', 'google.generativeai', 'google.genai', 'numpy', 'scipy')
+
+
+def measure_once(url):
+    """Runs in the child interpreter; returns timings in ms."""
+    start = time.perf_counter()
+    from app import create_app
+    from app.models import db
+    imported = time.perf_counter()
+
+    app = create_app()
+    created = time.perf_counter()
+
+    # Таблицы создаются вне замера: в бенчмарке используется пустая БД в памяти
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    request_start = time.perf_counter()
+    status = client.get(url).status_code
+    finished = time.perf_counter()
+
+    return {
+        'import_ms': (imported - start) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (finished - request_start) * 1000,
+        'status': status,
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def run(runs=3, url='/', pool='all'):
+    """Measure runs fresh interpreters; returns the report with per-metric medians."""
+    env = dict(os.environ, DATABASE_URL='sqlite://', PYTHONPATH=ROOT, APP_POOL=pool)
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--child', '--url', url],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {'benchmark': 'startup', 'url': url, 'pool': pool, 'runs': runs, 'python': sys.version.split()[0]}
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms'):
+        report[key] = round(statistics.median(s[key] for s in samples), 1)
+    report['total_ms'] = round(report['import_ms'] + report['create_app_ms'] + report['first_request_ms'], 1)
+    report['status'] = samples[-1]['status']
+    report['heavy_modules'] = sorted({name for s in samples for name in s['heavy_modules']})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure.')
+    parser.add_argument('--url', default='/', help='Page requested as the first request.')
+    parser.add_argument('--pool', default='all', help='APP_POOL of the measured app (all, storefront, api, admin).')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_once(args.url)))
+        return
+    print(json.dumps(run(args.runs, args.url, args.pool), indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
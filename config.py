@@ -8,12 +8,43 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def engine_options(database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for database_uri: a connection pool for server databases."""
+    if database_uri.startswith('sqlite'):
+        # SQLite настраивается прагмами при подключении (app/database.py)
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),  # per worker process
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # below the server's idle timeout
+        'pool_pre_ping': True,
+    }
+
+
 class Config:
     """Base configuration."""
     
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///petshop.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Read replica (see app/database.py): catalog GET requests read from it, writes go to the primary
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL', '')
+    SQLALCHEMY_BINDS = ({'replica': {'url': DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL)}}
+                        if DATABASE_REPLICA_URL else {})
+    REPLICA_ENDPOINTS = [endpoint for endpoint in os.environ.get(
+        'REPLICA_ENDPOINTS', 'main.index,product.list_products,product.view,profile.view_orders').split(',') if endpoint]
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 10))  # replication lag allowance after a write
+
+    # SQLite pragmas run on every new connection (see app/database.py); an empty value skips one
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024))  # negative: KiB, i.e. 64 MB
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'memory')
     
     # Upload settings
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'app/static/uploads')
@@ -37,6 +68,90 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@petshop.com')
 
+    # Worker pool: which blueprints this process serves (see app/routes/__init__.py).
+    # APP_POOL is all, storefront, api or admin; APP_BLUEPRINTS (e.g. 'auth,admin') overrides it.
+    APP_POOL = os.environ.get('APP_POOL', 'all')
+    APP_BLUEPRINTS = os.environ.get('APP_BLUEPRINTS', '')
+
+    # Breed detection cache (perceptual hash of the photo -> model result)
+    BREED_CACHE_TTL = int(os.environ.get('BREED_CACHE_TTL', 30 * 24 * 3600))  # 30 days
+    BREED_CACHE_MAX_ENTRIES = int(os.environ.get('BREED_CACHE_MAX_ENTRIES', 5000))
+    BREED_CACHE_MAX_DISTANCE = int(os.environ.get('BREED_CACHE_MAX_DISTANCE', 6))  # bits out of 64
+
+    # Breed classifier backend: 'gemini' or 'stub' (deterministic, offline)
+    BREED_CLASSIFIER = os.environ.get('BREED_CLASSIFIER', 'gemini')
+    BREED_CLASSIFIER_MODEL = os.environ.get('BREED_CLASSIFIER_MODEL', 'gemini-1.5-flash')
+    BREED_CLASSIFIER_TIMEOUT = float(os.environ.get('BREED_CLASSIFIER_TIMEOUT', 15))  # per-call deadline, seconds
+    BREED_CLASSIFIER_MAX_CONCURRENCY = int(os.environ.get('BREED_CLASSIFIER_MAX_CONCURRENCY', 4))  # per process
+    BREED_CLASSIFIER_QUEUE_TIMEOUT = float(os.environ.get('BREED_CLASSIFIER_QUEUE_TIMEOUT', 2))
+    BREED_CLASSIFIER_FAILURE_THRESHOLD = int(os.environ.get('BREED_CLASSIFIER_FAILURE_THRESHOLD', 5))
+    BREED_CLASSIFIER_RESET_TIMEOUT = float(os.environ.get('BREED_CLASSIFIER_RESET_TIMEOUT', 30))
+    BREED_CLASSIFIER_STUB_LATENCY = float(os.environ.get('BREED_CLASSIFIER_STUB_LATENCY', 0))
+
+    # In-memory breed index: rebuilt after catalog commits and at least this often (other workers' edits)
+    BREED_INDEX_TTL = int(os.environ.get('BREED_INDEX_TTL', 300))  # seconds
+
+    # Personalized home shelves, precomputed per breed by 'flask shelves rebuild'
+    BREED_SHELF_SIZE = int(os.environ.get('BREED_SHELF_SIZE', 8))
+
+    # "Bought together" recommendations, rebuilt by 'flask recommendations build'
+    CROSS_SELL_TOP_K = int(os.environ.get('CROSS_SELL_TOP_K', 10))
+    CROSS_SELL_METRIC = os.environ.get('CROSS_SELL_METRIC', 'cosine')  # cosine or lift
+    CROSS_SELL_MIN_SUPPORT = int(os.environ.get('CROSS_SELL_MIN_SUPPORT', 2))  # min orders with both products
+
+    # Product popularity: buffered view/cart counters, decayed by 'flask popularity update'
+    POPULARITY_FLUSH_INTERVAL = float(os.environ.get('POPULARITY_FLUSH_INTERVAL', 10))  # seconds
+    POPULARITY_HALF_LIFE_HOURS = float(os.environ.get('POPULARITY_HALF_LIFE_HOURS', 72))
+    POPULARITY_CART_WEIGHT = float(os.environ.get('POPULARITY_CART_WEIGHT', 5))  # one add-to-cart = N views
+
+    # Request instrumentation: Server-Timing header and slow request log
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500))  # 0 disables the log
+    SLOW_REQUEST_MAX_STATEMENTS = int(os.environ.get('SLOW_REQUEST_MAX_STATEMENTS', 10))
+    # /metrics (Prometheus): scrapers send "Authorization: Bearer <METRICS_TOKEN>", admins are always allowed.
+    # METRICS_ALLOWED_IPS opens it without a token; behind a reverse proxy it needs PROXY_FIX_X_FOR.
+    # For several workers set PROMETHEUS_MULTIPROC_DIR in the environment.
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '')
+    # Number of reverse proxies in front of the app that append X-Forwarded-For (0: none, use the socket address)
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    # Span tracing: share of requests traced (0 disables), exported to a JSONL file or an OTLP/HTTP collector
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0))
+    TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'jsonl')  # jsonl or otlp
+    TRACE_FILE = os.environ.get('TRACE_FILE', os.path.join(os.path.dirname(__file__), 'traces.jsonl'))
+    TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT', 'http://127.0.0.1:4318/v1/traces')
+    TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'petshop')
+    TRACE_MAX_SPANS = int(os.environ.get('TRACE_MAX_SPANS', 1000))  # per trace
+    TRACE_FILE_MAX_BYTES = int(os.environ.get('TRACE_FILE_MAX_BYTES', 50 * 1024 * 1024))  # 0 disables rotation
+    TRACE_FILE_BACKUPS = int(os.environ.get('TRACE_FILE_BACKUPS', 3))
+    # Continue traces from an incoming traceparent header: only behind a gateway that sets or strips it
+    TRACE_TRUST_TRACEPARENT = os.environ.get('TRACE_TRUST_TRACEPARENT', 'false').lower() == 'true'
+
+    # On-demand admin profiler: ?_profile=1 (sampling) or ?_profile=cprofile, listed at /admin/profiles
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_DIR = os.environ.get('PROFILER_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+    PROFILER_MAX_PER_MINUTE = int(os.environ.get('PROFILER_MAX_PER_MINUTE', 6))  # per process
+    PROFILER_SAMPLE_INTERVAL = float(os.environ.get('PROFILER_SAMPLE_INTERVAL', 0.002))  # seconds
+    PROFILER_KEEP = int(os.environ.get('PROFILER_KEEP', 100))
+
+    # Memory diagnostics (/admin/memory): tracemalloc snapshots kept per worker
+    MEMORY_MAX_SNAPSHOTS = int(os.environ.get('MEMORY_MAX_SNAPSHOTS', 5))
+
+    # Production warmup (wsgi.py): pages requested before forking, connections opened per worker
+    WARMUP_URLS = [url for url in os.environ.get('WARMUP_URLS', '/,/product/list').split(',') if url]
+    WARMUP_DB_CONNECTIONS = int(os.environ.get('WARMUP_DB_CONNECTIONS', 2))
+
+    # Breed detection uploads: the browser downscales photos to these limits before sending
+    BREED_UPLOAD_MAX_DIMENSION = int(os.environ.get('BREED_UPLOAD_MAX_DIMENSION', 1024))  # long edge, px
+    BREED_UPLOAD_MAX_BYTES = int(os.environ.get('BREED_UPLOAD_MAX_BYTES', 5 * 1024 * 1024))
+    BREED_UPLOAD_MAX_FILES = int(os.environ.get('BREED_UPLOAD_MAX_FILES', 5))  # photos per batch request
+
+    # Asynchronous breed detection jobs
+    BREED_JOB_RETENTION = int(os.environ.get('BREED_JOB_RETENTION', 24 * 3600))  # seconds
+    BREED_JOB_DEADLINE = float(os.environ.get('BREED_JOB_DEADLINE', 120))  # unfinished after this: failed
+    BREED_JOB_SSE_RETRY = float(os.environ.get('BREED_JOB_SSE_RETRY', 1))  # seconds until EventSource asks again
+
     # # Babel configuration
     # BABEL_DEFAULT_LOCALE = 'ru'
     # BABEL_DEFAULT_TIMEZONE = 'UTC'
@@ -49,7 +164,29 @@ class DevelopmentConfig(Config):
     SESSION_COOKIE_SECURE = False
 
 
+class TestingConfig(Config):
+    """Test configuration: in-memory database without replica, no CSRF, local breed classifier."""
+    TESTING = True
+    SESSION_COOKIE_SECURE = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_BINDS = {}
+    WTF_CSRF_ENABLED = False
+    BREED_CLASSIFIER = 'stub'
+    BREED_CLASSIFIER_STUB_LATENCY = 0.0
+    TRACE_SAMPLE_RATE = 0.0
+    TRACE_TRUST_TRACEPARENT = False
+    PROFILER_ENABLED = False
+    METRICS_TOKEN = ''
+    METRICS_ALLOWED_IPS = ''
+    PROXY_FIX_X_FOR = 0
+    APP_POOL = 'all'
+    APP_BLUEPRINTS = ''
+
+
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     SESSION_COOKIE_SECURE = True
+    # Timings are not exposed to visitors unless explicitly enabled
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
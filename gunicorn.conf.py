@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for production (used with wsgi.py).
+
+    gunicorn -c gunicorn.conf.py
+
+Sizing defaults follow the CPU count and can be overridden from the
+environment: GUNICORN_WORKERS, GUNICORN_THREADS, GUNICORN_BIND, ...
+
+* workers: 2 * CPU + 1 processes, the usual gunicorn starting point;
+* threads: gthread workers with 2 threads per CPU each (between 2 and 8),
+  so requests blocked on SMTP, Gemini or the database do not hold a whole
+  process; the cap keeps workers * threads (and DB connections) bounded on
+  large machines;
+* preload_app: wsgi.py (create_app + warmup) is imported once in the master
+  and shared copy-on-write with the workers;
+* max_requests (with jitter) recycles workers to bound slow memory growth.
+"""
+
+import multiprocessing
+import os
+import shutil
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+wsgi_app = 'wsgi:app'
+
+_cpus = multiprocessing.cpu_count()
+workers = int(os.environ.get('GUNICORN_WORKERS', _cpus * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', max(2, min(_cpus * 2, 8))))
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# /metrics aggregates all workers through prometheus_client's shared files.
+# The directory must be set before the app (and prometheus_client) is imported
+# and emptied on every start.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                               'instance', 'prometheus'))
+_metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+shutil.rmtree(_metrics_dir, ignore_errors=True)
+os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    from app.warmup import after_fork
+    from wsgi import app
+    after_fork(app, connections=server.cfg.threads)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
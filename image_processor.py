@@ -1,93 +1,280 @@
 import os
-from PIL import Image
+import sys
+import base64
+from io import BytesIO
 from werkzeug.utils import secure_filename
 import secrets
 
-def process_product_image(image_file, upload_folder, size=(800, 800), format='webp'):
+# Форматы, в которых сохраняется каждое изображение товара/категории.
+# Порядок важен: это порядок предпочтения при согласовании по заголовку Accept.
+IMAGE_FORMATS = {
+    'avif': {'mimetype': 'image/avif', 'pil_format': 'AVIF', 'options': {'quality': 60}},
+    'webp': {'mimetype': 'image/webp', 'pil_format': 'WEBP', 'options': {'quality': 85}},
+    'jpg': {'mimetype': 'image/jpeg', 'pil_format': 'JPEG', 'options': {'quality': 85, 'optimize': True, 'progressive': True}},
+}
+
+# Формат, который отдается клиентам, не заявившим поддержку AVIF/WebP
+FALLBACK_FORMAT = 'jpg'
+
+
+def pil_image():
+    """
+    Возвращает модуль PIL.Image, импортируя Pillow при первом обращении.
+    Веб-воркеры и CLI-команды, не работающие с изображениями, не платят за импорт.
+    """
+    from PIL import Image
+    return Image
+
+
+def available_formats():
+    """Возвращает форматы из IMAGE_FORMATS, которые поддерживает установленный Pillow."""
+    from PIL import features
+    formats = []
+    for ext, spec in IMAGE_FORMATS.items():
+        if ext == 'avif' and not features.check('avif'):
+            continue
+        if ext == 'webp' and not features.check('webp'):
+            continue
+        formats.append(ext)
+    return formats
+
+
+def negotiate_image_format(accept_mimetypes, available):
+    """
+    Выбирает формат изображения по заголовку Accept.
+
+    AVIF и WebP отдаются только клиентам, которые явно перечислили их в Accept
+    (браузеры, отправляющие только */*, не обязаны их поддерживать). Из нескольких
+    таких форматов выбирается тот, у которого больше q; при равных q - по порядку
+    IMAGE_FORMATS.
+
+    :param accept_mimetypes: request.accept_mimetypes (werkzeug MIMEAccept).
+    :param available: Список расширений, которые есть на диске.
+    :return: Расширение выбранного формата или None, если ничего нет.
+    """
+    explicit = {}
+    for value, quality in accept_mimetypes:
+        value = value.lower()
+        explicit[value] = max(explicit.get(value, 0), quality)
+    best, best_quality = None, 0
+    for ext in IMAGE_FORMATS:
+        if ext == FALLBACK_FORMAT or ext not in available:
+            continue
+        quality = explicit.get(IMAGE_FORMATS[ext]['mimetype'], 0)
+        if quality > best_quality:
+            best, best_quality = ext, quality
+    if best is not None:
+        return best
+    if FALLBACK_FORMAT in available:
+        return FALLBACK_FORMAT
+    # Старые изображения существуют только в одном формате
+    return available[0] if available else None
+
+
+def crop_to_square(img, target_size):
+    """Обрезает изображение по центру до квадрата и масштабирует до target_size."""
+    Image = pil_image()
+    width, height = img.size
+
+    # Определяем, какую сторону обрезать, чтобы получить квадрат
+    if width > height:
+        # Обрезаем по ширине
+        left = (width - height) / 2
+        right = (width + height) / 2
+        img = img.crop((left, 0, right, height))
+    elif height > width:
+        # Обрезаем по высоте
+        top = (height - width) / 2
+        bottom = (height + width) / 2
+        img = img.crop((0, top, width, bottom))
+
+    # Изменяем размер до целевого (например, 800x800)
+    return img.resize((target_size, target_size), Image.Resampling.LANCZOS)
+
+
+def prepare_for_format(img, ext):
+    """Приводит режим изображения к поддерживаемому форматом ext."""
+    Image = pil_image()
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    elif img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.mode else 'RGB')
+
+    # JPEG не поддерживает прозрачность: накладываем на белый фон
+    if ext == 'jpg' and img.mode == 'RGBA':
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        img = background
+    return img
+
+
+def encode_image(img, ext):
+    """Кодирует изображение в формат ext и возвращает байты."""
+    spec = IMAGE_FORMATS[ext]
+    buffer = BytesIO()
+    prepare_for_format(img, ext).save(buffer, format=spec['pil_format'], **spec['options'])
+    return buffer.getvalue()
+
+
+def make_placeholder(img, size=16):
+    """
+    Создает крошечную копию изображения (LQIP) для показа до загрузки оригинала.
+
+    :param img: Объект PIL Image.
+    :param size: Длина большей стороны заглушки в пикселях.
+    :return: Строка data URI с base64 WebP (обычно 100-300 байт).
+    """
+    Image = pil_image()
+    thumb = prepare_for_format(img, 'webp').copy()
+    thumb.thumbnail((size, size), Image.Resampling.BILINEAR)
+    buffer = BytesIO()
+    thumb.save(buffer, format='WEBP', quality=30)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def image_dhash(img, hash_size=8):
+    """
+    Вычисляет перцептивный difference hash (dHash) изображения.
+
+    Хэш устойчив к масштабированию и перекодированию, поэтому у уменьшенной
+    или пересохраненной копии фото расстояние Хэмминга до оригинала мало.
+
+    :param img: Объект PIL Image.
+    :param hash_size: Размер стороны хэша (8 дает 64 бита).
+    :return: Хэш в виде целого числа.
+    """
+    Image = pil_image()
+    gray = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def process_product_image(image_file, upload_folder, size=(800, 800), format='webp', formats=None, with_placeholder=False):
     """
     Обрабатывает загруженное изображение товара:
     1. Генерирует уникальное имя файла.
     2. Изменяет размер и обрезает изображение до заданного размера (квадрат).
-    3. Конвертирует изображение в заданный формат (WebP).
-    4. Сохраняет файл в папку загрузки.
+    3. Сохраняет изображение во всех форматах из formats (AVIF, WebP, JPEG)
+       с общим именем, чтобы сервер мог выбрать формат по заголовку Accept.
+    4. Сохраняет файлы в папку загрузки.
 
     :param image_file: Объект FileStorage из request.files.
     :param upload_folder: Абсолютный путь к папке для сохранения.
     :param size: Кортеж (ширина, высота) для изменения размера.
-    :param format: Формат для сохранения (например, 'webp', 'jpeg', 'png').
-    :return: Относительный путь к сохраненному файлу или None.
+    :param format: Основной формат, имя файла которого сохраняется в БД.
+    :param formats: Список форматов для сохранения (по умолчанию все доступные).
+    :param with_placeholder: Если True, возвращается кортеж (имя файла, LQIP data URI).
+    :return: Имя файла в основном формате или None.
     """
+    Image = pil_image()
     if not image_file or not image_file.filename:
-        return None
+        return (None, None) if with_placeholder else None
+
+    if formats is None:
+        formats = available_formats()
+    format = format.lower()
+    if format not in formats:
+        formats = [format] + list(formats)
 
-    # 1. Генерируем уникальное имя файла
+    # 1. Генерируем уникальное имя файла (общее для всех форматов)
     random_hex = secrets.token_hex(8)
-    _, f_ext = os.path.splitext(image_file.filename)
-    
+
     # Используем secure_filename для очистки имени, но расширение меняем на целевой формат
     filename = secure_filename(random_hex + '.' + format)
-    
-    # Создаем полный путь для сохранения
-    full_path = os.path.join(upload_folder, filename)
 
     # 2. Открываем изображение с помощью Pillow
     try:
         img = Image.open(image_file)
     except Exception as e:
         print(f"Ошибка при открытии изображения: {e}")
-        return None
+        return (None, None) if with_placeholder else None
 
-    # 3. Изменяем размер и обрезаем (crop)
     # 3. Изменяем размер и обрезаем (crop) до квадрата
-    width, height = img.size
-    target_size = size[0] # Предполагаем, что size - это квадрат (800, 800)
-    
-    # Определяем, какую сторону обрезать, чтобы получить квадрат
-    if width > height:
-        # Обрезаем по ширине
-        left = (width - height) / 2
-        right = (width + height) / 2
-        top = 0
-        bottom = height
-        img = img.crop((left, top, right, bottom))
-    elif height > width:
-        # Обрезаем по высоте
-        left = 0
-        right = width
-        top = (height - width) / 2
-        bottom = (height + width) / 2
-        img = img.crop((left, top, right, bottom))
-        
-    # Изменяем размер до целевого (например, 800x800)
-    img = img.resize((target_size, target_size), Image.Resampling.LANCZOS)
-    
-    # 4. Сохраняем в заданном формате
+    img = crop_to_square(img, size[0])  # Предполагаем, что size - это квадрат (800, 800)
+
+    # 4. Сохраняем во всех форматах
     try:
         # Убедимся, что папка существует
         os.makedirs(upload_folder, exist_ok=True)
-        
-        # Сохраняем. Для WebP можно указать качество.
-        if format.lower() == 'webp':
-            img.save(full_path, format='WEBP', quality=85)
-        else:
-            img.save(full_path, format=format.upper())
-            
+
+        for ext in formats:
+            variant_path = os.path.join(upload_folder, f'{random_hex}.{ext}')
+            if ext in IMAGE_FORMATS:
+                data = encode_image(img, ext)
+                with open(variant_path, 'wb') as f:
+                    f.write(data)
+            else:
+                img.save(variant_path, format=ext.upper())
+
         # Возвращаем имя файла, которое будет сохранено в БД
+        if with_placeholder:
+            return filename, make_placeholder(img)
         return filename
-        
+
     except Exception as e:
         print(f"Ошибка при сохранении изображения: {e}")
-        return None
+        return (None, None) if with_placeholder else None
+
+
+def image_size_report(image_folders, size=(800, 800)):
+    """
+    Перекодирует существующие изображения каталога во все форматы
+    и возвращает размеры в байтах для сравнения.
+
+    :param image_folders: Список папок с изображениями.
+    :return: Список словарей {'file': ..., '<ext>': bytes, ...}.
+    """
+    Image = pil_image()
+    formats = available_formats()
+    rows = []
+    for folder in image_folders:
+        if not os.path.isdir(folder):
+            continue
+        seen = set()
+        for name in sorted(os.listdir(folder)):
+            stem, ext = os.path.splitext(name)
+            if stem in seen or ext.lower().lstrip('.') not in ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif'):
+                continue
+            seen.add(stem)
+            try:
+                with Image.open(os.path.join(folder, name)) as img:
+                    img.load()
+                    img = crop_to_square(img, min(size[0], *img.size))
+            except Exception as e:
+                print(f"Ошибка при открытии изображения {name}: {e}")
+                continue
+            row = {'file': os.path.join(os.path.basename(folder), name)}
+            for fmt in formats:
+                row[fmt] = len(encode_image(img, fmt))
+            rows.append(row)
+    return rows
+
+
+def print_size_report(rows):
+    """Печатает таблицу размеров по форматам и итоговую экономию относительно JPEG."""
+    formats = available_formats()
+    header = f"{'file':<48}" + ''.join(f'{fmt:>12}' for fmt in formats)
+    print(header)
+    print('-' * len(header))
+    totals = dict.fromkeys(formats, 0)
+    for row in rows:
+        print(f"{row['file']:<48}" + ''.join(f'{row[fmt]:>12}' for fmt in formats))
+        for fmt in formats:
+            totals[fmt] += row[fmt]
+    print('-' * len(header))
+    print(f"{'TOTAL':<48}" + ''.join(f'{totals[fmt]:>12}' for fmt in formats))
+    if totals.get('jpg'):
+        print(f"{'vs jpg':<48}" + ''.join(f'{totals[fmt] / totals["jpg"]:>12.0%}' for fmt in formats))
+
 
 if __name__ == '__main__':
-    # Пример использования (для тестирования)
-    # from flask import Flask
-    # app = Flask(__name__)
-    # app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'app', 'static', 'images', 'products')
-    # # Создайте фиктивный объект FileStorage для тестирования
-    # # from werkzeug.datastructures import FileStorage
-    # # with open('test_image.jpg', 'rb') as fp:
-    # #     file_storage = FileStorage(fp, filename='test_image.jpg')
-    # #     filename = process_product_image(file_storage, app.config['UPLOAD_FOLDER'])
-    # #     print(f"Сохраненный файл: {filename}")
-    pass
+    # Отчет о размерах изображений каталога в разных форматах:
+    #   python image_processor.py [папка ...]
+    base = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static', 'images')
+    folders = sys.argv[1:] or [os.path.join(base, 'products'), os.path.join(base, 'categories')]
+    print_size_report(image_size_report(folders))
@@ -0,0 +1,42 @@
+"""
+Shared fixtures. Test apps are built from TestingConfig (config.py): an
+in-memory SQLite database without a replica, CSRF off and the stub breed
+classifier; a test passes only the settings it changes.
+"""
+
+import pytest
+
+from app import create_app
+from app.models import db
+
+
+def build_app(create_tables=True, **config):
+    """An app from TestingConfig with config overrides; creates the tables unless told otherwise."""
+    app = create_app('testing', config)
+    if create_tables:
+        with app.app_context():
+            db.create_all()
+    return app
+
+
+@pytest.fixture(scope='session')
+def make_app():
+    """make_app(create_tables=True, **config) -> app; usable from fixtures of any scope."""
+    return build_app
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def sign_in(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+@pytest.fixture(scope='session')
+def login():
+    """login(client, user_id) signs the test client in through the Flask-Login session keys."""
+    return sign_in
@@ -0,0 +1,66 @@
+"""
+Blueprint modules and worker pools (see app/routes/__init__.py).
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.routes import BLUEPRINTS, POOLS, build_manifest, load_manifest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def pool_app(make_app):
+    def factory(pool):
+        return make_app(APP_POOL=pool)
+    return factory
+
+
+def test_manifest_is_up_to_date(pool_app):
+    assert build_manifest(pool_app('all')) == load_manifest(), \
+        'app/routes/url_map.json is stale: run "flask blueprints manifest"'
+
+
+@pytest.mark.parametrize('pool', sorted(POOLS))
+def test_every_endpoint_builds_in_every_pool(pool_app, pool):
+    app = pool_app(pool)
+    with app.test_request_context():
+        for entry in load_manifest():
+            assert app.url_map.bind('localhost').build(
+                entry['endpoint'], {**(entry['defaults'] or {}), **dummy_values(entry['rule'])}) is not None
+
+
+def dummy_values(rule):
+    values = {}
+    for part in rule.split('<')[1:]:
+        name = part.split('>')[0]
+        converter, _, arg = name.rpartition(':')
+        values[arg] = 'products' if converter.startswith('any') else (1 if converter == 'int' else 'x')
+    return values
+
+
+def test_routes_of_other_pools_answer_404(pool_app):
+    client = pool_app('storefront').test_client()
+    assert client.get('/admin/').status_code == 404
+    assert client.get('/breed-detect').status_code == 404
+    assert client.get('/auth/login').status_code == 200
+
+
+@pytest.mark.parametrize('pool', sorted(POOLS))
+def test_pool_imports_only_its_blueprint_modules(pool):
+    code = (
+        'import json, sys\n'
+        'from app import create_app\n'
+        'create_app()\n'
+        'print(json.dumps(sorted(m for m in sys.modules if m.startswith("app.routes."))))\n'
+    )
+    env = dict(os.environ, DATABASE_URL='sqlite://', APP_POOL=pool, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    loaded = {name for name in json.loads(output.strip().splitlines()[-1]) if name != 'app.routes.helpers'}
+    assert loaded == {BLUEPRINTS[name][0] for name in POOLS[pool]}
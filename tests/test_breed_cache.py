@@ -0,0 +1,58 @@
+"""
+Perceptual-hash cache of breed detection results (see app/breed_cache.py).
+"""
+
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageOps
+
+from app import breed_cache
+from app.models import db, BreedDetectionCache
+
+RESULT = {'pet_type': 'собака', 'breed_name': 'Лабрадор-ретривер'}
+
+
+def photo():
+    img = Image.linear_gradient('L').resize((320, 240)).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((60, 40, 200, 180), fill=(200, 120, 40))
+    draw.rectangle((220, 120, 300, 220), fill=(20, 60, 160))
+    return img
+
+
+def reupload(img):
+    """The same photo downscaled and re-encoded as JPEG, as a phone would send it again."""
+    buffer = BytesIO()
+    img.resize((160, 120)).save(buffer, format='JPEG', quality=70)
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+def test_near_duplicate_photo_hits_the_cache(app):
+    original = photo()
+    copy_hash = breed_cache.photo_hash(reupload(original))
+    with app.app_context():
+        breed_cache.store(breed_cache.photo_hash(original), RESULT)
+        assert copy_hash != breed_cache.photo_hash(original)
+        assert breed_cache.lookup(copy_hash) == RESULT
+        assert BreedDetectionCache.query.one().hit_count == 1
+
+
+def test_different_photo_misses(app):
+    original = photo()
+    with app.app_context():
+        breed_cache.store(breed_cache.photo_hash(original), RESULT)
+        assert breed_cache.lookup(breed_cache.photo_hash(ImageOps.mirror(original))) is None
+
+
+def test_expired_entries_are_ignored(app):
+    image_hash = breed_cache.photo_hash(photo())
+    with app.app_context():
+        breed_cache.store(image_hash, RESULT)
+        entry = BreedDetectionCache.query.one()
+        entry.created_at = datetime.now(timezone.utc) - timedelta(seconds=app.config['BREED_CACHE_TTL'] + 1)
+        db.session.commit()
+        # Ни точное совпадение, ни поиск по расстоянию не возвращают устаревшую запись
+        assert breed_cache.lookup(image_hash) is None
+        assert breed_cache.lookup(breed_cache.photo_hash(reupload(photo()))) is None
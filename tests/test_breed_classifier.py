@@ -0,0 +1,188 @@
+"""
+Concurrency cap and circuit breaker around a slow or failing classifier
+backend (see GuardedClassifier in app/breed_classifier.py).
+"""
+
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from app import breed_jobs
+from app.breed_classifier import BreedClassifier, CircuitBreaker, ClassifierUnavailable, GuardedClassifier
+from app.models import db, BreedDetectionJob, User
+
+RESET_TIMEOUT = 0.05
+
+
+class ScriptedBackend(BreedClassifier):
+    """Fails while failing is set; each call waits for release first."""
+
+    name = 'scripted'
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+        self.release = threading.Event()
+        self.release.set()
+        self.entered = threading.Event()
+
+    def classify(self, img):
+        self.calls += 1
+        self.entered.set()
+        self.release.wait(5)
+        if self.failing:
+            raise RuntimeError('upstream is down')
+        return {'pet_type': 'собака', 'breed_name': 'Лабрадор-ретривер'}
+
+
+@pytest.fixture
+def backend():
+    return ScriptedBackend()
+
+
+@pytest.fixture
+def image():
+    return Image.new('RGB', (32, 32), 'white')
+
+
+def guarded(backend, max_concurrency=1, failure_threshold=2, reset_timeout=RESET_TIMEOUT):
+    breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    return GuardedClassifier(backend, max_concurrency=max_concurrency, queue_timeout=0.05, breaker=breaker)
+
+
+def open_breaker(classifier, backend, image):
+    backend.failing = True
+    for _ in range(classifier.breaker.failure_threshold):
+        with pytest.raises(RuntimeError):
+            classifier.classify(image)
+
+
+def in_background(classifier, image):
+    thread = threading.Thread(target=classifier.classify, args=(image,))
+    thread.start()
+    return thread
+
+
+def test_call_waiting_past_the_deadline_for_a_slot_is_rejected(backend, image):
+    classifier = guarded(backend, max_concurrency=1)
+    backend.release.clear()
+    slow = in_background(classifier, image)
+    backend.entered.wait(5)
+
+    started = time.monotonic()
+    with pytest.raises(ClassifierUnavailable, match='перегружен'):
+        classifier.classify(image)
+    assert time.monotonic() - started < 1
+    backend.release.set()
+    slow.join()
+
+    # Занятость - не сбой бэкенда: breaker остается закрытым
+    assert backend.calls == 1 and classifier.breaker.state == 'closed'
+    assert classifier.classify(image)['breed_name'] == 'Лабрадор-ретривер'
+
+
+def test_semaphore_caps_calls_in_flight(backend, image):
+    classifier = guarded(backend, max_concurrency=2)
+    backend.release.clear()
+    threads = [in_background(classifier, image) for _ in range(2)]
+    while backend.calls < 2:
+        time.sleep(0.001)
+
+    with pytest.raises(ClassifierUnavailable):
+        classifier.classify(image)
+    backend.release.set()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 2
+
+
+def test_breaker_opens_after_repeated_failures_and_fails_fast(backend, image):
+    classifier = guarded(backend, failure_threshold=2)
+    backend.failing = True
+    with pytest.raises(RuntimeError):
+        classifier.classify(image)
+    assert classifier.breaker.state == 'closed'
+    with pytest.raises(RuntimeError):
+        classifier.classify(image)
+    assert classifier.breaker.state == 'open'
+
+    with pytest.raises(ClassifierUnavailable) as rejected:
+        classifier.classify(image)
+    assert str(rejected.value) == GuardedClassifier.UNAVAILABLE_MESSAGE
+    assert backend.calls == 2
+
+
+def test_half_open_breaker_lets_one_trial_through(backend, image):
+    classifier = guarded(backend)
+    open_breaker(classifier, backend, image)
+    time.sleep(RESET_TIMEOUT)
+    assert classifier.breaker.state == 'half-open'
+
+    backend.failing = False
+    backend.release.clear()
+    trial = in_background(classifier, image)
+    while backend.calls < 3:
+        time.sleep(0.001)
+    # Пока пробный вызов не вернулся, остальные отклоняются сразу
+    with pytest.raises(ClassifierUnavailable, match='недоступен'):
+        classifier.classify(image)
+    backend.release.set()
+    trial.join()
+    assert classifier.breaker.state == 'closed'
+
+
+def test_failed_trial_opens_the_breaker_again(backend, image):
+    classifier = guarded(backend)
+    open_breaker(classifier, backend, image)
+    time.sleep(RESET_TIMEOUT)
+
+    with pytest.raises(RuntimeError):
+        classifier.classify(image)
+    assert classifier.breaker.state == 'open'
+
+
+def test_trial_rejected_as_busy_is_handed_back(backend, image):
+    classifier = guarded(backend, max_concurrency=1)
+    open_breaker(classifier, backend, image)
+    time.sleep(RESET_TIMEOUT)
+
+    # Слот занят: пробный вызов не дошел до бэкенда и не должен заблокировать breaker
+    classifier._slots.acquire()
+    with pytest.raises(ClassifierUnavailable, match='перегружен'):
+        classifier.classify(image)
+    classifier._slots.release()
+
+    backend.failing = False
+    assert classifier.classify(image)['breed_name'] == 'Лабрадор-ретривер'
+    assert classifier.breaker.state == 'closed'
+
+
+def run_job(make_app, classifier, image):
+    app = make_app()
+    app.extensions['breed_classifier'] = classifier
+    with app.app_context():
+        db.session.add(User(username='owner', email='owner@example.com', password_hash='x'))
+        job = BreedDetectionJob(id=breed_jobs.new_id(), user_id=1, image_hash='0' * 16)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+    breed_jobs._run_job(app, job_id, image)
+    with app.app_context():
+        job = db.session.get(BreedDetectionJob, job_id)
+        return job.status, job.error
+
+
+def test_job_shows_the_friendly_message_when_the_breaker_is_open(make_app, backend, image):
+    classifier = guarded(backend, reset_timeout=60)
+    open_breaker(classifier, backend, image)
+    assert run_job(make_app, classifier, image) == ('error', GuardedClassifier.UNAVAILABLE_MESSAGE)
+    assert backend.calls == 2
+
+
+def test_job_does_not_show_upstream_error_details(make_app, backend, image):
+    backend.failing = True
+    status, error = run_job(make_app, guarded(backend), image)
+    assert status == 'error' and 'upstream' not in error
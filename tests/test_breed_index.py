@@ -0,0 +1,88 @@
+"""
+Resolving classifier breed names and rebuilding the breed index after
+catalog edits (see app/breed_index.py).
+"""
+
+import pytest
+
+from app.breed_index import get_index
+from app.models import db, Breed, Category, Product
+
+
+def seed_catalog(app):
+    with app.app_context():
+        dog_food = Category(name='Корм для собак', slug='dog-food')
+        db.session.add(dog_food)
+        db.session.flush()
+        db.session.add_all([
+            Breed(name='Лабрадор-ретривер', slug='labrador-retriever', pet_type='собака'),
+            Breed(name='Немецкая овчарка', slug='nemetskaia-ovcharka', pet_type='собака'),
+            Breed(name='Мейн-кун', slug='mein-kun', pet_type='кошка'),
+            Breed(name='Сфинкс', slug='sfinks', pet_type='кошка'),
+            Product(name='Сухой корм', slug='dry-food', category_id=dog_food.id, price=100),
+        ])
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def app(make_app):
+    return seed_catalog(make_app())
+
+
+def resolved_name(app, breed_name, pet_type=None):
+    with app.app_context():
+        breed = get_index().resolve(breed_name, pet_type)
+        return breed['name'] if breed else None
+
+
+@pytest.mark.parametrize('breed_name, expected', [
+    ('Лабрадор-ретривер', 'Лабрадор-ретривер'),
+    ('лабрадор ретривер', 'Лабрадор-ретривер'),
+    ('Labrador Retriever', 'Лабрадор-ретривер'),
+    ('Мэйн-кун', 'Мейн-кун'),
+    ('Немецкая овчарк', 'Немецкая овчарка'),
+    ('Лабродор-ретривер', 'Лабрадор-ретривер'),
+])
+def test_spelling_variants_resolve_to_the_catalog_breed(app, breed_name, expected):
+    assert resolved_name(app, breed_name) == expected
+
+
+def test_unrelated_or_empty_names_do_not_match(app):
+    assert resolved_name(app, 'Попугай ара') is None
+    assert resolved_name(app, '') is None
+
+
+def test_fuzzy_match_keeps_to_the_pet_type(app):
+    # Похоже на «Сфинкс», но модель сказала, что это собака
+    assert resolved_name(app, 'Сфинксс', 'кошка') == 'Сфинкс'
+    assert resolved_name(app, 'Сфинксс', 'собака') is None
+
+
+def test_breed_edit_rebuilds_the_index(app):
+    assert resolved_name(app, 'Корги') is None
+    with app.app_context():
+        db.session.add(Breed(name='Вельш-корги', slug='velsh-korgi', pet_type='собака'))
+        db.session.commit()
+    assert resolved_name(app, 'Вельш корги') == 'Вельш-корги'
+
+
+def test_category_edit_rebuilds_the_index(app):
+    with app.app_context():
+        assert get_index().pet_type_products['собака'][0]['name'] == 'Сухой корм'
+        db.session.get(Category, 1).slug = 'dog-toys'
+        db.session.commit()
+        assert 'собака' not in get_index().pet_type_products
+
+
+def test_invalidation_is_per_app(make_app, app):
+    other = seed_catalog(make_app())
+    resolved_name(app, 'Лабрадор')
+    resolved_name(other, 'Лабрадор')
+    with app.app_context():
+        db.session.get(Breed, 1).name = 'Лабрадор'
+        db.session.commit()
+
+    # Пересборка индекса другого приложения не должна снимать устаревание с этого
+    assert resolved_name(other, 'Лабрадор') == 'Лабрадор-ретривер'
+    assert resolved_name(app, 'Лабрадор') == 'Лабрадор'
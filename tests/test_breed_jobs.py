@@ -0,0 +1,98 @@
+"""
+Breed detection jobs never stay unfinished (see app/breed_jobs.py).
+"""
+
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app import breed_cache, breed_jobs
+from app.models import db, BreedDetectionJob, User
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add(User(username='owner', email='owner@example.com', password_hash='x'))
+        db.session.commit()
+    return app
+
+
+def add_job(app, **fields):
+    with app.app_context():
+        job = BreedDetectionJob(id=breed_jobs.new_id(), user_id=1, image_hash='0' * 16, **fields)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def job_status(app, job_id):
+    with app.app_context():
+        job = db.session.get(BreedDetectionJob, job_id)
+        return job.status, job.error
+
+
+def test_failure_after_classification_marks_the_job_failed(app, monkeypatch):
+    def broken_store(image_hash, result_data):
+        raise RuntimeError('cache is down')
+
+    monkeypatch.setattr(breed_cache, 'store', broken_store)
+    job_id = add_job(app)
+    breed_jobs._run_job(app, job_id, Image.new('RGB', (64, 64), 'white'))
+    status, error = job_status(app, job_id)
+    assert status == 'error' and error
+
+
+def test_stale_job_is_reported_failed(app, login):
+    client = app.test_client()
+    login(client, 1)
+    started = datetime.now(timezone.utc) - timedelta(seconds=app.config['BREED_JOB_DEADLINE'] + 1)
+    stale = add_job(app, status='running', created_at=started)
+    fresh = add_job(app, status='running')
+
+    assert client.get(f'/breed-detect/jobs/{stale}').get_json()['status'] == 'error'
+    assert client.get(f'/breed-detect/jobs/{fresh}').get_json()['status'] == 'running'
+
+    # Воркер, который все-таки дошел до задачи, не возвращает ее в работу
+    breed_jobs._run_job(app, stale, Image.new('RGB', (64, 64), 'white'))
+    assert job_status(app, stale)[0] == 'error'
+
+
+def test_event_stream_answers_once_and_closes(app, login):
+    # Поток событий не держит поток воркера до конца задачи
+    client = app.test_client()
+    login(client, 1)
+    running = add_job(app, status='running')
+    done = add_job(app, status='error', error='Сервис недоступен')
+
+    body = client.get(f'/breed-detect/jobs/{running}/events').get_data(as_text=True)
+    assert body.startswith('retry: 1000\n') and body.count('event: status') == 1
+    assert 'event: end' not in body
+    assert 'event: end' in client.get(f'/breed-detect/jobs/{done}/events').get_data(as_text=True)
+
+
+
+def png(size):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def test_oversize_photo_is_rejected_by_the_server(make_app, login):
+    app = make_app(BREED_UPLOAD_MAX_BYTES=2048)
+    with app.app_context():
+        db.session.add(User(username='owner', email='owner@example.com', password_hash='x'))
+        db.session.commit()
+    client = app.test_client()
+    login(client, 1)
+
+    # Размер проверяется до декодирования, поэтому второй файл не обязан быть картинкой
+    response = client.post('/breed-detect', data={'file': [(png((8, 8)), 'small.png'),
+                                                           (BytesIO(b'x' * 2049), 'large.png')]})
+    assert response.status_code == 400 and response.get_json()['success'] is False
+    with app.app_context():
+        assert BreedDetectionJob.query.count() == 0
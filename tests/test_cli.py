@@ -0,0 +1,33 @@
+"""
+``flask images import`` (see app/cli.py).
+"""
+
+from PIL import Image
+
+from app.models import db, Category, Product
+
+
+def test_image_import_matches_product_ids_written_with_leading_zeros(app, tmp_path):
+    # Обработанные фото пишутся в static приложения: уводим их во временный каталог
+    app.static_folder = str(tmp_path / 'static')
+    with app.app_context():
+        category = Category(name='Корма', slug='food')
+        db.session.add(category)
+        db.session.flush()
+        db.session.add_all(Product(name=f'Товар {i}', slug=f'product-{i}', category_id=category.id, price=100)
+                           for i in range(8))
+        db.session.commit()
+
+    source = tmp_path / 'photos'
+    source.mkdir()
+    Image.new('RGB', (64, 64), 'red').save(source / 'red.png')
+    Image.new('RGB', (64, 64), 'blue').save(source / 'blue.png')
+    mapping = tmp_path / 'map.csv'
+    mapping.write_text('product_id,file\n007,red.png\n 2 ,blue.png\n', encoding='utf-8')
+
+    result = app.test_cli_runner().invoke(args=['images', 'import', str(source), '--map', str(mapping),
+                                                '--workers', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'Товар не найден' not in result.output
+    with app.app_context():
+        assert {p.id for p in Product.query.filter(Product.image.isnot(None))} == {2, 7}
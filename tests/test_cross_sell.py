@@ -0,0 +1,65 @@
+"""
+"Bought together" scoring on a handful of orders with known pairs
+(see compute_associations in app/cross_sell.py).
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.cross_sell import compute_associations
+
+# order id -> product ids in it; 10 and 20 are bought together in four orders, 10 and 30 in two
+ORDERS = {
+    1: [10, 20, 30],
+    2: [10, 20],
+    3: [10, 20, 40],
+    4: [10, 30],
+    5: [40, 50],
+    6: [10, 10, 20],  # повтор строки не считается вторым совместным заказом
+}
+
+
+def order_lines():
+    pairs = [(order_id, product_id) for order_id, products in ORDERS.items() for product_id in products]
+    return np.array([o for o, _ in pairs]), np.array([p for _, p in pairs])
+
+
+def associations(**kwargs):
+    """{product_id: [(related_id, score, co_count), ...]} in rank order."""
+    product_ids, related_ids, ranks, scores, counts = compute_associations(*order_lines(), **kwargs)
+    result = {}
+    for product_id, related_id, rank, score, count in sorted(zip(product_ids, related_ids, ranks, scores, counts),
+                                                            key=lambda row: (row[0], row[2])):
+        result.setdefault(int(product_id), []).append((int(related_id), round(float(score), 4), int(count)))
+    return result
+
+
+def test_top_associations_by_cosine():
+    assert associations(min_support=2) == {
+        10: [(20, round(4 / math.sqrt(5 * 4), 4), 4), (30, round(2 / math.sqrt(5 * 2), 4), 2)],
+        20: [(10, round(4 / math.sqrt(4 * 5), 4), 4)],
+        30: [(10, round(2 / math.sqrt(2 * 5), 4), 2)],
+    }
+
+
+def test_pairs_below_min_support_are_dropped():
+    # Пары, купленные вместе один раз, появляются только при min_support=1
+    assert set(associations(min_support=3)) == {10, 20}
+    assert associations(min_support=3)[10] == [(20, round(4 / math.sqrt(20), 4), 4)]
+    assert [related for related, _, _ in associations(min_support=1)[40]] == [50, 20, 10]
+
+
+def test_top_k_keeps_the_best_partners():
+    assert associations(min_support=1, top_k=1)[10] == [(20, round(4 / math.sqrt(20), 4), 4)]
+
+
+def test_lift_scores_against_chance():
+    # Из 6 заказов 10 есть в 5, 30 - в 2, вместе - в 2: lift = 2 * 6 / (5 * 2)
+    assert associations(min_support=2, metric='lift')[30] == [(10, round(2 * 6 / (5 * 2), 4), 2)]
+
+
+def test_unknown_metric_is_rejected():
+    with pytest.raises(ValueError):
+        compute_associations(*order_lines(), metric='jaccard')
@@ -0,0 +1,77 @@
+"""
+Image format negotiation and LQIP placeholders (see image_processor.py).
+"""
+
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from image_processor import make_placeholder, negotiate_image_format
+
+ALL_FORMATS = ['avif', 'webp', 'jpg']
+
+
+def negotiate(accept, available=ALL_FORMATS):
+    return negotiate_image_format(parse_accept_header(accept, MIMEAccept), available)
+
+
+@pytest.mark.parametrize('accept, expected', [
+    # Chrome/Firefox для <img>
+    ('image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8', 'avif'),
+    ('image/webp,*/*', 'webp'),
+    ('IMAGE/WEBP', 'webp'),
+    # Только подстановки: клиент не обещал поддержку новых форматов
+    ('*/*', 'jpg'),
+    ('image/*', 'jpg'),
+    ('', 'jpg'),
+])
+def test_modern_formats_need_an_explicit_accept(accept, expected):
+    assert negotiate(accept) == expected
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('image/avif;q=0, image/webp', 'webp'),
+    ('image/avif;q=0, image/webp;q=0, */*', 'jpg'),
+    ('image/avif;q=0.5, image/webp;q=0.9', 'webp'),
+    ('image/avif;q=0.9, image/webp;q=0.9', 'avif'),
+])
+def test_q_values(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def test_only_formats_on_disk_are_offered():
+    assert negotiate('image/avif,image/webp', ['webp', 'jpg']) == 'webp'
+    assert negotiate('image/avif', ['webp', 'jpg']) == 'jpg'
+    # Старые изображения есть только в исходном формате
+    assert negotiate('image/avif,image/webp', ['png']) == 'png'
+    assert negotiate('image/webp', []) is None
+
+
+def decode_placeholder(uri):
+    prefix = 'data:image/webp;base64,'
+    assert uri.startswith(prefix)
+    return Image.open(BytesIO(base64.b64decode(uri[len(prefix):])))
+
+
+def test_placeholder_is_a_tiny_webp_with_the_same_aspect():
+    photo = Image.new('RGB', (800, 400), (200, 120, 40))
+    uri = make_placeholder(photo)
+    placeholder = decode_placeholder(uri)
+    assert placeholder.format == 'WEBP' and placeholder.size == (16, 8)
+    # Встраивается в HTML каждой карточки товара
+    assert len(uri) < 500
+    # thumbnail() работает на месте: исходник не должен уменьшиться
+    assert photo.size == (800, 400)
+
+
+def test_placeholder_size_is_the_long_edge():
+    assert decode_placeholder(make_placeholder(Image.new('RGB', (300, 900)), size=24)).size == (8, 24)
+
+
+@pytest.mark.parametrize('mode', ['RGBA', 'P', 'L', 'LA', 'CMYK'])
+def test_placeholder_accepts_any_image_mode(mode):
+    assert decode_placeholder(make_placeholder(Image.new(mode, (64, 64)))).size == (16, 16)
@@ -0,0 +1,23 @@
+"""
+Per-request SQL timing (see app/instrumentation.py).
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.instrumentation import current_stats
+from app.models import db
+
+
+def test_failed_statement_does_not_skew_later_timings(app):
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        with pytest.raises(OperationalError):
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        db.session.rollback()
+        db.session.execute(text('SELECT 1'))
+
+        stats = current_stats()
+        assert stats.query_count == 2
+        assert [sql for _, sql in stats.statements] == ['SELECT * FROM no_such_table', 'SELECT 1']
@@ -0,0 +1,65 @@
+"""
+Access to /metrics and pool metrics of every engine (see app/metrics.py).
+"""
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.database import REPLICA_BIND, sync_sqlite_replica
+from app.models import db, Product
+
+TOKEN = 'scrape-secret'
+
+
+@pytest.fixture
+def metrics_app(make_app, tmp_path):
+    def factory(**config):
+        app = make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "primary.db"}',
+                       SQLALCHEMY_BINDS={REPLICA_BIND: f'sqlite:///{tmp_path / "replica.db"}'},
+                       METRICS_TOKEN=TOKEN, **config)
+        sync_sqlite_replica(app)
+        return app
+    return factory
+
+
+def test_metrics_need_the_scrape_token(metrics_app):
+    client = metrics_app().test_client()
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 404
+    assert client.get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'}).status_code == 200
+
+
+def test_loopback_is_not_trusted_by_default(metrics_app):
+    # Так выглядит любой запрос через nginx на той же машине
+    client = metrics_app().test_client()
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 404
+
+
+def test_allowed_ips_use_the_forwarded_client_behind_a_proxy(metrics_app):
+    client = metrics_app(METRICS_ALLOWED_IPS='10.0.0.5', PROXY_FIX_X_FOR=1).test_client()
+    proxy = {'REMOTE_ADDR': '127.0.0.1'}
+    assert client.get('/metrics', environ_base=proxy, headers={'X-Forwarded-For': '203.0.113.7'}).status_code == 404
+    assert client.get('/metrics', environ_base=proxy, headers={'X-Forwarded-For': '10.0.0.5'}).status_code == 200
+
+
+def test_replica_pool_is_instrumented(metrics_app):
+    app = metrics_app()
+    with app.test_request_context('/product/list'):
+        app.preprocess_request()
+        Product.query.count()
+    body = app.test_client().get('/metrics', headers={'Authorization': f'Bearer {TOKEN}'}).get_data(as_text=True)
+    assert 'petshop_db_pool_checkouts_total{bind="primary"}' in body
+    assert 'petshop_db_pool_checkouts_total{bind="replica"}' in body
+
+
+def test_pool_waits_are_timed_after_dispose(metrics_app):
+    # Прогрев и after_fork пересоздают пул; гистограмма ожидания не должна замолкать
+    app = metrics_app()
+    with app.app_context():
+        engine = db.engine
+        engine.dispose()
+        before = REGISTRY.get_sample_value('petshop_db_pool_checkout_wait_seconds_count', {'bind': 'primary'})
+        with engine.connect():
+            pass
+        after = REGISTRY.get_sample_value('petshop_db_pool_checkout_wait_seconds_count', {'bind': 'primary'})
+    assert after == before + 1
@@ -0,0 +1,50 @@
+"""
+Recent migrations against the models (see migrations/versions).
+
+The baseline revision alters tables created before migrations were added, so
+the chain cannot start from an empty database: the schema is built from the
+models, stamped at head and walked down and up again.
+"""
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import downgrade, stamp, upgrade
+
+from app.models import db
+
+# Ревизия до b9fff2571c05 (составные индексы для частых запросов)
+BEFORE_HOT_QUERY_INDEXES = '5d2a91e7b6c4'
+HOT_QUERY_INDEXES = {
+    'ix_categories_is_active_is_popular_display_order',
+    'ix_orders_status_created_at',
+    'ix_orders_user_id_created_at',
+    'ix_products_is_active_is_recommended',
+    'ix_reviews_product_id_is_approved',
+    'ix_subscribers_is_verified_is_active',
+    'ix_subscribers_verification_token',
+    'ix_users_is_verified',
+    'ix_users_verification_token',
+}
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    # Миграции SQLite пересоздают таблицы, поэтому нужен файл, а не :memory:
+    return make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "migrations.db"}')
+
+
+def schema_diff():
+    """Differences between the models and the database, as Alembic autogenerate sees them."""
+    with db.engine.connect() as connection:
+        return compare_metadata(MigrationContext.configure(connection), db.metadata)
+
+
+def test_hot_query_index_migration_matches_the_models(app):
+    with app.app_context():
+        stamp(revision='head')
+        downgrade(revision=BEFORE_HOT_QUERY_INDEXES)
+        assert {diff[1].name for diff in schema_diff() if diff[0] == 'add_index'} == HOT_QUERY_INDEXES
+
+        upgrade(revision='head')
+        assert schema_diff() == []
@@ -0,0 +1,67 @@
+"""
+Popularity counters of deleted products (see app/popularity.py).
+
+SQLite does not enforce foreign keys by default, so the tests turn them on to
+behave like Postgres.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app.models import (db, Breed, BreedShelf, Category, Product, ProductAssociation, ProductStat)
+from app.popularity import EventBuffer
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    app = make_app(create_tables=False, SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "shop.db"}')
+    with app.app_context():
+        @event.listens_for(db.engine, 'connect')
+        def enforce_foreign_keys(dbapi_connection, connection_record):
+            dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+        db.engine.dispose()
+        db.create_all()
+        category = Category(name='Корма', slug='food')
+        breed = Breed(name='Лабрадор', slug='labrador', pet_type='собака')
+        db.session.add_all([category, breed])
+        db.session.flush()
+        products = [Product(name=f'Товар {i}', slug=f'product-{i}', category_id=category.id, price=100)
+                    for i in range(2)]
+        db.session.add_all(products)
+        db.session.flush()
+        db.session.add_all([
+            ProductStat(product_id=products[0].id, views=3),
+            BreedShelf(breed_id=breed.id, position=0, product_id=products[0].id),
+            ProductAssociation(product_id=products[0].id, rank=0, related_product_id=products[1].id,
+                               score=1.0, co_count=2),
+            ProductAssociation(product_id=products[1].id, rank=0, related_product_id=products[0].id,
+                               score=1.0, co_count=2),
+        ])
+        db.session.commit()
+    return app
+
+
+def test_deleting_a_product_removes_its_derived_rows(app):
+    with app.app_context():
+        db.session.delete(db.session.get(Product, 1))
+        db.session.commit()
+        assert ProductStat.query.count() == 0
+        assert BreedShelf.query.count() == 0
+        assert ProductAssociation.query.count() == 0
+
+
+def test_flush_drops_counts_of_deleted_products(app):
+    buffer = EventBuffer()
+    buffer._app = app
+    buffer._views.update({1: 2, 2: 5})
+    buffer._cart_adds.update({2: 1})
+    with app.app_context():
+        db.session.delete(db.session.get(Product, 1))
+        db.session.commit()
+
+    assert buffer.flush() == 1
+    assert buffer.pending() == ({}, {})
+    with app.app_context():
+        stat = db.session.get(ProductStat, 2)
+        assert (stat.views, stat.cart_adds) == (5, 1)
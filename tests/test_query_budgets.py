@@ -0,0 +1,245 @@
+"""
+SQL statement budgets per endpoint.
+
+Every page is requested through the test client against a seeded catalog
+large enough that an N+1 query (a template touching a lazy relationship in a
+loop) multiplies the statement count well past the budget. A page is
+requested twice and the second, warm request is counted, so per-process
+caches (breed index, shelves) filled on first use do not count.
+
+New GET endpoints must get a budget here (or be listed in NOT_BUDGETED with
+the reason); the test fails otherwise.
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import request_finished, url_for
+
+from app import breed_jobs
+from app.instrumentation import current_stats
+from app.models import (db, Address, Breed, BreedDetectionJob, CartItem, Category, Favorite, Order, OrderItem,
+                        OrderStatus, Pet, Product, PromoCode, Review, Role, Subscriber, User)
+
+CATEGORIES = 12
+PRODUCTS = 240
+CUSTOMERS = 40
+ORDERS = 10  # заказов у покупателя, по ITEMS_PER_ORDER товаров
+ITEMS_PER_ORDER = 6
+CART_ITEMS = 8
+FAVORITES = 10
+
+# endpoint -> (who is logged in, SQL statements allowed per request)
+BUDGETS = {
+    'main.index': ('customer', 6),
+    'main.about': ('anonymous', 1),
+    'main.privacy': ('anonymous', 1),
+    'main.view_cart': ('customer', 3),
+    'main.checkout': ('customer', 5),
+    'main.order_confirmation': ('customer', 4),
+    'product.list_products': ('anonymous', 5),
+    'product.view': ('customer', 6),
+    'profile.view_profile': ('customer', 3),
+    'profile.edit_profile': ('customer', 3),
+    'profile.change_password': ('customer', 3),
+    'profile.manage_addresses': ('customer', 4),
+    'profile.edit_address': ('customer', 4),
+    'profile.manage_pets': ('customer', 5),
+    'profile.view_orders': ('customer', 5),
+    'profile.view_order_detail': ('customer', 6),
+    'profile.view_favorites': ('customer', 4),
+    'auth.login': ('anonymous', 1),
+    'auth.register': ('anonymous', 1),
+    'auth.forgot_password': ('anonymous', 1),
+    'auth.verify_reset_code': ('anonymous', 1),
+    'auth.reset_password': ('anonymous', 2),
+    'auth.verify_email': ('anonymous', 1),
+    'breed.breed_detect': ('customer', 2),
+    'breed.breed_detect_status': ('customer', 2),
+    'breed.breed_detect_batch_status': ('customer', 2),
+    'breed.breed_detect_events': ('customer', 2),
+    'admin.admin_dashboard': ('admin', 7),
+    'admin.admin_orders': ('admin', 4),
+    'admin.admin_order_detail': ('admin', 7),
+    'admin.manage_products': ('admin', 6),
+    'admin.add_product': ('admin', 4),
+    'admin.edit_product': ('admin', 5),
+    'admin.admin_categories': ('admin', 4),
+    'admin.add_category': ('admin', 3),
+    'admin.edit_category': ('admin', 4),
+    'admin.admin_promo_codes': ('admin', 4),
+    'admin.add_promo_code': ('admin', 3),
+    'admin.edit_promo_code': ('admin', 4),
+    'admin.admin_send_promo_emails': ('admin', 4),
+    'admin.admin_users': ('admin', 5),
+    'admin.edit_user': ('admin', 6),
+    'admin.admin_roles': ('admin', 4),
+    'admin.add_role': ('admin', 3),
+    'admin.edit_role': ('admin', 3),
+    'admin.admin_reviews': ('admin', 4),
+    'admin.admin_subscribers': ('admin', 4),
+    'admin.admin_send_subscriber_promo': ('admin', 4),
+    'admin.admin_profiles': ('admin', 3),
+    'admin.admin_memory': ('admin', 3),
+}
+
+# Query string for pages that need a token to render
+QUERY_ARGS = {
+    'auth.reset_password': {'token': 'reset-token'},
+}
+
+NOT_BUDGETED = {
+    'static': 'static files',
+    'metrics': 'no queries, scraper token, admin or allowed IPs only',
+    'main.media': 'image files',
+    'auth.logout': 'redirect only',
+    'main.verify_subscription': 'confirms a subscription token and redirects',
+    'auth.resend_verification': 'sends an email',
+    'admin.admin_profile_detail': 'profiles are files',
+    'admin.download_profile': 'profiles are files',
+}
+
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    """App on an in-memory database with seed() applied."""
+    app = make_app()
+    with app.app_context():
+        app.seeded = seed()
+    return app
+
+
+def seed():
+    """A catalog, a customer with orders, cart and favorites, and an admin; returns ids for URLs."""
+    now = datetime.now(timezone.utc)
+    admin_role = Role(name='Admin', description='Администратор')
+    db.session.add(admin_role)
+
+    categories = [Category(name=f'Категория {i}', slug=f'category-{i}', is_popular=i < 6, display_order=i)
+                  for i in range(CATEGORIES)]
+    db.session.add_all(categories)
+    db.session.flush()
+    breeds = [Breed(name=f'Порода {i}', slug=f'breed-{i}', pet_type='собака') for i in range(5)]
+    db.session.add_all(breeds)
+    products = [Product(name=f'Товар {i}', slug=f'product-{i}', sku=f'SKU-{i}', price=100 + i, stock=50,
+                        category_id=categories[i % CATEGORIES].id, is_recommended=i % 20 == 0,
+                        breeds=[breeds[i % len(breeds)]])
+                for i in range(PRODUCTS)]
+    db.session.add_all(products)
+
+    users = []
+    for i in range(CUSTOMERS):
+        user = User(username=f'customer{i}', email=f'customer{i}@example.com', is_verified=True)
+        user.set_password('password')
+        users.append(user)
+    admin = User(username='admin', email='admin@example.com', is_verified=True, roles=[admin_role])
+    admin.set_password('password')
+    db.session.add_all(users + [admin])
+    db.session.flush()
+    customer = users[0]
+    users[1].verification_token = 'reset-token'
+    users[1].verification_token_expires = now + timedelta(hours=1)
+
+    addresses = [Address(user_id=customer.id, full_name='Покупатель', phone='+70000000000',
+                         street=f'Ленина, {i}', city='Москва') for i in range(3)]
+    db.session.add_all(addresses)
+    db.session.add(Pet(user_id=customer.id, name='Шарик', pet_type='собака', breed_id=breeds[0].id))
+    db.session.flush()
+
+    orders = []
+    for i in range(ORDERS):
+        items = products[i * ITEMS_PER_ORDER:(i + 1) * ITEMS_PER_ORDER]
+        subtotal = sum(product.price for product in items)
+        order = Order(user_id=customer.id, address_id=addresses[0].id, order_number=f'ORDER{i:04d}',
+                      status=list(OrderStatus)[i % len(OrderStatus)], subtotal=subtotal, total=subtotal,
+                      created_at=now - timedelta(days=i))
+        order.items = [OrderItem(product_id=product.id, product_name=product.name, price=product.price,
+                                 quantity=1, subtotal=product.price) for product in items]
+        orders.append(order)
+    db.session.add_all(orders)
+
+    db.session.add_all(CartItem(user_id=customer.id, product_id=product.id, quantity=2)
+                       for product in products[:CART_ITEMS])
+    db.session.add_all(Favorite(user_id=customer.id, product_id=product.id) for product in products[:FAVORITES])
+    db.session.add_all(Review(product_id=products[i % 5].id, user_id=user.id, rating=4 + i % 2,
+                              content='Отзыв', is_approved=True)
+                       for i, user in enumerate(users))
+    db.session.add_all(Subscriber(email=f'subscriber{i}@example.com', is_verified=True) for i in range(50))
+    promo = PromoCode(code='SALE10', discount_type='percent', discount_value=10)
+    db.session.add(promo)
+
+    # Готовые задачи распознавания: ответ собирает рекомендации для найденной породы
+    result = json.dumps({'pet_type': 'собака', 'breed_name': breeds[0].name, 'confidence': '90%',
+                         'description': 'Описание'}, ensure_ascii=False)
+    batch_id = breed_jobs.new_id()
+    jobs = [BreedDetectionJob(id=breed_jobs.new_id(), user_id=customer.id, image_hash=f'{i:016x}', status='done',
+                              result_data=result, batch_id=batch_id if i else None, finished_at=now)
+            for i in range(3)]
+    db.session.add_all(jobs)
+    db.session.commit()
+
+    return {
+        'customer': customer.id, 'admin': admin.id, 'product_id': products[0].id, 'order_id': orders[0].id,
+        'address_id': addresses[0].id, 'category_id': categories[0].id, 'promo_code_id': promo.id,
+        'user_id': customer.id, 'role_id': admin_role.id, 'job_id': jobs[0].id, 'batch_id': batch_id,
+    }
+
+
+@contextmanager
+def count_queries(app):
+    """Collect the SQL statements of requests served meanwhile, as counted by app.instrumentation.
+
+    Only statements executed inside a request are counted, so background flushers are ignored.
+    """
+    statements = []
+
+    def collect(sender, response, **extra):
+        statements.extend(sql for duration, sql in current_stats().statements)
+
+    with request_finished.connected_to(collect, app):
+        yield statements
+
+
+@pytest.fixture
+def query_counter(app):
+    """count(client, url) -> (response, statements) for the warm second request to url."""
+    def count(client, url):
+        client.get(url)
+        with count_queries(app) as statements:
+            response = client.get(url)
+        return response, statements
+    return count
+
+
+def client_for(app, who):
+    client = app.test_client()
+    if who != 'anonymous':
+        with client.session_transaction() as session:
+            session['_user_id'] = str(app.seeded[who])
+            session['_fresh'] = True
+    return client
+
+
+def endpoint_url(app, endpoint):
+    rule = next(rule for rule in app.url_map.iter_rules() if rule.endpoint == endpoint)
+    values = {name: app.seeded[name] for name in rule.arguments}
+    values.update(QUERY_ARGS.get(endpoint, {}))
+    with app.test_request_context():
+        return url_for(endpoint, **values)
+
+
+def test_every_page_has_a_budget(app):
+    pages = {rule.endpoint for rule in app.url_map.iter_rules() if 'GET' in rule.methods}
+    missing = pages - set(BUDGETS) - set(NOT_BUDGETED)
+    assert not missing, f'declare a query budget in BUDGETS for: {sorted(missing)}'
+
+
+@pytest.mark.parametrize('endpoint', sorted(BUDGETS))
+def test_query_budget(app, query_counter, endpoint):
+    who, budget = BUDGETS[endpoint]
+    response, statements = query_counter(client_for(app, who), endpoint_url(app, endpoint))
+    assert response.status_code < 400, f'{endpoint}: HTTP {response.status_code}'
+    assert len(statements) <= budget, (
+        f'{endpoint}: {len(statements)} SQL statements, budget {budget}:\n' + '\n'.join(statements))
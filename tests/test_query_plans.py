@@ -0,0 +1,60 @@
+"""
+Hot queries must be served by an index: EXPLAIN QUERY PLAN on SQLite fails
+the test on a full table scan or an unexpected sort.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from app.models import db, Category, Order, OrderStatus, Product, Review, Subscriber, User
+
+# (name, query factory, index expected in the plan)
+HOT_QUERIES = [
+    ('index: recommended products',
+     lambda: Product.query.filter_by(is_active=True, is_recommended=True).limit(8),
+     'ix_products_is_active_is_recommended'),
+    ('index: popular categories',
+     lambda: Category.query.filter_by(is_active=True, is_popular=True).order_by(Category.display_order),
+     'ix_categories_is_active_is_popular_display_order'),
+    ('product view: approved reviews',
+     lambda: Review.query.filter_by(product_id=1, is_approved=True),
+     'ix_reviews_product_id_is_approved'),
+    ('campaign: verified subscribers',
+     lambda: Subscriber.query.filter_by(is_verified=True, is_active=True),
+     'ix_subscribers_is_verified_is_active'),
+    ('campaign: verified users',
+     lambda: User.query.filter_by(is_verified=True),
+     'ix_users_is_verified'),
+    ('password reset: user by token',
+     lambda: User.query.filter_by(verification_token='token'),
+     'ix_users_verification_token'),
+    ('subscription: subscriber by token',
+     lambda: Subscriber.query.filter_by(verification_token='token'),
+     'ix_subscribers_verification_token'),
+    ('view_orders: user orders',
+     lambda: Order.query.filter_by(user_id=1).order_by(Order.created_at.desc()),
+     'ix_orders_user_id_created_at'),
+    ('admin: orders by status',
+     lambda: Order.query.filter(Order.status == OrderStatus.PENDING).order_by(Order.created_at.desc()),
+     'ix_orders_status_created_at'),
+]
+
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app()
+
+
+def query_plan(query):
+    sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+@pytest.mark.parametrize('name, make_query, index', HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(app, name, make_query, index):
+    with app.app_context():
+        plan = query_plan(make_query())
+    scans = [step for step in plan if step.startswith('SCAN')]
+    assert not scans, f'{name}: full scan {scans}'
+    assert any(index in step for step in plan), f'{name}: {index} not used, plan: {plan}'
+    assert not any('TEMP B-TREE' in step for step in plan), f'{name}: sorts in a temp b-tree, plan: {plan}'
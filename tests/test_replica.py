@@ -0,0 +1,104 @@
+"""
+Read-replica routing (see app/database.py), with two SQLite files standing in
+for the primary and the replica.
+"""
+
+import sqlite3
+
+import pytest
+from flask import g
+
+from app.database import PRIMARY_UNTIL_KEY, REPLICA_BIND, sync_sqlite_replica
+from app.models import db, Address, CartItem, Category, Product, User
+from app.warmup import after_fork
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    app = make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{primary}',
+                   SQLALCHEMY_BINDS={REPLICA_BIND: f'sqlite:///{replica}'})
+    with app.app_context():
+        db.create_all()
+        category = Category(name='Корма', slug='food')
+        user = User(username='buyer', email='buyer@example.com', password_hash='x')
+        db.session.add_all([category, user])
+        db.session.flush()
+        db.session.add(Address(user_id=user.id, full_name='Покупатель', phone='+70000000000',
+                               street='Ленина, 1', city='Москва'))
+        db.session.add(Product(name='Корм для собак', slug='dog-food', category_id=category.id, price=500))
+        db.session.commit()
+    sync_sqlite_replica(app)
+    app.replica_path = str(replica)
+    return app
+
+
+def add_primary_only_product(app):
+    # Реплика «отстает»: товар есть только в primary до следующей синхронизации
+    with app.app_context():
+        db.session.add(Product(name='Только в primary', slug='primary-only', category_id=1, price=100))
+        db.session.commit()
+
+
+def test_catalog_pages_read_from_replica(app):
+    add_primary_only_product(app)
+    client = app.test_client()
+    page = client.get('/product/list').get_data(as_text=True)
+    assert 'Корм для собак' in page
+    assert 'Только в primary' not in page
+
+    sync_sqlite_replica(app)
+    assert 'Только в primary' in client.get('/product/list').get_data(as_text=True)
+
+
+def test_other_requests_read_from_primary(app):
+    add_primary_only_product(app)
+    with app.test_request_context('/checkout', method='POST'):
+        app.preprocess_request()
+        assert Product.query.count() == 2
+    with app.test_request_context('/product/list'):
+        app.preprocess_request()
+        assert Product.query.count() == 1
+    with app.app_context():
+        assert Product.query.count() == 2
+
+
+def test_writes_go_to_primary_and_pin_the_user_to_it(app, login):
+    add_primary_only_product(app)
+    client = app.test_client()
+    login(client, 1)
+
+    assert client.post('/cart/add/1').status_code == 302
+    with app.app_context():
+        assert CartItem.query.filter_by(user_id=1).count() == 1
+    replica = sqlite3.connect(app.replica_path)
+    assert replica.execute('SELECT COUNT(*) FROM cart_items').fetchone()[0] == 0
+    replica.close()
+
+    # Read-your-writes: следующие запросы пользователя читают с primary
+    with client.session_transaction() as session:
+        assert PRIMARY_UNTIL_KEY in session
+    assert 'Только в primary' in client.get('/product/list').get_data(as_text=True)
+
+    with client.session_transaction() as session:
+        session[PRIMARY_UNTIL_KEY] = 0
+    assert 'Только в primary' not in client.get('/product/list').get_data(as_text=True)
+
+
+def test_flush_in_routed_request_uses_primary(app):
+    with app.test_request_context('/product/list'):
+        app.preprocess_request()
+        assert g.db_route == REPLICA_BIND
+        db.session.add(Product(name='Новый', slug='new', category_id=1, price=1))
+        db.session.commit()
+        # После записи чтения в этом запросе тоже идут в primary
+        assert Product.query.filter_by(slug='new').count() == 1
+    with app.app_context():
+        assert Product.query.filter_by(slug='new').count() == 1
+
+
+def test_worker_warmup_fills_the_replica_pool_too(app):
+    after_fork(app, connections=3)
+    with app.app_context():
+        assert {key or 'primary': engine.pool.checkedin() for key, engine in db.engines.items()} == {
+            'primary': 3, REPLICA_BIND: 3}
@@ -0,0 +1,56 @@
+"""
+Personal home page shelves (see app/shelves.py).
+"""
+
+import pytest
+
+from app.models import db, Breed, Category, Pet, Product, User
+from app.shelves import build_breed_shelves, personal_shelf
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        category = Category(name='Товары', slug='goods')
+        db.session.add(category)
+        db.session.flush()
+        labrador = Breed(name='Лабрадор', slug='labrador', pet_type='собака')
+        husky = Breed(name='Хаски', slug='husky', pet_type='собака')
+        sphynx = Breed(name='Сфинкс', slug='sphynx', pet_type='кошка')
+        db.session.add_all([
+            Product(name='Корм для лабрадоров', slug='labrador-food', category_id=category.id, price=1,
+                    breeds=[labrador]),
+            Product(name='Шлейка', slug='harness', category_id=category.id, price=1, breeds=[labrador, husky]),
+            Product(name='Свитер для сфинкса', slug='sphynx-sweater', category_id=category.id, price=1,
+                    breeds=[sphynx]),
+        ])
+        db.session.add_all(User(username=name, email=f'{name}@example.com', password_hash='x')
+                           for name in ('breed', 'typed', 'none'))
+        db.session.flush()
+        db.session.add_all([
+            Pet(user_id=1, pet_type='собака', breed_id=labrador.id),
+            # «Не знаю» в профиле: вид указан, порода нет
+            Pet(user_id=2, pet_type='собака'),
+        ])
+        db.session.commit()
+        build_breed_shelves(size=4)
+    return app
+
+
+def shelf_slugs(app, user_id):
+    with app.app_context():
+        return [product.slug for product in personal_shelf(user_id)]
+
+
+def test_pet_with_breed_gets_the_breed_shelf(app):
+    assert shelf_slugs(app, 1) == ['labrador-food', 'harness']
+
+
+def test_pet_without_breed_gets_the_pet_type_shelf(app):
+    # Шлейка подходит двум породам собак, поэтому выше
+    assert shelf_slugs(app, 2) == ['harness', 'labrador-food']
+
+
+def test_user_without_pets_gets_no_shelf(app):
+    assert shelf_slugs(app, 3) == []
@@ -0,0 +1,36 @@
+"""
+Cold-start regression guard (see benchmarks/startup.py).
+
+Heavy optional dependencies must not be imported just to serve a page, and
+import + create_app + first request must stay within STARTUP_BUDGET_MS
+(median of STARTUP_RUNS fresh interpreters).
+"""
+
+import os
+
+import pytest
+
+from benchmarks import startup
+
+BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 3000))
+RUNS = int(os.environ.get('STARTUP_RUNS', 3))
+
+
+@pytest.fixture(scope='module')
+def report():
+    return startup.run(runs=RUNS, url='/')
+
+
+def test_first_request_succeeds(report):
+    assert report['status'] == 200
+
+
+def test_heavy_dependencies_are_lazy(report):
+    assert report['heavy_modules'] == []
+
+
+def test_startup_within_budget(report):
+    assert report['total_ms'] <= BUDGET_MS, (
+        f"cold start {report['total_ms']} ms > {BUDGET_MS} ms "
+        f"(import {report['import_ms']}, create_app {report['create_app_ms']}, "
+        f"first request {report['first_request_ms']})")
@@ -0,0 +1,67 @@
+"""
+Span tracing: who may force a trace, and the size cap of the JSONL export
+(see app/tracing.py).
+"""
+
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.models import db
+from app.tracing import JsonlExporter, Trace, trace
+
+TRACEPARENT = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+
+
+@pytest.fixture
+def tracing_app(make_app, tmp_path):
+    def factory(trust):
+        return make_app(TRACE_TRUST_TRACEPARENT=trust, TRACE_FILE=str(tmp_path / 'traces.jsonl'))
+    return factory
+
+
+def test_client_traceparent_is_ignored_by_default(tracing_app):
+    app = tracing_app(False)
+    response = app.test_client().get('/about', headers={'traceparent': TRACEPARENT})
+    assert 'traceparent' not in response.headers
+
+
+def test_trusted_traceparent_continues_the_trace(tracing_app):
+    app = tracing_app(True)
+    response = app.test_client().get('/about', headers={'traceparent': TRACEPARENT})
+    assert response.headers['traceparent'].startswith('00-' + 'a' * 32 + '-')
+    app.extensions['tracer'].flush()
+
+
+def test_failed_statement_ends_its_span(make_app, tmp_path):
+    app = make_app(TRACE_SAMPLE_RATE=1.0, TRACE_FILE=str(tmp_path / 'traces.jsonl'))
+    with app.app_context(), trace('job') as root:
+        with pytest.raises(OperationalError):
+            db.session.execute(text('SELECT * FROM missing_table'))
+        db.session.rollback()
+        db.session.execute(text('SELECT 1'))
+
+    failed, after = [s for s in root.trace.spans if s.name == 'db.query'][-2:]
+    assert failed.status == 'error' and 'missing_table' in failed.error and failed.end_ns is not None
+    # Следующий запрос - снова потомок корня, а не упавшего спана
+    assert after.parent_id == root.span_id and after.status == 'ok'
+    app.extensions['tracer'].flush()
+
+
+def test_jsonl_export_is_rotated(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    exporter = JsonlExporter(str(path), 'petshop', max_bytes=2000, backups=2)
+    trace = Trace(tracer=type('Tracer', (), {'max_spans': 100})())
+    spans = [trace.start_span(f'span {i}') for i in range(5)]
+    for span in spans:
+        span.finish()
+    for _ in range(20):
+        exporter.export(spans)
+
+    # Файл может перерасти лимит не больше чем на одну пачку спанов
+    batch = sum(len(json.dumps(span.to_dict('petshop'), default=str)) + 1 for span in spans)
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ['traces.jsonl', 'traces.jsonl.1', 'traces.jsonl.2']
+    assert all((tmp_path / name).stat().st_size < 2000 + batch for name in files)
@@ -0,0 +1,14 @@
+"""
+Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is built with ProductionConfig and warmed up at import time; with
+``preload_app`` this happens once in the gunicorn master before it forks.
+"""
+
+from app import create_app
+from app.warmup import warmup
+
+app = create_app('production')
+warmup(app)